@@ -0,0 +1,239 @@
+"""
+End-to-end benchmark of the oGen commands.
+
+Runs `create`, `build`, `start`, `status`, `logs` and `stop` against the fake
+`docker` and `git` of `fake_backend.py`, in a throwaway workspace, fully offline.
+Every fake call sleeps for a simulated latency and is logged, so the time
+spent by oGen itself can be told apart from the time spent waiting for docker and git.
+
+For each command the median of the runs is reported:
+- wall: wall-clock time of `ogen <command>`, interpreter startup included
+- calls: number of docker and git subprocesses
+- backend: time covered by the fake subprocesses (overlapping calls counted once)
+- overhead: wall - backend, the Python side of oGen (the interpreter startup
+  of the fakes included, a few ms per call)
+
+The results are saved as json to be compared between commits.
+
+Usage:
+    python benchmarks/commands.py [--runs 5] [--latency 0.05] [--latency-of 'git clone=1']
+                                  [--output results.json] [--compare previous.json]
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+BENCH_PATH = os.path.dirname(os.path.abspath(__file__))
+ROOT_PATH = os.path.dirname(BENCH_PATH)
+SRC_PATH = os.path.join(ROOT_PATH, 'src')
+RUN_GEN = 'from ogen.ogen import gen; gen()'
+PROJECT = 'bench'
+
+# The scenario, run in this order in a new workspace
+COMMANDS = {
+    'create': ['create', PROJECT],
+    'build': ['build'],
+    'start': ['start'],
+    'status': ['status'],
+    'logs': ['logs'],
+    'stop': ['stop'],
+}
+
+
+def _prepare_env(tmp_dir: str, latencies: dict, log_lines: int) -> dict:
+    """
+    Creates the config, the workspace and the fake executables in `tmp_dir`.
+    """
+    config_dir = os.path.join(tmp_dir, 'config', 'odoo-gen')
+    workspace = os.path.join(tmp_dir, 'workspace')
+    bin_dir = os.path.join(tmp_dir, 'bin')
+    for path in (config_dir, workspace, bin_dir):
+        os.makedirs(path)
+
+    with open(os.path.join(config_dir, 'ogen.conf'), 'w', encoding='utf8') as conf:
+        conf.write(f'[DEFAULT]\nworkspace_dir = {workspace}\nactive_project = {PROJECT}\n')
+
+    # `-S`: the fakes start faster than a full interpreter, closer to the real executables
+    with open(os.path.join(BENCH_PATH, 'fake_backend.py'), 'r', encoding='utf8') as fake:
+        source = f'#!{sys.executable} -S\n' + fake.read()
+    for name in ('docker', 'git'):
+        path = os.path.join(bin_dir, name)
+        with open(path, 'w', encoding='utf8') as script:
+            script.write(source)
+        os.chmod(path, 0o755)
+
+    env = dict(os.environ)
+    env['XDG_CONFIG_HOME'] = os.path.join(tmp_dir, 'config')
+    env['PATH'] = bin_dir + os.pathsep + env.get('PATH', '')
+    env['PYTHONPATH'] = SRC_PATH + os.pathsep + env.get('PYTHONPATH', '')
+    env['OGEN_FAKE_STATE'] = os.path.join(tmp_dir, 'docker_state.json')
+    env['OGEN_FAKE_CALLS'] = os.path.join(tmp_dir, 'calls.jsonl')
+    env['OGEN_FAKE_LATENCY'] = json.dumps(latencies)
+    env['OGEN_FAKE_LOG_LINES'] = str(log_lines)
+    env.pop('OGEN_TRACE', None)
+    return env
+
+
+def _read_calls(path: str) -> list:
+    if not os.path.exists(path):
+        return []
+    with open(path, 'r', encoding='utf8') as calls_file:
+        calls = [json.loads(line) for line in calls_file if line.strip()]
+    os.unlink(path)
+    return calls
+
+
+def _covered_time(calls: list) -> float:
+    """
+    Total time covered by the calls, the overlapping intervals counted once.
+    """
+    total = 0.0
+    end = 0.0
+    for call in sorted(calls, key=lambda item: item['start']):
+        if call['end'] > end:
+            total += call['end'] - max(call['start'], end)
+            end = call['end']
+    return total
+
+
+def run_scenario(env: dict) -> dict:
+    """
+    Runs the commands once.
+
+    Returns:
+        dict: {command: {wall, calls, backend, overhead}}, times in ms.
+    """
+    res = {}
+    for name, args in COMMANDS.items():
+        start = time.perf_counter()
+        proc = subprocess.run([sys.executable, '-c', RUN_GEN] + args, env=env,
+                              stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL,
+                              stderr=subprocess.PIPE, text=True, check=False)
+        wall = (time.perf_counter() - start) * 1000
+        if proc.returncode:
+            raise RuntimeError(f'`ogen {" ".join(args)}` failed:{os.linesep}{proc.stderr}')
+
+        calls = _read_calls(env['OGEN_FAKE_CALLS'])
+        backend = _covered_time(calls) * 1000
+        res[name] = {
+            'wall': wall,
+            'calls': len(calls),
+            'backend': backend,
+            'overhead': max(wall - backend, 0.0),
+            'call_names': sorted({call['name'] for call in calls}),
+        }
+    return res
+
+
+def summarize(runs: list) -> dict:
+    """
+    Returns:
+        dict: The median of every measure of every command.
+    """
+    res = {}
+    for name in COMMANDS:
+        samples = [run[name] for run in runs]
+        res[name] = {
+            key: round(statistics.median(sample[key] for sample in samples), 1)
+            for key in ('wall', 'calls', 'backend', 'overhead')
+        }
+        res[name]['call_names'] = samples[-1]['call_names']
+    return res
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.run(['git', '-C', ROOT_PATH, 'rev-parse', '--short', 'HEAD'],
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ''
+
+
+def _parse_latencies(default: float, overrides: list) -> dict:
+    latencies = {'default': default}
+    for item in overrides:
+        name, sep, value = item.rpartition('=')
+        if not sep or not name:
+            raise SystemExit(f'Invalid --latency-of "{item}", expected NAME=SECONDS')
+        latencies[name.strip()] = float(value)
+    return latencies
+
+
+def print_report(results: dict, previous: dict = None) -> None:
+    """
+    Prints the results, with the difference of the overhead to a previous run.
+    """
+    header = f'{"command":<10}{"wall":>10}{"calls":>7}{"backend":>10}{"overhead":>10}'
+    print(header + ('  vs previous' if previous else ''))
+    for name, values in results['commands'].items():
+        line = (f'{name:<10}{values["wall"]:>7.1f} ms{values["calls"]:>7.0f}'
+                f'{values["backend"]:>7.1f} ms{values["overhead"]:>7.1f} ms')
+        old = (previous or {}).get('commands', {}).get(name)
+        if old:
+            delta = values['overhead'] - old['overhead']
+            ratio = f' ({delta / old["overhead"]:+.0%})' if old['overhead'] else ''
+            line += f'  {delta:+.1f} ms{ratio}'
+        print(line)
+
+
+def main() -> int:
+    """
+    Runs the scenario with the fake backend, prints and saves the results.
+
+    Returns:
+        int: Exit code.
+    """
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n', maxsplit=1)[0])
+    parser.add_argument('--runs', type=int, default=5, help='Runs of the scenario (median).')
+    parser.add_argument('--latency', type=float, default=0.05,
+                        help='Seconds every fake docker/git call waits. Defaults to 0.05.')
+    parser.add_argument('--latency-of', action='append', default=[], metavar='NAME=SECONDS',
+                        help='Latency of a call, e.g. `docker compose build=2`. Repeatable.')
+    parser.add_argument('--log-lines', type=int, default=200,
+                        help='Lines printed by the fake `docker compose logs` per service.')
+    parser.add_argument('--output', help='Json file of the results. '
+                                         'Defaults to benchmarks/results/<commit>.json')
+    parser.add_argument('--compare', help='Json results of a previous run to compare with.')
+    args = parser.parse_args()
+
+    latencies = _parse_latencies(args.latency, args.latency_of)
+    runs = []
+    for _i in range(max(args.runs, 1)):
+        with tempfile.TemporaryDirectory(prefix='ogen-bench-') as tmp_dir:
+            runs.append(run_scenario(_prepare_env(tmp_dir, latencies, args.log_lines)))
+
+    commit = _git_commit()
+    results = {
+        'commit': commit,
+        'date': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'runs': len(runs),
+        'latencies': latencies,
+        'log_lines': args.log_lines,
+        'commands': summarize(runs),
+    }
+
+    previous = None
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf8') as prev_file:
+            previous = json.load(prev_file)
+    print_report(results, previous)
+
+    output = args.output or os.path.join(BENCH_PATH, 'results', f'{commit or "results"}.json')
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w', encoding='utf8') as out_file:
+        json.dump(results, out_file, indent=2)
+    print(f'Results saved to {output}')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,217 @@
+"""
+Deterministic fake `docker` and `git` executables used by the benchmarks.
+
+The runner links this script as `docker` and `git` in a folder put first on PATH,
+the behaviour is picked from the name it is called by. Nothing is downloaded
+nor started: the containers are entries of a json state file, `git clone`
+creates a minimal source tree and every call sleeps for a simulated latency.
+
+Environment:
+    OGEN_FAKE_STATE: The json file keeping the containers and networks.
+    OGEN_FAKE_CALLS: Every call is appended to this jsonl file (argv, start, end).
+    OGEN_FAKE_LATENCY: Json {command name: seconds}, e.g. `{"docker compose build": 2}`,
+                       the `default` key applies to the other commands.
+    OGEN_FAKE_LOG_LINES: Number of lines printed by `docker compose logs`. Defaults to 200.
+"""
+
+import importlib.util
+import json
+import os
+import sys
+import time
+
+STARTED = time.time()
+
+
+def _load_trace():
+    """
+    Loads `ogen.utils.trace` from its file, the `ogen.utils` package imports click
+    and the fakes run without the site-packages (`-S`).
+    """
+    ogen_spec = importlib.util.find_spec('ogen')
+    spec = importlib.util.spec_from_file_location(
+        'ogen_trace', os.path.join(os.path.dirname(ogen_spec.origin), 'utils', 'trace.py'))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+# Calls named like the spans of `ogen --trace`
+trace = _load_trace()
+command_name = trace.command_name
+VALUE_OPTIONS = trace.VALUE_OPTIONS
+
+SERVICES = ('db', 'odoo')
+# Fixed timestamps, the output doesn't depend on the day the benchmark runs
+LOG_EPOCH = 1700000000
+
+
+def option(argv: list, name: str, default: str = '') -> str:
+    """
+    Value of an option of the call.
+    """
+    for idx, arg in enumerate(argv[:-1]):
+        if arg == name:
+            return argv[idx + 1]
+    return default
+
+
+def positionals(argv: list, subcommand: str) -> list:
+    """
+    Arguments of the call after its subcommand, options removed.
+    """
+    args = argv[argv.index(subcommand) + 1:]
+    res = []
+    skip = False
+    for arg in args:
+        if skip:
+            skip = False
+        elif arg in VALUE_OPTIONS:
+            skip = True
+        elif not arg.startswith('-'):
+            res.append(arg)
+    return res
+
+
+def load_state() -> dict:
+    """
+    The fake containers and networks, kept between the calls.
+    """
+    path = os.environ.get('OGEN_FAKE_STATE', '')
+    if not path or not os.path.exists(path):
+        return {'projects': {}, 'networks': ['bridge', 'host', 'none']}
+    with open(path, 'r', encoding='utf8') as state_file:
+        return json.load(state_file)
+
+
+def save_state(state: dict) -> None:
+    """
+    Saves the fake containers and networks for the next calls.
+    """
+    path = os.environ.get('OGEN_FAKE_STATE', '')
+    if path:
+        with open(path, 'w', encoding='utf8') as state_file:
+            json.dump(state, state_file)
+
+
+def compose(argv: list) -> int:
+    """
+    `docker compose ...`
+    """
+    project = option(argv, '--project-name', 'default')
+    name = command_name(argv).rsplit(' ', maxsplit=1)[-1]
+    state = load_state()
+    containers = state['projects'].setdefault(project, {})
+    services = positionals(argv, name) or list(SERVICES)
+
+    if name == 'build':
+        for step in range(1, 6):
+            print(f'#{step} [odoo] step {step}/5')
+    elif name in ('up', 'start', 'restart'):
+        for service in services:
+            containers[service] = 'running'
+            print(f'Container {project}-{service}-1  Started', file=sys.stderr)
+    elif name == 'stop':
+        for service in services:
+            if service in containers:
+                containers[service] = 'exited'
+    elif name == 'down':
+        state['projects'].pop(project, None)
+    elif name == 'ps':
+        running_only = option(argv, '--status') == 'running'
+        print(json.dumps([
+            {'Service': service, 'Name': f'{project}-{service}-1', 'ID': f'{idx:012x}',
+             'State': status, 'ExitCode': 0}
+            for idx, (service, status) in enumerate(sorted(containers.items()))
+            if status == 'running' or not running_only
+        ]))
+    elif name == 'logs':
+        lines = int(os.environ.get('OGEN_FAKE_LOG_LINES', '200'))
+        stamps = '--timestamps' in argv
+        for service in services:
+            for idx in range(lines):
+                stamp = time.strftime('%Y-%m-%dT%H:%M:%S', time.gmtime(LOG_EPOCH + idx))
+                line = (f'{stamp[:10]} {stamp[11:]},000 1 INFO {project} '
+                        f'odoo.{service}: line {idx}')
+                print(f'{stamp}.000000000Z {line}' if stamps else f'{service}-1  | {line}')
+    save_state(state)
+    return 0
+
+
+def docker(argv: list) -> int:
+    """
+    `docker ...`
+    """
+    name = command_name(argv)
+    if name.startswith('docker compose'):
+        return compose(argv)
+
+    state = load_state()
+    labels = state.setdefault('network_labels', {})
+    if name == 'docker network ls':
+        # Only the `label=<key>=<value>` filter is supported
+        label = option(argv, '--filter').partition('label=')[2]
+        print(os.linesep.join(network for network in state['networks']
+                              if not label or label in labels.get(network, [])))
+    elif name == 'docker network create':
+        network = positionals(argv, 'create')[0]
+        state['networks'].append(network)
+        labels[network] = [argv[idx + 1] for idx, arg in enumerate(argv[:-1])
+                           if arg == '--label']
+        save_state(state)
+    elif name == 'docker image inspect':
+        print('sha256:' + '0' * 64)
+    return 0
+
+
+def git(argv: list) -> int:
+    """
+    `git ...`
+    """
+    if argv[1:] == ['--version']:
+        print('git version 2.40.0')
+        return 0
+
+    name = command_name(argv)
+    if name == 'git clone':
+        path = argv[-1]
+        odoo = 'odoo' in argv[-2]
+        os.makedirs(os.path.join(path, 'odoo', 'addons', 'base') if odoo else path,
+                    exist_ok=True)
+        with open(os.path.join(path, 'requirements.txt'), 'w', encoding='utf8') as req:
+            req.write('Babel==2.9.1\npsycopg2==2.9.5\n' if odoo else '')
+        if odoo:
+            with open(os.path.join(path, 'odoo-bin'), 'w', encoding='utf8') as odoo_bin:
+                odoo_bin.write('#!/usr/bin/env python3\n')
+            with open(os.path.join(path, 'odoo', 'addons', 'base', '__manifest__.py'),
+                      'w', encoding='utf8') as manifest:
+                manifest.write("{'name': 'Base', 'depends': []}\n")
+        print(f"Cloning into '{path}'...", file=sys.stderr)
+    return 0
+
+
+def main() -> int:
+    """
+    Runs the fake call after its simulated latency and records it.
+
+    Returns:
+        int: Exit code of the call.
+    """
+    argv = [os.path.basename(sys.argv[0])] + sys.argv[1:]
+    latencies = json.loads(os.environ.get('OGEN_FAKE_LATENCY', '{}'))
+    name = command_name(argv)
+    time.sleep(latencies.get(name, latencies.get('default', 0)))
+
+    code = git(argv) if argv[0] == 'git' else docker(argv)
+    sys.stdout.flush()
+
+    calls = os.environ.get('OGEN_FAKE_CALLS', '')
+    if calls:
+        with open(calls, 'a', encoding='utf8') as calls_file:
+            calls_file.write(json.dumps({'name': name, 'argv': argv,
+                                         'start': STARTED, 'end': time.time()}) + '\n')
+    return code
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,130 @@
+"""
+Startup time budget of the oGen CLI.
+
+Measures the import time of `ogen.ogen` and the wall-clock time of the
+commands which should stay instant (`--help`, `--version`, `status`),
+then exits with 1 when a measure exceeds its budget.
+
+`status` runs against a throwaway workspace and a fake `docker` returning no
+container, so only the time spent by oGen itself is measured.
+
+Usage:
+    python benchmarks/startup.py [--runs 10] [--budget-import 100] ...
+"""
+
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+SRC_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src')
+RUN_GEN = 'from ogen.ogen import gen; gen()'
+IMPORT_TIME = re.compile(r'^import time:\s+\d+\s+\|\s+(\d+)\s+\|\s+ogen\.ogen$', re.M)
+
+# Default budgets in ms
+BUDGETS = {
+    'import': 100,
+    'help': 250,
+    'version': 250,
+    'status': 400,
+}
+
+
+def _prepare_env(tmp_dir: str) -> dict:
+    """
+    Creates the config, a project and the fake docker executable in `tmp_dir`.
+    """
+    config_dir = os.path.join(tmp_dir, 'config', 'odoo-gen')
+    workspace = os.path.join(tmp_dir, 'workspace')
+    project_dir = os.path.join(workspace, 'bench')
+    bin_dir = os.path.join(tmp_dir, 'bin')
+    for path in (config_dir, project_dir, bin_dir):
+        os.makedirs(path)
+
+    with open(os.path.join(config_dir, 'ogen.conf'), 'w', encoding='utf8') as conf:
+        conf.write(f'[DEFAULT]\nworkspace_dir = {workspace}\nactive_project = bench\n')
+    with open(os.path.join(project_dir, '.ogen.conf'), 'w', encoding='utf8') as conf:
+        conf.write('[project]\nproject_name = bench\n')
+
+    docker = os.path.join(bin_dir, 'docker')
+    with open(docker, 'w', encoding='utf8') as script:
+        script.write('#!/bin/sh\necho "[]"\n')
+    os.chmod(docker, 0o755)
+
+    env = dict(os.environ)
+    env['XDG_CONFIG_HOME'] = os.path.join(tmp_dir, 'config')
+    env['PATH'] = bin_dir + os.pathsep + env.get('PATH', '')
+    env['PYTHONPATH'] = SRC_PATH + os.pathsep + env.get('PYTHONPATH', '')
+    return env
+
+
+def measure_import(env: dict, runs: int) -> float:
+    """
+    Returns:
+        float: Median cumulative import time of `ogen.ogen` in ms.
+    """
+    samples = []
+    for _i in range(runs):
+        proc = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import ogen.ogen'],
+                              env=env, capture_output=True, text=True, check=True)
+        match = IMPORT_TIME.search(proc.stderr)
+        if not match:
+            raise RuntimeError('ogen.ogen not found in the import time report')
+        samples.append(int(match.group(1)) / 1000)
+    return statistics.median(samples)
+
+
+def measure_command(env: dict, args: list, runs: int) -> float:
+    """
+    Returns:
+        float: Median wall-clock time of `ogen <args>` in ms, interpreter startup included.
+    """
+    samples = []
+    for _i in range(runs):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, '-c', RUN_GEN] + args, env=env,
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=False)
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def main() -> int:
+    """
+    Measures the import and the startup of the light commands against their budgets.
+
+    Returns:
+        int: Exit code, 1 when a measure is over its budget.
+    """
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n', maxsplit=1)[0])
+    parser.add_argument('--runs', type=int, default=10, help='Runs per measure (median).')
+    for name, budget in BUDGETS.items():
+        parser.add_argument(f'--budget-{name}', type=float, default=budget,
+                            help=f'Budget of `{name}` in ms. Defaults to {budget}.')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix='ogen-bench-') as tmp_dir:
+        env = _prepare_env(tmp_dir)
+        results = {
+            'import': measure_import(env, args.runs),
+            'help': measure_command(env, ['--help'], args.runs),
+            'version': measure_command(env, ['--version'], args.runs),
+            'status': measure_command(env, ['status'], args.runs),
+        }
+
+    failed = False
+    for name, value in results.items():
+        budget = getattr(args, f'budget_{name}')
+        over = value > budget
+        failed |= over
+        print(f'{name:<10}{value:>9.1f} ms  (budget {budget:.0f} ms)'
+              f'{"  OVER BUDGET" if over else ""}')
+
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
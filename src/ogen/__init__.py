@@ -1,9 +1,6 @@
 """
 oGen sources folder
-"""
 
-from . import constants
-from . import models
-from . import commands
-from . import ogen
-from . import utils
+The subpackages are not imported here: `ogen.ogen` imports the commands on first use,
+to keep the CLI startup fast.
+"""
@@ -1,6 +1,58 @@
-"""Imports for `commands` part of oGen"""
+"""Imports for `commands` part of oGen
 
-from .create import CreateCommand
-from .build import BuildCommand
-from .control import ControlCommand
-from .info import InfoCommand
+The command modules are imported on first use only (see `ogen.ogen.LazyGroup`),
+so every CLI call doesn't pay for the imports of all the commands.
+"""
+
+import importlib
+
+# {cli command name: (module, command class, short help)}
+# The short help is displayed by `ogen --help` without importing the module.
+COMMANDS = {
+    'create': ('.create', 'CreateCommand', 'Create a new project'),
+    'prefetch': ('.prefetch', 'PrefetchCommand',
+                 'Downloads the Odoo sources, images and packages of new projects ahead of time'),
+    'list': ('.projects', 'ProjectsCommand', 'Lists the projects of the workspace'),
+    'dedupe': ('.projects', 'ProjectsCommand',
+               'Links the identical filestore files of the projects to a single copy'),
+    'du': ('.projects', 'ProjectsCommand', 'Shows the disk usage of the projects, part by part'),
+    'gc': ('.projects', 'ProjectsCommand',
+           'Removes the stale projects data, superseded images, '
+           'orphaned networks and old build cache'),
+    'export': ('.bundle', 'BundleCommand',
+               'Exports a project (files, database, filestore) as a single bundle'),
+    'import': ('.bundle', 'BundleCommand', 'Creates a project from a bundle made by `ogen export`'),
+    'build': ('.build', 'BuildCommand',
+              'Builds or rebuilds the docker image for the active project'),
+    'start': ('.control', 'ControlCommand',
+              'Starts the docker containers for the active project'),
+    'stop': ('.control', 'ControlCommand',
+             'Stops the docker containers for the active project'),
+    'restart': ('.control', 'ControlCommand',
+                'Restarts the odoo service of the active project'),
+    'watch': ('.control', 'ControlCommand',
+              'Watches the custom addons and applies the changes'),
+    'logs': ('.info', 'InfoCommand', 'View output from containers'),
+    'stats': ('.info', 'InfoCommand',
+              "Samples CPU, memory, block and network I/O of the active project's containers"),
+    'status': ('.info', 'InfoCommand', 'Shows status info about the active project'),
+    'perf': ('.perf', 'PerfCommand', 'Performance analysis of the active project'),
+    'db': ('.db', 'DbCommand', 'Manage the database of the active project'),
+    'test': ('.test', 'TestCommand',
+             'Runs the tests of modules in parallel odoo containers'),
+    'update': ('.update', 'UpdateCommand',
+               'Upgrades modules of the active project (`odoo-bin -u`)'),
+    'addons': ('.addons', 'AddonsCommand', 'Discover the modules of the active project'),
+}
+
+_CLASSES = {class_name: module_name for module_name, class_name, _help in COMMANDS.values()}
+
+
+def __getattr__(name: str):
+    """
+    Imports the command classes on first access, e.g. `from ogen.commands import DbCommand`.
+    """
+    if name not in _CLASSES:
+        raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+    module = importlib.import_module(_CLASSES[name], __name__)
+    return getattr(module, name)
@@ -0,0 +1,97 @@
+"""Dedicated space for the addons commands."""
+
+import click
+
+from ..models.abstract.base_command import BaseCommand
+from ..exceptions import handle_error
+
+
+class AddonsCommand(BaseCommand):
+    """
+    Class that handles the discovery of the project's modules.
+    """
+
+    mode: str = 'addons'
+
+    @handle_error
+    def __init__(self, project_name: str = ''):
+        super().__init__()
+
+        self._determine_project(project_name=project_name)
+
+    @handle_error
+    def list(self, include_odoo: bool = False) -> None:
+        """
+        Function called to execute the `addons list` command
+        """
+        self.project.list_addons(include_odoo=include_odoo)
+
+    @handle_error
+    def path(self, write: bool = False) -> None:
+        """
+        Function called to execute the `addons path` command
+        """
+        if write:
+            self.project.write_addons_path()
+            return
+        click.echo(','.join(self.project.get_addons_path()))
+
+    @handle_error
+    def requirements(self) -> None:
+        """
+        Function called to execute the `addons requirements` command
+        """
+        self.project.update_requirements()
+
+    @staticmethod
+    def init(gen) -> None:
+        """
+        Attaches the `addons` group of commands to the Generator.
+
+        Argument:
+            gen: The `gen` group function.
+        """
+
+        @gen.group(help='Discover the modules of the active project')
+        def addons() -> None:
+            """
+            Group of the addons commands.
+            """
+
+        @addons.command(name='list', help='Lists the modules of the custom addons tree '
+                                          'and flags the duplicated names')
+        @click.option('--odoo', 'include_odoo',
+                      flag_value=True,
+                      help='Include the modules of the Odoo sources.')
+        def list_addons(include_odoo: bool = False) -> None:
+            """
+            Entrypoint for the `addons list` command.
+
+            Args:
+                include_odoo (bool, optional): Include the modules of the Odoo sources.
+            """
+            command = AddonsCommand()
+            command.list(include_odoo=include_odoo)
+
+        @addons.command(help='Shows the addons_path computed from the modules found')
+        @click.option('-w', '--write',
+                      flag_value=True,
+                      help='Update the addons_path of odoo.conf.')
+        def path(write: bool = False) -> None:
+            """
+            Entrypoint for the `addons path` command.
+
+            Args:
+                write (bool, optional): Update odoo.conf.
+            """
+            command = AddonsCommand()
+            command.path(write=write)
+
+        @addons.command(help='Aggregates the python requirements of Odoo and of the addons '
+                             'in the requirements file installed by the dockerfile')
+        def requirements() -> None:
+            """
+            Entrypoint for the `addons requirements` command.
+            """
+            command = AddonsCommand()
+            command.requirements()
@@ -1,5 +1,7 @@
 """Dedicated space for build commands."""
 
+import time
+from typing import Union
 import click
 
 from ..models.abstract.base_command import BaseCommand
@@ -27,6 +29,34 @@ class BuildCommand(BaseCommand):
         self.project.build()
         self.save_config()
 
+    @handle_error
+    def rollback(self, number: Union[int, None] = None) -> None:
+        """
+        Function called to execute the `build --rollback` command.
+
+        Args:
+            number (int, optional): The build to go back to. Defaults to the previous one.
+        """
+        self.project.rollback_build(number)
+
+    @handle_error
+    def history(self) -> None:
+        """
+        Function called to execute the `build --history` command.
+        """
+        content = self.project.build_history.load()
+        if not content['builds']:
+            click.echo(f'No builds recorded for {self.project.name}.')
+            return
+
+        click.echo(f"  {'BUILD':<7} {'DATE':<17} {'ODOO':<6} {'FINGERPRINT':<17} IMAGE")
+        for build in content['builds']:
+            marker = '*' if build['number'] == content['current'] else ' '
+            date = time.strftime('%Y-%m-%d %H:%M', time.localtime(build['date']))
+            click.echo(f"{marker} {'#' + str(build['number']):<7} {date:<17} "
+                       f"{build['odoo_version']:<6} {build['fingerprint']:<17} "
+                       f"{build['image_id'].split(':')[-1][:12]}")
+
     @staticmethod
     def init(gen) -> None:
         """
@@ -38,14 +68,32 @@ class BuildCommand(BaseCommand):
 
         @gen.command(help='Builds or rebuilds the docker image for the active project or the one passed as argument')
         @click.argument('project_name', required=False)
-        def build(project_name: str = '') -> None:
+        @click.option('--rollback',
+                      flag_value=True,
+                      help='Use the previous image again, without rebuilding it.')
+        @click.option('--to', 'number',
+                      type=int,
+                      help='Build number to roll back to, see --history.')
+        @click.option('--history',
+                      flag_value=True,
+                      help='List the images kept for the project.')
+        def build(project_name: str = '', rollback: bool = False,
+                  number: Union[int, None] = None, history: bool = False) -> None:
             """
             Entrypoint for the project `build` command.
 
             Args:
                 project_name (str): Optional: Technical project name.
+                rollback (bool, optional): Roll back to a previous image.
+                number (int, optional): The build number of the rollback.
+                history (bool, optional): List the builds.
             """
             command = BuildCommand(
                 project_name=project_name
             )
-            command.build()
+            if history:
+                command.history()
+            elif rollback or number is not None:
+                command.rollback(number)
+            else:
+                command.build()
@@ -0,0 +1,139 @@
+"""Dedicated space for the `export` and `import` project commands."""
+
+import os
+import sys
+import click
+
+from ..models.abstract.base_command import BaseCommand
+from ..models.project import Project
+from ..exceptions import handle_error, InputError
+
+
+class BundleCommand(BaseCommand):
+    """
+    Class that handles the export of a project as a bundle and its import on another machine.
+    """
+
+    mode: str = 'bundle'
+
+    @handle_error
+    def __init__(self):
+        super().__init__()
+
+    @handle_error
+    def export(self, project_name: str, output: str = '',
+               include_odoo: bool = False, jobs: int = 0) -> None:
+        """
+        Function called to execute the `export` command.
+
+        Args:
+            project_name (str): The exported project.
+            output (str, optional): Bundle file, `-` for stdout.
+                                    Defaults to `<project>.ogen.tar.<ext>`.
+            include_odoo (bool, optional): Add the Odoo sources. Defaults to False.
+            jobs (int, optional): Number of parallel pg_dump jobs.
+        """
+        from ..utils.compression import get_compressor  # pylint: disable=import-outside-toplevel
+
+        self._determine_project(project_name=project_name)
+
+        if output == '-':
+            if sys.stdout.isatty():
+                raise InputError('The bundle is binary, redirect the output or use --output.')
+            self.project.export_bundle(sys.stdout.buffer, include_odoo=include_odoo, jobs=jobs)
+            return
+
+        output = output or f'{self.project.name}.ogen.tar.{get_compressor()[3]}'
+        try:
+            with open(output, 'wb') as out_file:
+                self.project.export_bundle(out_file, include_odoo=include_odoo, jobs=jobs)
+        except BaseException:
+            if os.path.exists(output):
+                os.remove(output)
+            raise
+        click.echo(f'Bundle saved to {output}', err=True)
+
+    @handle_error
+    def import_bundle(self, bundle_path: str, jobs: int = 0) -> None:
+        """
+        Function called to execute the `import` command.
+
+        Args:
+            bundle_path (str): Bundle file, `-` for stdin.
+            jobs (int, optional): Number of parallel pg_restore jobs.
+        """
+        from ..utils.bundle import BundleReader  # pylint: disable=import-outside-toplevel
+
+        if bundle_path == '-':
+            source = sys.stdin.buffer
+            label = 'stdin'
+        else:
+            source = open(bundle_path, 'rb')  # pylint: disable=consider-using-with
+            label = f'"{bundle_path}"'
+
+        try:
+            with BundleReader(source, label) as bundle:
+                # The project is created, its folder must not exist yet
+                self.mode = 'create'
+                self.project = Project(
+                    command=self,
+                    project_data={
+                        'project_name': bundle.manifest['project_name'],
+                        'odoo_version': bundle.manifest.get('odoo_version'),
+                    })
+                self.project.import_bundle(bundle, jobs=jobs)
+        finally:
+            if source is not sys.stdin.buffer:
+                source.close()
+
+        if not self.get_config('active_project'):
+            self.set_config('active_project', self.project.name)
+            self.save_config()
+
+    @staticmethod
+    def init(gen) -> None:
+        """
+        Attaches the `export` and `import` commands to the Generator.
+
+        Argument:
+            gen: The `gen` group function.
+        """
+
+        @gen.command(help='Exports a project (files, database, filestore) as a single bundle')
+        @click.argument('project_name', required=False, default='')
+        @click.option('-o', '--output',
+                      help='Bundle file, `-` to write it to stdout (e.g. piped over ssh). '
+                           'Defaults to <project>.ogen.tar.<ext>')
+        @click.option('--include-odoo',
+                      flag_value=True,
+                      help='Add the Odoo sources to the bundle '
+                           'instead of fetching them by commit on import.')
+        @click.option('-j', '--jobs',
+                      type=int,
+                      help='Number of parallel pg_dump jobs. Defaults to the number of CPUs.')
+        def export(project_name: str = '', output: str = '',
+                   include_odoo: bool = False, jobs: int = 0) -> None:
+            """
+            Entrypoint for the `export` command.
+
+            Args:
+                project_name (str, optional): The project. Defaults to the active one.
+            """
+            command = BundleCommand()
+            command.export(project_name=project_name, output=output or '',
+                           include_odoo=include_odoo, jobs=jobs or 0)
+
+        @gen.command(name='import', help='Creates a project from a bundle made by `ogen export`')
+        @click.argument('bundle', type=click.Path(exists=True, allow_dash=True, dir_okay=False))
+        @click.option('-j', '--jobs',
+                      type=int,
+                      help='Number of parallel pg_restore jobs. Defaults to the number of CPUs.')
+        def import_bundle(bundle: str, jobs: int = 0) -> None:
+            """
+            Entrypoint for the `import` command.
+
+            Args:
+                bundle (str): Bundle file, `-` to read it from stdin.
+            """
+            command = BundleCommand()
+            command.import_bundle(bundle_path=bundle, jobs=jobs or 0)
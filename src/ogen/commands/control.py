@@ -20,11 +20,14 @@ class ControlCommand(BaseCommand):
         self._determine_project(project_name=project_name)
 
     @handle_error
-    def start(self) -> None:
+    def start(self, profile: bool = False) -> None:
         """
         Function called to execute the `start` command
+
+        Args:
+            profile (bool, optional): Profile the startup phases. Defaults to False.
         """
-        self.project.start()
+        self.project.start(profile=profile)
         self.save_config()
 
     @handle_error
@@ -40,17 +43,30 @@ class ControlCommand(BaseCommand):
         self.save_config()
 
     @handle_error
-    def restart(self) -> None:
+    def restart(self, all_services: bool = False) -> None:
         """
         Function called to execute the `restart` command
+
+        Args:
+            all_services (bool, optional): Restart the db service too. Defaults to False.
         """
-        self.project.restart()
+        self.project.restart(all_services=all_services)
         self.save_config()
 
+    @handle_error
+    def watch(self, debounce: float = 0.5) -> None:
+        """
+        Function called to execute the `watch` command
+
+        Args:
+            debounce (float, optional): Seconds without changes before applying them.
+        """
+        self.project.watch(debounce=debounce)
+
     @staticmethod
     def init(gen) -> None:
         """
-        Attaches the `start`, `stop`, `restart` commands to the Generator.
+        Attaches the `start`, `stop`, `restart`, `watch` commands to the Generator.
 
         Argument:
             gen: The `gen` group function.
@@ -58,17 +74,22 @@ class ControlCommand(BaseCommand):
 
         @gen.command(help='Starts the docker containers for the active project')
         @click.argument('project_name', required=False)
-        def start(project_name: str = '') -> None:
+        @click.option('-p', '--profile',
+                      flag_value=True,
+                      help='Wait until the Odoo registry is loaded '
+                           'and show the startup phases breakdown.')
+        def start(project_name: str = '', profile: bool = False) -> None:
             """
             Entrypoint for the project `start` command.
 
             Args:
                 project_name (str): Optional: Technical project name.
+                profile (bool): Optional: Profile the startup phases.
             """
             command = ControlCommand(
                 project_name=project_name
             )
-            command.start()
+            command.start(profile=profile)
 
         @gen.command(help='Stops the docker containers for the active project')
         @click.option('-d', '--down',
@@ -81,10 +102,25 @@ class ControlCommand(BaseCommand):
             command = ControlCommand()
             command.stop(down=down)
 
-        @gen.command(help='Restarts the docker containers for the active project')
-        def restart() -> None:
+        @gen.command(help='Restarts the odoo service of the active project')
+        @click.option('-a', '--all', 'all_services',
+                      flag_value=True,
+                      help='Restart all the services, the database server included.')
+        def restart(all_services: bool = False) -> None:
             """
             Entrypoint for the project `restart` command.
             """
             command = ControlCommand()
-            command.restart()
+            command.restart(all_services=all_services)
+
+        @gen.command(help='Watches the custom addons and applies the changes: '
+                          'python files restart odoo, data files upgrade their module')
+        @click.option('-d', '--debounce',
+                      type=float, default=0.5, show_default=True,
+                      help='Seconds without changes before applying them.')
+        def watch(debounce: float = 0.5) -> None:
+            """
+            Entrypoint for the `watch` command.
+            """
+            command = ControlCommand()
+            command.watch(debounce=debounce)
@@ -1,5 +1,6 @@
 """Dedicated space for `create` project command."""
 
+import time
 from typing import Union
 import click
 
@@ -31,7 +32,10 @@ class CreateCommand(BaseCommand):
 
         self.project.process_key_paths()
 
-        self.project.build()
+        # The layers are new anyway, the ones already in the build cache are reused
+        self.project.build(no_cache=False)
+
+        self.project.register({'created': time.time()}, size=True)
 
         active_project = self.get_config('active_project')
         if not active_project:
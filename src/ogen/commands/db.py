@@ -0,0 +1,194 @@
+"""Dedicated space for database commands."""
+
+import click
+
+from ..models.abstract.base_command import BaseCommand
+from ..exceptions import handle_error
+
+
+class DbCommand(BaseCommand):
+    """
+    Class that handles specific commands of the project's database.
+    """
+
+    mode: str = 'db'
+
+    @handle_error
+    def __init__(self, project_name: str = ''):
+        super().__init__()
+
+        self._determine_project(project_name=project_name)
+
+    @handle_error
+    def slowlog(self, state: str, threshold: int = 0) -> None:
+        """
+        Function called to execute the `db slowlog` command
+        """
+        self.project.set_slowlog(enabled=state == 'on', min_duration=threshold)
+
+    @handle_error
+    def snapshot(self, name: str, method: str = 'auto', jobs: int = 0) -> None:
+        """
+        Function called to execute the `db snapshot` command
+        """
+        self.project.snapshot_db(name=name, method=method, jobs=jobs)
+
+    @handle_error
+    def restore(self, name: str, jobs: int = 0) -> None:
+        """
+        Function called to execute the `db restore` command
+        """
+        self.project.restore_db(name=name, jobs=jobs)
+
+    @handle_error
+    def import_backup(self, path: str, jobs: int = 0, neutralize: bool = True,
+                      neutralize_sql: str = '', restart: bool = False) -> None:
+        """
+        Function called to execute the `db import` command
+        """
+        self.project.import_backup(path=path, jobs=jobs, neutralize=neutralize,
+                                   neutralize_sql=neutralize_sql, restart=restart)
+
+    @handle_error
+    def template(self, action: str) -> None:
+        """
+        Function called to execute the `db template` command
+        """
+        if action == 'save':
+            self.project.save_db_template()
+        elif action == 'reset':
+            self.project.reset_db_from_template()
+        else:
+            self.project.drop_db_template()
+
+    @handle_error
+    def snapshots(self) -> None:
+        """
+        Function called to execute the `db snapshots` command
+        """
+        self.project.list_snapshots()
+
+    @staticmethod
+    def init(gen) -> None:
+        """
+        Attaches the `db` group of commands to the Generator.
+
+        Argument:
+            gen: The `gen` group function.
+        """
+
+        @gen.group(help='Manage the database of the active project')
+        def db() -> None:  # pylint: disable=invalid-name
+            """
+            Group of the database commands.
+            """
+
+        @db.command(help='Enables or disables the slow queries capture '
+                         '(log_min_duration_statement, pg_stat_statements, auto_explain)')
+        @click.argument('state', type=click.Choice(['on', 'off']))
+        @click.option('-t', '--threshold',
+                      type=int,
+                      help='Log the statements slower than this number of ms.')
+        def slowlog(state: str, threshold: int = 0) -> None:
+            """
+            Entrypoint for the `db slowlog` command.
+
+            Args:
+                state (str): `on` or `off`
+                threshold (int, optional): Minimum duration in ms of the logged statements.
+            """
+            command = DbCommand()
+            command.slowlog(state=state, threshold=threshold or 0)
+
+        @db.command(help='Saves the database and the filestore as a named snapshot')
+        @click.argument('name')
+        @click.option('-m', '--method',
+                      type=click.Choice(['auto', 'dump', 'fs']),
+                      default='auto', show_default=True,
+                      help='`dump`: parallel pg_dump, needs the database running. '
+                           '`fs`: copy of the data folder, needs the database stopped.')
+        @click.option('-j', '--jobs',
+                      type=int,
+                      help='Number of parallel pg_dump jobs. Defaults to the number of CPUs.')
+        def snapshot(name: str, method: str = 'auto', jobs: int = 0) -> None:
+            """
+            Entrypoint for the `db snapshot` command.
+
+            Args:
+                name (str): Snapshot name.
+                method (str, optional): `auto`, `dump` or `fs`.
+                jobs (int, optional): Number of parallel jobs.
+            """
+            command = DbCommand()
+            command.snapshot(name=name, method=method, jobs=jobs or 0)
+
+        @db.command(help='Restores the database and the filestore from a snapshot')
+        @click.argument('name')
+        @click.option('-j', '--jobs',
+                      type=int,
+                      help='Number of parallel pg_restore jobs. Defaults to the number of CPUs.')
+        def restore(name: str, jobs: int = 0) -> None:
+            """
+            Entrypoint for the `db restore` command.
+
+            Args:
+                name (str): Snapshot name.
+                jobs (int, optional): Number of parallel jobs.
+            """
+            command = DbCommand()
+            command.restore(name=name, jobs=jobs or 0)
+
+        @db.command(help='Lists the snapshots of the active project')
+        def snapshots() -> None:
+            """
+            Entrypoint for the `db snapshots` command.
+            """
+            command = DbCommand()
+            command.snapshots()
+
+        @db.command(help='Saves the database as a template (`save`), recreates it '
+                         'from the template in seconds (`reset`) or removes the template (`drop`)')
+        @click.argument('action', type=click.Choice(['save', 'reset', 'drop']))
+        def template(action: str) -> None:
+            """
+            Entrypoint for the `db template` command.
+
+            Args:
+                action (str): `save`, `reset` or `drop`
+            """
+            command = DbCommand()
+            command.template(action=action)
+
+        @db.command(name='import',
+                    help='Replaces the database and the filestore with a backup of the Odoo '
+                         'database manager, then neutralizes it (crons, mail servers, passwords)')
+        @click.argument('backup', type=click.Path(exists=True, dir_okay=False))
+        @click.option('-j', '--jobs',
+                      type=int,
+                      help='Number of parallel pg_restore jobs and filestore threads. '
+                           'Defaults to the number of CPUs.')
+        @click.option('--no-neutralize',
+                      flag_value=True,
+                      help='Keep the crons, the mail servers and the passwords of the backup.')
+        @click.option('--neutralize-sql',
+                      type=click.Path(exists=True, dir_okay=False, resolve_path=True),
+                      help='File of SQL statements run after the default neutralization. '
+                           'Defaults to `neutralize_sql` of the project config.')
+        @click.option('--restart',
+                      flag_value=True,
+                      help='Run all the phases again instead of resuming an interrupted import.')
+        def import_backup(backup: str, jobs: int = 0, no_neutralize: bool = False,
+                          neutralize_sql: str = '', restart: bool = False) -> None:
+            """
+            Entrypoint for the `db import` command.
+
+            Args:
+                backup (str): Path of the backup, zip or pg_dump custom format.
+                jobs (int, optional): Number of parallel jobs.
+                no_neutralize (bool, optional): Skip the neutralization.
+                neutralize_sql (str, optional): Extra neutralization statements.
+                restart (bool, optional): Ignore the phases completed by a previous run.
+            """
+            command = DbCommand()
+            command.import_backup(path=backup, jobs=jobs or 0, neutralize=not no_neutralize,
+                                  neutralize_sql=neutralize_sql or '', restart=bool(restart))
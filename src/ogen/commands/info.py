@@ -1,10 +1,14 @@
 """Dedicated space for logs, status, info commands."""
 
+from concurrent.futures import ThreadPoolExecutor
 import click
 
 from ..models.abstract.base_command import BaseCommand
+from ..models.project import Project
 from ..exceptions import handle_error
 from ..constants import VERSION
+from ..constants import DEF_JOBS
+from ..utils.log_store import LOG_LEVELS
 
 
 class InfoCommand(BaseCommand):
@@ -21,21 +25,52 @@ class InfoCommand(BaseCommand):
         self._determine_project(project_name=project_name)
 
     @handle_error
-    def logs(self, follow: bool = False, service: str = '') -> None:
+    def logs(self, follow: bool = False, service: str = '', **filters) -> None:
         """
         Function called to retrieve or follow the logs
         """
-        self.project.show_logs(follow=follow, service=service)
+        self.project.show_logs(follow=follow, service=service, **filters)
 
     @handle_error
-    def status(self) -> None:
+    def stats(self, interval: float = 2, count: int = 0, record: str = '') -> None:
         """
-        Function called to execute the `restart` command
+        Function called to execute the `stats` command
+        """
+        self.project.show_stats(interval=interval, count=count, record=record)
+
+    @handle_error
+    def status(self, all_projects: bool = False) -> None:
+        """
+        Function called to execute the `status` command
+
+        Args:
+            all_projects (bool, optional): Show all the projects of the workspace,
+                                           their status being retrieved concurrently.
         """
         click.echo(f'oGen version {VERSION}')
         click.echo('--------------------')
-        click.echo('Active project:')
-        self.project.show_status()
+        if not all_projects:
+            click.echo('Active project:')
+            self.project.show_status()
+            return
+
+        names = sorted(self.registry.reconcile(self.get_config('workspace_dir')))
+        projects = [
+            self.project if name == self.project.name
+            else Project(command=self, project_data={'project_name': name})
+            for name in names
+        ]
+        with ThreadPoolExecutor(max_workers=DEF_JOBS) as executor:
+            statuses = list(executor.map(Project.get_status, projects))
+
+        for project, status in zip(projects, statuses):
+            active = ' (active)' if project is self.project else ''
+            click.echo(f'Project{active}:')
+            if status is None:
+                click.echo(f'  Name: {project.name}')
+                click.echo('  Containers: unavailable, docker compose failed')
+                continue
+            project.show_status(status)
 
     @staticmethod
     def init(gen) -> None:
@@ -52,21 +87,70 @@ class InfoCommand(BaseCommand):
         @click.option('-f', '--follow',
                       flag_value=True,
                       help='Follow log output.')
-        def logs(service: str = '', follow: bool = False) -> None:
+        @click.option('--since',
+                      help='Search stored logs since timestamp (e.g. 2023-05-01T10:00) '
+                           'or relative duration (e.g. 42m, 2h, 1d).')
+        @click.option('--until',
+                      help='Search stored logs before timestamp '
+                           'or relative duration.')
+        @click.option('-l', '--level',
+                      type=click.Choice(LOG_LEVELS, case_sensitive=False),
+                      help='Search stored logs with this level or higher.')
+        @click.option('-g', '--grep',
+                      help='Search stored logs matching this regular expression.')
+        # pylint: disable-next=too-many-arguments,too-many-positional-arguments
+        def logs(service: str = '',
+                 follow: bool = False,
+                 since: str = '',
+                 until: str = '',
+                 level: str = '',
+                 grep: str = '') -> None:
             """
             Entrypoint for logs command.
 
             Args:
                 service (str, optional): Service to display the logs for. Defaults to ''.
                 follow (bool, optional): Follow log output. Defaults to False.
+                since (str, optional): Search logs since timestamp or relative duration.
+                until (str, optional): Search logs before timestamp or relative duration.
+                level (str, optional): Search logs with this level or higher.
+                grep (str, optional): Search logs matching this regular expression.
             """
             command = InfoCommand()
-            command.logs(follow=follow, service=service)
+            command.logs(follow=follow, service=service,
+                         since=since, until=until,
+                         level=level and level.upper(), grep=grep)
+
+        @gen.command(help='Samples CPU, memory, block and network I/O '
+                          'of the active project\'s containers')
+        @click.option('-i', '--interval',
+                      type=float, default=2, show_default=True,
+                      help='Seconds between samples.')
+        @click.option('-n', '--count',
+                      type=int, default=0,
+                      help='Number of samples. By default it runs until interrupted.')
+        @click.option('-r', '--record',
+                      type=click.Path(dir_okay=False),
+                      help='Append the samples to this CSV file.')
+        def stats(interval: float = 2, count: int = 0, record: str = '') -> None:
+            """
+            Entrypoint for the stats command.
+
+            Args:
+                interval (float, optional): Seconds between samples.
+                count (int, optional): Number of samples.
+                record (str, optional): CSV file recording the samples.
+            """
+            command = InfoCommand()
+            command.stats(interval=interval, count=count, record=record)
 
         @gen.command(help='Shows status info about the active project')
-        def status() -> None:
+        @click.option('-a', '--all', 'all_projects',
+                      flag_value=True,
+                      help='Show all the projects of the workspace.')
+        def status(all_projects: bool = False) -> None:
             """
             Entrypoint for the status command.
             """
             command = InfoCommand()
-            command.status()
+            command.status(all_projects=all_projects)
@@ -0,0 +1,244 @@
+"""Dedicated space for performance analysis commands."""
+
+import os
+import gzip
+import threading
+import subprocess
+from typing import Union
+import click
+
+from ..models.abstract.base_command import BaseCommand
+from ..exceptions import handle_error, InputError
+from ..utils.request_stats import RequestStats
+from ..utils.request_stats import SORT_KEYS
+from ..utils.sql_stats import QueryStats
+from ..utils.sql_stats import SQL_SORT_KEYS
+
+
+def open_log_file(path: str):
+    """
+    Opens a plain or gzip compressed log file for reading text lines.
+
+    Args:
+        path (str): Path to the log file.
+
+    Raises:
+        InputError: When the file doesn't exist.
+
+    Returns:
+        file: The file handle.
+    """
+    if not os.path.isfile(path):
+        raise InputError(f'The file "{path}" doesn\'t exist.')
+
+    if path.endswith('.gz'):
+        return gzip.open(path, 'rt', encoding='utf8', errors='replace')
+    return open(path, 'r', encoding='utf8', errors='replace')
+
+
+class PerfCommand(BaseCommand):
+    """
+    Class that handles the performance analysis commands.
+    """
+
+    mode: str = 'perf'
+    project_name: str
+
+    @handle_error
+    def __init__(self, project_name: str = ''):
+        super().__init__()
+
+        self.project_name = project_name
+
+    @handle_error
+    def requests(self,  # pylint: disable=too-many-arguments,too-many-positional-arguments
+                 file: Union[str, None] = None,
+                 since: Union[str, None] = None,
+                 follow: bool = False,
+                 window: int = 300,
+                 refresh: int = 5,
+                 sort_by: str = 'total',
+                 limit: int = 20) -> None:
+        """
+        Function called to execute the `perf requests` command
+        """
+        if follow and file:
+            raise InputError('The --follow option can\'t be combined with --file.')
+
+        if file:
+            stats = RequestStats()
+            with open_log_file(file) as log_file:
+                count = stats.feed(log_file)
+            self._echo_requests(stats, count, sort_by, limit)
+            return
+
+        self._determine_project(project_name=self.project_name)
+
+        if not follow:
+            stats = RequestStats()
+            count = stats.feed(
+                self.project.stream_service_logs('odoo', since=since))
+            self._echo_requests(stats, count, sort_by, limit)
+            return
+
+        # Live rolling window: lines are parsed in a background thread
+        # and the table is refreshed periodically.
+        stats = RequestStats(window=window)
+        with subprocess.Popen(self.project.service_logs_command('odoo', follow=True),
+                              cwd=self.project.data.project_path,
+                              stdout=subprocess.PIPE,
+                              encoding='utf8',
+                              errors='replace') as process:
+            reader = threading.Thread(target=stats.feed, args=(process.stdout,), daemon=True)
+            reader.start()
+
+            try:
+                while reader.is_alive():
+                    click.clear()
+                    click.echo(f'Requests of the last {window}s for project '
+                               f'`{self.project.name}` (Ctrl+C to exit)')
+                    click.echo(os.linesep.join(stats.format_table(sort_by, limit)))
+                    reader.join(refresh)
+            except KeyboardInterrupt:
+                pass
+            finally:
+                if process.poll() is None:
+                    process.terminate()
+            reader.join()
+
+        click.echo()
+        click.echo(f'Requests of the last {window}s:')
+        click.echo(os.linesep.join(stats.format_table(sort_by, limit)))
+
+    @handle_error
+    def sql(self,  # pylint: disable=too-many-arguments,too-many-positional-arguments
+            file: Union[str, None] = None,
+            stats_file: Union[str, None] = None,
+            source: str = 'stats',
+            since: Union[str, None] = None,
+            sort_by: str = 'total',
+            limit: int = 20) -> None:
+        """
+        Function called to execute the `perf sql` command
+        """
+        if file or stats_file:
+            stats = QueryStats()
+            with open_log_file(file or stats_file) as in_file:
+                if file:
+                    count = stats.feed_log(in_file)
+                else:
+                    count = stats.feed_stat_statements(in_file)
+        else:
+            self._determine_project(project_name=self.project_name)
+            stats = self.project.get_sql_stats(source=source, since=since)
+            count = len(stats.queries)
+
+        if not count:
+            click.echo('No SQL statements found.')
+            return
+
+        click.echo(f'{len(stats.queries)} distinct queries.')
+        click.echo(os.linesep.join(stats.format_report(sort_by, limit)))
+
+    @staticmethod
+    def _echo_requests(stats: RequestStats, count: int, sort_by: str, limit: int) -> None:
+        if not count:
+            click.echo('No request lines with performance info found.')
+            return
+
+        click.echo(f'Analyzed {count} requests.')
+        click.echo(os.linesep.join(stats.format_table(sort_by, limit)))
+
+    @staticmethod
+    def init(gen) -> None:
+        """
+        Attaches the `perf` group of commands to the Generator.
+
+        Argument:
+            gen: The `gen` group function.
+        """
+
+        @gen.group(help='Performance analysis of the active project')
+        def perf() -> None:
+            """
+            Group of the performance analysis commands.
+            """
+
+        @perf.command(help='Per route latency stats of the Odoo requests, '
+                           'from the odoo service logs or from a log file')
+        @click.option('--file', 'file',
+                      type=click.Path(dir_okay=False),
+                      help='Read a captured Odoo log file (plain or .gz) '
+                           'instead of the container logs.')
+        @click.option('--since',
+                      help='Only requests since timestamp or relative duration (e.g. 42m, 2h).')
+        @click.option('-f', '--follow',
+                      flag_value=True,
+                      help='Live stats on a rolling window.')
+        @click.option('-w', '--window',
+                      type=int, default=300, show_default=True,
+                      help='Rolling window in seconds, used with --follow.')
+        @click.option('-r', '--refresh',
+                      type=int, default=5, show_default=True,
+                      help='Refresh interval in seconds, used with --follow.')
+        @click.option('-s', '--sort', 'sort_by',
+                      type=click.Choice(SORT_KEYS), default='total', show_default=True,
+                      help='Sort the routes by this column.')
+        @click.option('-n', '--limit',
+                      type=int, default=20, show_default=True,
+                      help='Number of routes to show. 0 shows all.')
+        @click.option('-p', '--project', 'project_name',
+                      help='Technical project name. Defaults to the active project.')
+        # pylint: disable-next=too-many-arguments,too-many-positional-arguments
+        def requests(file: Union[str, None] = None,
+                     since: Union[str, None] = None,
+                     follow: bool = False,
+                     window: int = 300,
+                     refresh: int = 5,
+                     sort_by: str = 'total',
+                     limit: int = 20,
+                     project_name: Union[str, None] = None) -> None:
+            """
+            Entrypoint for the `perf requests` command.
+            """
+            command = PerfCommand(project_name=project_name or '')
+            command.requests(file=file, since=since, follow=follow,
+                             window=window, refresh=refresh,
+                             sort_by=sort_by, limit=limit)
+
+        @perf.command(help='Most expensive SQL queries, normalized and mapped to Odoo models')
+        @click.option('--file', 'file',
+                      type=click.Path(dir_okay=False),
+                      help='Read a captured Postgres log file (plain or .gz).')
+        @click.option('--stats-file', 'stats_file',
+                      type=click.Path(dir_okay=False),
+                      help='Read a pg_stat_statements csv export.')
+        @click.option('--source',
+                      type=click.Choice(['stats', 'logs']), default='stats', show_default=True,
+                      help='Read pg_stat_statements or the slow statements '
+                           'from the db service logs.')
+        @click.option('--since',
+                      help='Only statements logged since timestamp or relative duration, '
+                           'used with --source logs.')
+        @click.option('-s', '--sort', 'sort_by',
+                      type=click.Choice(SQL_SORT_KEYS), default='total', show_default=True,
+                      help='Sort the queries by this column.')
+        @click.option('-n', '--limit',
+                      type=int, default=20, show_default=True,
+                      help='Number of queries to show. 0 shows all.')
+        @click.option('-p', '--project', 'project_name',
+                      help='Technical project name. Defaults to the active project.')
+        # pylint: disable-next=too-many-arguments,too-many-positional-arguments
+        def sql(file: Union[str, None] = None,
+                stats_file: Union[str, None] = None,
+                source: str = 'stats',
+                since: Union[str, None] = None,
+                sort_by: str = 'total',
+                limit: int = 20,
+                project_name: Union[str, None] = None) -> None:
+            """
+            Entrypoint for the `perf sql` command.
+            """
+            command = PerfCommand(project_name=project_name or '')
+            command.sql(file=file, stats_file=stats_file, source=source,
+                        since=since, sort_by=sort_by, limit=limit)
@@ -0,0 +1,130 @@
+"""Dedicated space for the `prefetch` command."""
+
+import os
+import sys
+import subprocess
+import click
+
+from ..models.abstract.base_command import BaseCommand
+from ..constants import DEF_ODOO_REPO
+from ..constants import PROJECT_DATA_DIR
+from ..constants import SUPPORTED_ODOO_VERSIONS
+from ..exceptions import handle_error, ConfigError, InputError, IntegrityError
+
+
+class PrefetchCommand(BaseCommand):
+    """
+    Class that handles the download ahead of time of what new projects need.
+    """
+
+    mode: str = 'prefetch'
+
+    @handle_error
+    def __init__(self):
+        super().__init__()
+
+    def _workspace_dir(self) -> str:
+        workspace_dir = self.get_config('workspace_dir')
+        if not workspace_dir:
+            raise ConfigError(f'No `workspace_dir` found in {self._config_file_path}')
+        return workspace_dir
+
+    @handle_error
+    def prefetch(self, versions: str = '', build: bool = True) -> None:
+        """
+        Function called to execute the `prefetch` command.
+        The downloads run concurrently, a failed one doesn't stop the others.
+
+        Args:
+            versions (str, optional): Comma separated Odoo versions.
+                                      Defaults to the supported versions.
+            build (bool, optional): Warm the docker build cache. Defaults to True.
+        """
+        # pylint: disable=import-outside-toplevel
+        from ..utils.fileio import FileLock
+        from ..utils.prefetch import Prefetcher, sources_cache_path
+
+        versions = self._parse_versions(versions)
+        cache_path = sources_cache_path(self._workspace_dir(), DEF_ODOO_REPO)
+
+        # Cron runs don't pile up, the second one gives up right away
+        with FileLock(cache_path, timeout=0):
+            click.echo(f"Prefetching Odoo {', '.join(versions)}...")
+            steps = Prefetcher(cache_path, DEF_ODOO_REPO, versions, build=build).run()
+
+        for step in steps:
+            status = click.style('ok', fg='green') if step.ok \
+                else click.style(f'failed: {step.error}', fg='yellow')
+            click.echo(f'  {step.name:<32} {step.duration:>7.1f}s  {status}')
+
+        if not all(step.ok for step in steps):
+            raise IntegrityError('Some downloads failed, run `ogen prefetch` again later.')
+
+    @staticmethod
+    def _parse_versions(versions: str) -> list:
+        res = [version.strip() for version in (versions or '').split(',') if version.strip()]
+        invalid = [version for version in res if version not in SUPPORTED_ODOO_VERSIONS]
+        if invalid:
+            raise InputError(f'Invalid value "{", ".join(invalid)}" for --versions. '
+                             f'Allowed values are "{", ".join(SUPPORTED_ODOO_VERSIONS)}"')
+        return res or list(SUPPORTED_ODOO_VERSIONS)
+
+    @handle_error
+    def start_background(self, versions: str = '', build: bool = True) -> None:
+        """
+        Runs the prefetch in a detached process, its output going to a log file.
+
+        Args:
+            versions (str, optional): Comma separated Odoo versions.
+            build (bool, optional): Warm the docker build cache. Defaults to True.
+        """
+        from ..utils.prefetch import PREFETCH_LOG  # pylint: disable=import-outside-toplevel
+
+        self._parse_versions(versions)
+        data_dir = os.path.join(self._workspace_dir(), PROJECT_DATA_DIR)
+        os.makedirs(data_dir, exist_ok=True)
+        log_path = os.path.join(data_dir, PREFETCH_LOG)
+
+        args = ['prefetch'] + (['--versions', versions] if versions else []) \
+            + ([] if build else ['--no-build'])
+        with open(log_path, 'ab') as log_file:
+            process = subprocess.Popen(  # pylint: disable=consider-using-with
+                [sys.executable, '-c', 'from ogen.ogen import gen; gen()'] + args,
+                stdin=subprocess.DEVNULL, stdout=log_file, stderr=subprocess.STDOUT,
+                start_new_session=True)
+        click.echo(f'Prefetch running in the background (pid {process.pid}), log: {log_path}')
+
+    @staticmethod
+    def init(gen) -> None:
+        """
+        Attaches the `prefetch` command to the Generator.
+
+        Argument:
+            gen: The `gen` group function.
+        """
+
+        @gen.command(help='Downloads the Odoo sources, images and packages '
+                          'of new projects ahead of time')
+        @click.option('--versions',
+                      help='Comma separated Odoo versions, e.g. 15.0,16.0. '
+                           'Defaults to the supported versions.')
+        @click.option('-b', '--background',
+                      flag_value=True,
+                      help='Run detached, the output goes to <workspace>/.ogen/prefetch.log.')
+        @click.option('--no-build',
+                      flag_value=True,
+                      help="Don't warm the docker build cache, only download.")
+        def prefetch(versions: str = '', background: bool = False, no_build: bool = False) -> None:
+            """
+            Entrypoint for the `prefetch` command.
+
+            Args:
+                versions (str, optional): Comma separated Odoo versions.
+                background (bool, optional): Run detached.
+                no_build (bool, optional): Skip the warm-up builds.
+            """
+            command = PrefetchCommand()
+            if background:
+                command.start_background(versions=versions or '', build=not no_build)
+            else:
+                command.prefetch(versions=versions or '', build=not no_build)
@@ -0,0 +1,399 @@
+"""Dedicated space for the workspace commands: `list`, `dedupe`, `du` and `gc`."""
+
+import os
+import time
+import click
+
+from ..models.abstract.base_command import BaseCommand
+from ..models.project import Project
+from ..utils.helper import format_size
+from ..constants import DEF_JOBS
+from ..constants import DEF_UNUSED_DAYS
+from ..constants import PROJECT_DATA_DIR
+from ..exceptions import handle_error, ConfigError, InputError, UserAbortError, OCLIError
+
+
+class ProjectsCommand(BaseCommand):
+    """
+    Class that handles the overview and the maintenance of the workspace projects.
+    """
+
+    mode: str = 'list'
+
+    @handle_error
+    def __init__(self):
+        super().__init__()
+
+    @handle_error
+    def list(self, refresh: bool = False) -> None:
+        """
+        Function called to execute the `list` command.
+        The projects are rendered from the registry, reconciled with the workspace.
+
+        Args:
+            refresh (bool, optional): Rescan the workspace and compute the disk sizes.
+                                      Defaults to False.
+        """
+        workspace_dir = self._workspace_dir()
+        projects = self.registry.reconcile(workspace_dir, refresh=refresh)
+        if not projects:
+            click.echo(f'No projects found in {workspace_dir}.')
+            return
+
+        active_project = self.get_config('active_project')
+        click.echo(f"  {'NAME':<32} {'ODOO':<6} {'STATE':<8} {'PORTS':<16} "
+                   f"{'SIZE':>10}  {'LAST START'}")
+        for name in sorted(projects):
+            entry = projects[name]
+            marker = '*' if name == active_project else ' '
+            state = 'running' if entry.get('running') else 'stopped'
+            ports = ','.join(entry.get('ports', [])[:3])
+            size = format_size(entry['size']) if 'size' in entry else '-'
+            last_start = time.strftime('%Y-%m-%d %H:%M', time.localtime(entry['last_start'])) \
+                if entry.get('last_start') else '-'
+            click.echo(f"{marker} {name:<32} {entry.get('odoo_version') or '-':<6} "
+                       f"{state:<8} {ports:<16} {size:>10}  {last_start}")
+
+        if not refresh:
+            click.echo('Run `ogen list --refresh` to rescan the workspace and update the sizes.')
+
+    def _workspace_dir(self) -> str:
+        workspace_dir = self.get_config('workspace_dir')
+        if not workspace_dir:
+            raise ConfigError(f'No `workspace_dir` found in {self._config_file_path}')
+        return workspace_dir
+
+    @handle_error
+    def dedupe(self, dry_run: bool = False, mode: str = 'hardlink', jobs: int = 0) -> None:
+        """
+        Function called to execute the `dedupe` command.
+        The identical files of the projects' filestores are linked
+        to a single copy kept in the workspace blob store.
+
+        Args:
+            dry_run (bool, optional): Only report the reclaimable bytes. Defaults to False.
+            mode (str, optional): `hardlink` or `reflink`. Defaults to 'hardlink'.
+            jobs (int, optional): Parallel folder listings and hashes.
+        """
+        # pylint: disable=import-outside-toplevel
+        from ..utils.dedupe import FilestoreDeduper
+
+        workspace_dir = self._workspace_dir()
+        filestores = []
+        for name in sorted(self.registry.reconcile(workspace_dir)):
+            project = Project(command=self, project_data={'project_name': name})
+            filestores.append(os.path.join(project.get_key_path('odoo_data'), 'filestore'))
+
+        deduper = FilestoreDeduper(os.path.join(workspace_dir, PROJECT_DATA_DIR, 'blobs'),
+                                   mode=mode, jobs=jobs or DEF_JOBS)
+        started = time.time()
+        report = deduper.run(filestores, dry_run=dry_run)
+
+        click.echo(f'Scanned {report.files} files ({format_size(report.size)}) '
+                   f'of {report.filestores} filestores in {time.time() - started:.1f}s, '
+                   f'{report.hashed} new files hashed ({format_size(report.hashed_size)}).')
+        if dry_run:
+            click.echo(f'{report.duplicates} duplicated files, '
+                       f'{format_size(report.reclaimable)} reclaimable, '
+                       f'{report.pruned} unused blobs in the store.')
+            if report.duplicates:
+                click.echo('Run `ogen dedupe` to link them to the store.')
+        else:
+            click.echo(f'{report.linked} files linked to the store '
+                       f'({format_size(report.reclaimable)} reclaimed), '
+                       f'{report.pruned} unused blobs removed.')
+        for error in report.errors:
+            click.echo(click.style(f'  Error: {error}', fg='yellow'))
+
+    def _projects(self, project_names: tuple = ()) -> dict:
+        """
+        Returns:
+            dict: The projects of the workspace {name: Project}, or only the given ones.
+        """
+        names = sorted(self.registry.reconcile(self._workspace_dir()))
+        unknown = [name for name in project_names if name not in names]
+        if unknown:
+            raise InputError(f'Unknown project: {", ".join(unknown)}')
+        return {name: Project(command=self, project_data={'project_name': name})
+                for name in project_names or names}
+
+    @handle_error
+    # pylint: disable-next=invalid-name,too-many-locals
+    def du(self, project_names: tuple = (), jobs: int = 0) -> None:
+        """
+        Function called to execute the `du` command.
+        The folders of all the projects are measured in parallel
+        while docker reports the size of the images and the build cache.
+
+        Args:
+            project_names (tuple, optional): The projects. Defaults to all the workspace.
+            jobs (int, optional): Folders measured at the same time.
+        """
+        # pylint: disable=import-outside-toplevel
+        from concurrent.futures import ThreadPoolExecutor
+        from ..utils.disk_usage import USAGE_PARTS, docker_inventory, measure_projects
+
+        projects = self._projects(project_names)
+        if not projects:
+            click.echo(f'No projects found in {self._workspace_dir()}.')
+            return
+
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            pending = executor.submit(
+                docker_inventory, {name: project.compose for name, project in projects.items()})
+            sizes = measure_projects(projects, jobs=jobs or DEF_JOBS)
+            inventory = pending.result()
+
+        columns = USAGE_PARTS + ['image', 'total']
+        headers = {'git': '.GIT', 'db_data': 'DB DATA'}
+        click.echo(f"{'NAME':<32}" + ''.join(f'{headers.get(col, col.upper()):>11}'
+                                             for col in columns))
+        totals = dict.fromkeys(columns, 0)
+        now = time.time()
+        for name, parts in sizes.items():
+            row = dict(parts)
+            row['image'] = inventory.images.get(name, 0) + inventory.project_images(name)
+            row['total'] = sum(parts.values()) + row['image']
+            for col in columns:
+                totals[col] += row[col]
+            click.echo(f'{name:<32}' + ''.join(f'{format_size(row[col]):>11}' for col in columns))
+            self.registry.update(name, {'size': sum(parts.values()), 'size_date': now})
+
+        if len(sizes) > 1:
+            click.echo(f"{'TOTAL':<32}" + ''.join(f'{format_size(totals[col]):>11}'
+                                                  for col in columns))
+        if inventory.build_cache:
+            click.echo(f'Docker build cache, shared by the projects: '
+                       f'{format_size(inventory.build_cache)} '
+                       f'({format_size(inventory.build_cache_reclaimable)} reclaimable)')
+
+    def _gc_plan(self, projects: dict, policies: set,  # pylint: disable=too-many-locals
+                 unused_days: int, delete_projects: bool) -> list:
+        """
+        Lists what the garbage collection would remove.
+
+        Returns:
+            list: The GcAction steps.
+        """
+        # pylint: disable=import-outside-toplevel
+        from ..utils.disk_usage import GcAction
+        from ..utils.disk_usage import docker_inventory, orphan_networks, stale_projects
+        from ..utils.registry import dir_size
+
+        inventory = docker_inventory({name: project.compose
+                                      for name, project in projects.items()},
+                                     self._workspace_dir())
+        entries = self.registry.load()['projects']
+        actions = []
+
+        if 'stale' in policies:
+            stale = stale_projects({name: entries.get(name, {}) for name in projects},
+                                   unused_days)
+            for name, idle_days in sorted(stale.items()):
+                project = projects[name]
+                ctx = project.compose
+                image_size = inventory.images.get(name, 0)
+                if not delete_projects:
+                    if image_size:
+                        actions.append(GcAction(
+                            'stale', name, f'Containers and image, unused for {idle_days} days',
+                            size=image_size,
+                            commands=[(ctx.command('down', '--rmi', 'local'), False)]))
+                    continue
+
+                # The database files belong to the user of the db container
+                commands = [
+                    (ctx.command('run', '--rm', '--no-deps', '-T', '--entrypoint', 'sh', 'db',
+                                 '-c', 'rm -rf /var/lib/postgresql/data/* '
+                                       '/var/lib/postgresql/data/.[!.]*'), True),
+                    (ctx.command('down', '--rmi', 'local'), False),
+                ]
+                network = f'net_{name}'
+                if network in inventory.networks:
+                    commands.append((['docker', 'network', 'rm', network], True))
+                actions.append(GcAction(
+                    'stale', name, f'Whole project, unused for {idle_days} days',
+                    size=image_size + dir_size(project.data.project_path),
+                    commands=commands, paths=[project.data.project_path]))
+
+        if 'images' in policies:
+            superseded = {}
+            for image_id, name, size in inventory.superseded:
+                superseded.setdefault(name, []).append((image_id, size))
+            for name, images in sorted(superseded.items()):
+                actions.append(GcAction(
+                    'images', name, f'{len(images)} image(s) replaced by a newer build',
+                    size=sum(size for _id, size in images),
+                    commands=[(['docker', 'image', 'rm'] + [image_id for image_id, _size in images],
+                               False)]))
+
+        if 'networks' in policies:
+            for network in orphan_networks(inventory, projects):
+                actions.append(GcAction(
+                    'networks', network, 'Network of a project not in the workspace anymore',
+                    commands=[(['docker', 'network', 'rm', network], False)]))
+
+        if 'build-cache' in policies and inventory.build_cache_reclaimable:
+            actions.append(GcAction(
+                'build-cache', 'docker', f'Build cache unused for {unused_days} days',
+                size=inventory.build_cache_reclaimable, estimate=True,
+                commands=[(['docker', 'builder', 'prune', '--force',
+                            '--filter', f'until={unused_days * 24}h'], False)]))
+        return actions
+
+    @handle_error
+    def gc(self, policies: tuple = (),  # pylint: disable=invalid-name
+           unused_days: int = DEF_UNUSED_DAYS,
+           delete_projects: bool = False, dry_run: bool = False, yes: bool = False) -> None:
+        """
+        Function called to execute the `gc` command.
+        The plan is displayed and confirmed before anything is removed.
+
+        Args:
+            policies (tuple, optional): `stale`, `images`, `networks`, `build-cache`.
+                                        Defaults to all of them.
+            unused_days (int, optional): Days after which a project or the build cache is stale.
+            delete_projects (bool, optional): Remove the stale projects entirely,
+                                              instead of their containers and image only.
+            dry_run (bool, optional): Only display the plan. Defaults to False.
+            yes (bool, optional): Don't ask for a confirmation. Defaults to False.
+        """
+        # pylint: disable=import-outside-toplevel
+        from ..utils.disk_usage import GC_POLICIES
+
+        projects = self._projects()
+        actions = self._gc_plan(projects, set(policies or GC_POLICIES),
+                                unused_days, delete_projects)
+        if not actions:
+            click.echo('Nothing to collect.')
+            return
+
+        click.echo('Garbage collection plan:')
+        for action in actions:
+            size = f"{'up to ' if action.estimate else ''}{format_size(action.size)}" \
+                if action.size else '-'
+            click.echo(f'  {action.policy:<12} {action.target:<32} {action.reason:<52} {size}')
+        total = sum(action.size for action in actions)
+        click.echo(f'Up to {format_size(total)} can be reclaimed.')
+
+        if dry_run:
+            return
+        if not yes and not click.confirm('Proceed?', default=False):
+            raise UserAbortError('Garbage collection cancelled.')
+
+        reclaimed = 0
+        for action in actions:
+            try:
+                action.apply()
+            except (OCLIError, OSError) as err:
+                click.echo(click.style(f'  Error: {action.policy} {action.target}: {err}',
+                                       fg='yellow'))
+                continue
+            reclaimed += action.size
+            if action.paths:
+                self.registry.remove(action.target)
+                if self.get_config('active_project') == action.target:
+                    self.set_config('active_project', '')
+                    self.save_config()
+        click.echo(f'About {format_size(reclaimed)} reclaimed.')
+
+    @staticmethod
+    def init(gen) -> None:
+        """
+        Attaches the `list`, `dedupe`, `du` and `gc` commands to the Generator.
+
+        Argument:
+            gen: The `gen` group function.
+        """
+
+        @gen.command(name='list', help='Lists the projects of the workspace')
+        @click.option('-r', '--refresh',
+                      flag_value=True,
+                      help='Rescan the workspace and compute the disk sizes.')
+        def list_projects(refresh: bool = False) -> None:
+            """
+            Entrypoint for the `list` command.
+
+            Args:
+                refresh (bool, optional): Rescan the workspace.
+            """
+            command = ProjectsCommand()
+            command.list(refresh=refresh)
+
+        @gen.command(help='Links the identical filestore files of the projects '
+                          'to a single copy in the workspace')
+        @click.option('-n', '--dry-run',
+                      flag_value=True,
+                      help='Only report the duplicated files and the reclaimable space.')
+        @click.option('-m', '--mode',
+                      type=click.Choice(['hardlink', 'reflink']),
+                      default='hardlink', show_default=True,
+                      help='`reflink` needs a copy-on-write file system (btrfs, xfs).')
+        @click.option('-j', '--jobs',
+                      type=int,
+                      help='Parallel folder listings and hashes. Defaults to the number of CPUs.')
+        def dedupe(dry_run: bool = False, mode: str = 'hardlink', jobs: int = 0) -> None:
+            """
+            Entrypoint for the `dedupe` command.
+
+            Args:
+                dry_run (bool, optional): Only report.
+                mode (str, optional): `hardlink` or `reflink`.
+                jobs (int, optional): Number of parallel jobs.
+            """
+            command = ProjectsCommand()
+            command.dedupe(dry_run=dry_run, mode=mode, jobs=jobs or 0)
+
+        @gen.command(name='du', help='Shows the disk usage of the projects, part by part')
+        @click.argument('project_names', nargs=-1)
+        @click.option('-j', '--jobs',
+                      type=int,
+                      help='Folders measured in parallel. Defaults to the number of CPUs.')
+        def disk_usage(project_names: tuple = (), jobs: int = 0) -> None:
+            """
+            Entrypoint for the `du` command.
+
+            Args:
+                project_names (tuple, optional): The projects. Defaults to all of them.
+                jobs (int, optional): Number of parallel jobs.
+            """
+            command = ProjectsCommand()
+            command.du(project_names=project_names, jobs=jobs or 0)
+
+        @gen.command(name='gc', help='Removes the stale projects data, superseded images, '
+                                     'orphaned networks and old build cache')
+        @click.option('-p', '--policy', 'policies',
+                      type=click.Choice(['stale', 'images', 'networks', 'build-cache']),
+                      multiple=True,
+                      help='Policy to apply, repeatable. Defaults to all of them.')
+        @click.option('-d', '--unused-days',
+                      type=click.IntRange(min=0),
+                      default=DEF_UNUSED_DAYS, show_default=True,
+                      help='Days without start or build after which a project '
+                           '(and the build cache) is stale.')
+        @click.option('--delete-projects',
+                      flag_value=True,
+                      help='Delete the stale projects entirely, data included, '
+                           'instead of their containers and image only.')
+        @click.option('-n', '--dry-run',
+                      flag_value=True,
+                      help='Only show the plan.')
+        @click.option('-y', '--yes',
+                      flag_value=True,
+                      help='Apply the plan without confirmation.')
+        def garbage_collect(policies: tuple = (), unused_days: int = DEF_UNUSED_DAYS,
+                            delete_projects: bool = False, dry_run: bool = False,
+                            yes: bool = False) -> None:
+            """
+            Entrypoint for the `gc` command.
+
+            Args:
+                policies (tuple, optional): The policies to apply.
+                unused_days (int, optional): Days after which a project is stale.
+                delete_projects (bool, optional): Delete the stale projects entirely.
+                dry_run (bool, optional): Only show the plan.
+                yes (bool, optional): Don't ask for a confirmation.
+            """
+            command = ProjectsCommand()
+            command.gc(policies=policies, unused_days=unused_days,
+                       delete_projects=delete_projects, dry_run=dry_run, yes=yes)
@@ -0,0 +1,98 @@
+"""Dedicated space for the test commands."""
+
+import os
+import click
+
+from ..models.abstract.base_command import BaseCommand
+from ..exceptions import handle_error
+
+
+class TestCommand(BaseCommand):
+    """
+    Class that handles the test runs of the project's modules.
+    """
+
+    mode: str = 'test'
+
+    @handle_error
+    def __init__(self, project_name: str = ''):
+        super().__init__()
+
+        self._determine_project(project_name=project_name)
+
+    @handle_error
+    def test(self,  # pylint: disable=too-many-arguments,too-many-positional-arguments
+             modules: tuple,
+             tags: str = '',
+             shards: int = 0,
+             junit: str = '',
+             keep_dbs: bool = False,
+             rebuild_template: bool = False,
+             verbose: bool = False) -> None:
+        """
+        Function called to execute the `test` command
+        """
+        self.project.run_tests(
+            modules=list(modules),
+            tags=tags,
+            shards=shards,
+            # The project's commands run from the project's path
+            junit=os.path.abspath(junit) if junit else '',
+            keep_dbs=keep_dbs,
+            rebuild_template=rebuild_template,
+            verbose=verbose)
+
+    @staticmethod
+    def init(gen) -> None:
+        """
+        Attaches the `test` command to the Generator.
+
+        Argument:
+            gen: The `gen` group function.
+        """
+
+        @gen.command(help='Runs the tests of modules in parallel odoo containers '
+                          'and writes a JUnit XML report')
+        @click.argument('modules', nargs=-1)
+        @click.option('-t', '--tags',
+                      default='',
+                      help='Comma separated test tags, e.g. `/sale,-/sale:TestSlow`. '
+                           'The modules of the tags are tested too.')
+        @click.option('-s', '--shards',
+                      type=int,
+                      help='Number of parallel odoo containers.')
+        @click.option('--junit',
+                      type=click.Path(dir_okay=False),
+                      help='Path of the JUnit XML report. Defaults to `.ogen/test-results.xml`.')
+        @click.option('--keep-dbs',
+                      flag_value=True,
+                      help='Keep the test databases after the run.')
+        @click.option('--rebuild-template',
+                      flag_value=True,
+                      help='Recreate the template database the test databases are copied from.')
+        @click.option('-v', '--verbose',
+                      flag_value=True,
+                      help='Output all the odoo logs.')
+        def test(modules: tuple,  # pylint: disable=too-many-arguments,too-many-positional-arguments
+                 tags: str = '',
+                 shards: int = 0,
+                 junit: str = '',
+                 keep_dbs: bool = False,
+                 rebuild_template: bool = False,
+                 verbose: bool = False) -> None:
+            """
+            Entrypoint for the `test` command.
+
+            Args:
+                modules (tuple): Modules to test.
+                tags (str, optional): Comma separated test tags.
+                shards (int, optional): Number of parallel containers.
+                junit (str, optional): Path of the JUnit report.
+                keep_dbs (bool, optional): Keep the test databases.
+                rebuild_template (bool, optional): Recreate the test template.
+                verbose (bool, optional): Output all the odoo logs.
+            """
+            command = TestCommand()
+            command.test(modules=modules, tags=tags, shards=shards or 0, junit=junit or '',
+                         keep_dbs=keep_dbs, rebuild_template=rebuild_template,
+                         verbose=verbose)
@@ -0,0 +1,73 @@
+"""Dedicated space for the module upgrade commands."""
+
+import click
+
+from ..models.abstract.base_command import BaseCommand
+from ..exceptions import handle_error
+
+
+class UpdateCommand(BaseCommand):
+    """
+    Class that handles the upgrade of the project's modules.
+    """
+
+    mode: str = 'update'
+
+    @handle_error
+    def __init__(self, project_name: str = ''):
+        super().__init__()
+
+        self._determine_project(project_name=project_name)
+
+    @handle_error
+    def update(self,
+               modules: tuple,
+               changed: str = '',
+               include_odoo: bool = False,
+               dry_run: bool = False) -> None:
+        """
+        Function called to execute the `update` command
+        """
+        self.project.update_modules(modules=list(modules),
+                                    changed_since=changed,
+                                    include_odoo=include_odoo,
+                                    dry_run=dry_run)
+
+    @staticmethod
+    def init(gen) -> None:
+        """
+        Attaches the `update` command to the Generator.
+
+        Argument:
+            gen: The `gen` group function.
+        """
+
+        @gen.command(help='Upgrades modules of the active project (`odoo-bin -u`)')
+        @click.argument('modules', nargs=-1)
+        @click.option('-c', '--changed',
+                      is_flag=False, flag_value='ORIG_HEAD', metavar='[REV]',
+                      help='Upgrade the modules changed since the git revision REV '
+                           '(default: ORIG_HEAD, i.e. before the last pull) '
+                           'and the modules depending on them.')
+        @click.option('--odoo', 'include_odoo',
+                      flag_value=True,
+                      help='Look for changed modules in the Odoo sources too.')
+        @click.option('-n', '--dry-run',
+                      flag_value=True,
+                      help='Only show the modules to upgrade.')
+        def update(modules: tuple,
+                   changed: str = '',
+                   include_odoo: bool = False,
+                   dry_run: bool = False) -> None:
+            """
+            Entrypoint for the `update` command.
+
+            Args:
+                modules (tuple): Modules to upgrade.
+                changed (str, optional): Git revision to compare with.
+                include_odoo (bool, optional): Consider the Odoo sources too.
+                dry_run (bool, optional): Only show the modules to upgrade.
+            """
+            command = UpdateCommand()
+            command.update(modules=modules, changed=changed or '',
+                           include_odoo=include_odoo, dry_run=dry_run)
@@ -1,10 +1,15 @@
 """
 Static values used by oGen
 """
+import os
+
 # App
 VERSION = '0.0.4'
 APP_NAME = 'odoo-gen'
 TAB_SIZE = 4 # Number of space chars composing a Tab
+DEF_JOBS = min(os.cpu_count() or 1, 8)  # Parallel jobs of dump, restore, etc
+REGISTRY_FILE = 'projects.json'  # Index of the projects, in the config folder
+DEF_UNUSED_DAYS = 30  # Days without start or build before a project is stale (`ogen gc`)
 
 # Odoo
 SUPPORTED_ODOO_VERSIONS = ['15.0', '16.0']
@@ -14,12 +19,28 @@ ODOO_SHALLOW_CLONE = True
 
 # Docker
 DEF_DOCKER_COMPOSE_VERSION = '3.9'
+DEF_PYTHON_IMAGE = 'python:3.11.5-bookworm'  # Base image of the odoo service
+DEF_IMAGE_RETENTION = 3  # Images kept per project for `ogen build --rollback`
+BUILDS_FILE = 'builds.json'  # Build history, in the project data folder
 
 # PSQL
 DEF_PSQL_VERSION = '14.7'
+DEF_SLOWLOG_MIN_DURATION = 100  # ms, statements slower than this are logged
+IMPORT_STATE_FILE = 'db_import.json'  # Completed phases of `ogen db import`, for the resume
+
+# Tests
+DEF_TEST_SHARDS = max(min((os.cpu_count() or 1) // 2, 4), 1)  # Parallel odoo containers
+
+# Logs
+LOG_SEGMENT_FORMAT = '%Y%m%d%H'  # One segment file per hour (UTC)
 
 # Project Structure
 
+# Folder inside the project where oGen keeps its own data (logs, history, etc)
+PROJECT_DATA_DIR = '.ogen'
+# Merged python requirements (not hash pinned), generated next to the dockerfile
+REQUIREMENTS_MERGED = 'requirements.merged.txt'
+
 # !!! The order of elements in this list is important.
 #     E.g. Odoo repo has to cloned before dockerfile is created.
 EXPECTED_KEY_PATHS = [
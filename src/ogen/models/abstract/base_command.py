@@ -5,7 +5,9 @@ import click
 
 from .base_config import BaseConfig
 from ..project import Project
+from ...utils.registry import ProjectRegistry
 from ...constants import APP_NAME
+from ...constants import REGISTRY_FILE
 from ...exceptions import \
     UserAbortError, \
     ConfigError
@@ -57,6 +59,16 @@ class BaseCommand(BaseConfig):
         """
         return self._config_path
 
+    @property
+    def registry(self) -> ProjectRegistry:
+        """
+        Gets the registry of the workspace projects.
+
+        Returns:
+            ProjectRegistry: The registry.
+        """
+        return ProjectRegistry(os.path.join(self._config_path, REGISTRY_FILE))
+
     def _determine_project(self, project_name: str = ''):
         """
         Initiates the project from arg or from config
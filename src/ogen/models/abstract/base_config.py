@@ -1,11 +1,17 @@
 """
 Abstract definition used in models that have a config
 """
+import io
 import os
+import copy
 import configparser
 import click
 
 from ...exceptions import ConfigError
+from ...utils.fileio import FileLock
+from ...utils.fileio import atomic_write
+
+NO_DEFAULT_SECTION = '__no_default__'
 
 
 class BaseConfig:
@@ -14,6 +20,7 @@ class BaseConfig:
     """
 
     _config: dict
+    _saved_config: dict
     _config_header: str = ''
     _config_path: str
     _config_file: str
@@ -51,46 +58,87 @@ class BaseConfig:
         """
         raise NotImplementedError
 
+    def _read_config_file(self) -> dict:
+        """
+        Reads the config file.
+
+        Raises:
+            ConfigError: When the file can't be parsed.
+
+        Returns:
+            dict: {section: {option: value}}, empty if the file doesn't exist.
+        """
+        # The `DEFAULT` section is read as a regular one,
+        # so its values are not inherited by the other sections.
+        config = configparser.ConfigParser(default_section=NO_DEFAULT_SECTION)
+
+        try:
+            config.read(self._config_file_path)
+        except configparser.Error as err:
+            raise ConfigError(err.message) from err
+
+        return {
+            section_name: dict(config[section_name].items())
+            for section_name in config.sections()
+        }
+
     def load_config(self) -> None:
         """
         Loads the config values from the config file.
         Creates the config file if it doesn't exist.
         """
+        from ...utils import trace  # pylint: disable=import-outside-toplevel
 
         if not os.path.isdir(self._config_path):
             os.makedirs(self._config_path)
 
+        # Values as stored in the file, `save_config` writes only the differences
+        self._saved_config = {}
+
         # Create new config file with default values if no config exists yet
         if not os.path.exists(self._config_file_path):
             click.echo('Configuration file not found. Attempting to create it.')
             self._config = self.get_default_config()
             return
 
-        config = configparser.ConfigParser()
-        self._config = {}
-
-        try:
-            config.read(self._config_file_path)
-        except configparser.Error as err:
-            raise ConfigError(err.message) from err
-
-        for config_item in config.items():
-            section_name = config_item[0]
-            self._config[section_name] = {}
-            for option, value in config[section_name].items():
-                self._config[section_name][option] = value
+        with trace.span('config.load', path=self._config_file_path):
+            self._config = self._read_config_file()
+        self._saved_config = copy.deepcopy(self._config)
 
     def save_config(self) -> None:
         """
-        Saves the current configuration to the file
+        Saves the current configuration to the file.
+        Other oGen commands may have changed the file in the meantime,
+        so it is locked and read again, then only the values changed
+        by this command are applied and the file is replaced atomically.
         """
-        config = configparser.ConfigParser()
-        config.read_dict(self._config)
-
-        with open(self._config_file_path, 'w', encoding='utf8') as conf_file:
+        from ...utils import trace  # pylint: disable=import-outside-toplevel
+        with trace.span('config.save', path=self._config_file_path), \
+                FileLock(self._config_file_path):
+            merged = self._read_config_file()
+
+            for section, values in self._config.items():
+                saved = self._saved_config.get(section, {})
+                for key, value in values.items():
+                    if key not in saved or saved[key] != value:
+                        merged.setdefault(section, {})[key] = value
+
+            for section, values in self._saved_config.items():
+                for key in values:
+                    if key not in self._config.get(section, {}):
+                        merged.get(section, {}).pop(key, None)
+
+            config = configparser.ConfigParser(default_section=NO_DEFAULT_SECTION)
+            config.read_dict(merged)
+
+            content = io.StringIO()
             if self._config_header:
-                conf_file.write(self._config_header)
-            config.write(conf_file)
+                content.write(self._config_header)
+            config.write(content)
+            atomic_write(self._config_file_path, content.getvalue())
+
+        self._config = merged
+        self._saved_config = copy.deepcopy(merged)
 
     def get_config(self, key: str, section: str = 'DEFAULT') -> str:
         """
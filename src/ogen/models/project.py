@@ -1,9 +1,22 @@
 """Project definition and dedicated functionality"""
 
+# The utils of specific commands (logs, stats, tests, snapshots, etc) and yaml
+# are imported on first use, to keep the startup of every `ogen` call fast.
+# pylint: disable=import-outside-toplevel,too-many-lines
+
+import io
 import os
+import re
+import sys
+import time
+import shlex
+import shutil
+import tarfile
+import contextlib
+import subprocess
 import dataclasses
 import configparser
-import yaml
+from typing import IO, TYPE_CHECKING, Iterator, Union
 import click
 
 from .abstract.base_config import BaseConfig
@@ -14,52 +27,56 @@ from ..constants import DEF_ODOO_VERSION
 from ..constants import DEF_ODOO_REPO
 from ..constants import ODOO_SHALLOW_CLONE
 from ..constants import EXPECTED_KEY_PATHS
+from ..constants import PROJECT_DATA_DIR
+from ..constants import DEF_SLOWLOG_MIN_DURATION
+from ..constants import DEF_JOBS
+from ..constants import DEF_TEST_SHARDS
+from ..constants import REQUIREMENTS_MERGED
+from ..constants import DEF_IMAGE_RETENTION
+from ..constants import BUILDS_FILE
+from ..constants import IMPORT_STATE_FILE
 from ..exceptions import \
     ConfigError, \
     IntegrityError, \
     UserAbortError, \
-    InputError
+    InputError, \
+    OCLIError
 
 from ..utils.helper import validate_yml_file
 from ..utils.helper import validate_project_name
 from ..utils.helper import validate_odoo_version
 from ..utils.helper import generate_password
 from ..utils.helper import execute_command
+from ..utils.helper import parse_time_arg
+from ..utils.helper import format_size
+from ..utils.helper import stream_command
+from ..utils.helper import pipe_commands
+from ..utils.helper import safe_extract
+from ..utils.helper import copy_tree
+from ..utils.helper import call_command
 from ..utils.git import GitUtils
 from ..utils.docker_file import DockerFile
 from ..utils.docker_compose import DockerCompose as DC
-
-
-def use_project_path(func: callable) -> callable:
-    """
-    Decorator that switches the current working directory
-    to project's path before executing the wrapped function
-    and switches back to original path after its execution.
-
-    Args:
-        func (function): Function being decorated
-    """
-    def inner(*args, **kwargs):
-        # Get current directory
-        orig_path = os.getcwd()
-
-        project = args and args[0] or False
-
-        if not project or not isinstance(project, Project):
-            raise IntegrityError(
-                'The @use_project_path decorator can be applied '
-                'only to a member function of the Project class.')
-
-        # Switch current directory to project's path
-        os.chdir(project.data.project_path)
-
-        res = func(*args, **kwargs)
-
-        # Switch current directory to original path
-        os.chdir(orig_path)
-        return res
-
-    return inner
+from ..utils.docker_compose import ComposeContext
+from ..utils.postgres import Postgres
+from ..utils.postgres import PG_USER
+from ..utils.postgres import PG_DATA
+from ..utils.addons import AddonsGraph
+from ..utils.addons import AddonsIndex
+from ..utils.addons import find_duplicates
+from ..utils.addons import build_addons_path
+from ..utils.registry import read_project_entry
+from ..utils.registry import dir_size
+from ..utils.fileio import atomic_write
+
+if TYPE_CHECKING:
+    from ..utils.start_profiler import StartProfiler
+    from ..utils.sql_stats import QueryStats
+    from ..utils.db_snapshot import SnapshotStore
+    from ..utils.bundle import BundleReader
+    from ..utils.build_history import BuildHistory
+    import threading
+    from ..utils.db_import import OdooBackup, ImportState
 
 
 @dataclasses.dataclass
@@ -80,7 +97,7 @@ class ProjectData:  # pylint: disable=too-many-instance-attributes
     pg_pass: str = ''
 
 
-class Project(BaseConfig):
+class Project(BaseConfig):  # pylint: disable=too-many-public-methods
     """
     Definition of a project
     """
@@ -123,6 +140,42 @@ class Project(BaseConfig):
         """
         return self.data.project_name
 
+    @property
+    def data_dir(self) -> str:
+        """
+        Path to the folder where oGen keeps project specific data.
+
+        Returns:
+            str: The path.
+        """
+        return os.path.join(self.data.project_path, PROJECT_DATA_DIR)
+
+    @property
+    def compose(self) -> ComposeContext:
+        """
+        The execution context of the project's docker compose commands.
+        It is passed explicitly to every command, the process' working directory
+        is never changed, so several projects can be handled concurrently.
+
+        Returns:
+            ComposeContext: The context.
+        """
+        return ComposeContext(
+            project_dir=self.data.project_path,
+            # Same as the default of compose: the name of the project folder
+            project_name=self.name.lower(),
+            compose_file=self.get_key_path('docker_compose'))
+
+    @property
+    def postgres(self) -> Postgres:
+        """
+        The Postgres functions, executed in the project's `db` service.
+
+        Returns:
+            Postgres: The Postgres utils bound to the project.
+        """
+        return Postgres(self.compose)
+
     def _prepare_project_data(self, input_data: dict) -> None:
         """
         Parses the input data and initializes the ProjectData object.
@@ -180,6 +233,7 @@ class Project(BaseConfig):
         """
         Generates the folders structure of the project
         """
+        from ..utils import trace
         project_structure = self.get_structure()
 
         green_project_name = click.style(self.name, fg='green')
@@ -192,10 +246,55 @@ class Project(BaseConfig):
         }
         self.git_repos = {}
 
-        self._create_structure(project_structure, self.data.project_path)
+        with trace.span('project.create_structure', structure=self.data.project_structure):
+            self._create_structure(project_structure, self.data.project_path)
+
+        # Keep the key paths, relative to the project, for the later commands
+        self._config['key_paths'] = {
+            key: os.path.relpath(path, self.data.project_path)
+            for key, path in self.key_paths.items() if key != 'project'
+        }
 
         self.save_config()
 
+    def get_key_path(self, key: str) -> str:
+        """
+        Returns the absolute path of a key path of the project.
+        Projects created before the key paths were stored in `.ogen.conf`
+        fall back on the default structure.
+
+        Args:
+            key (str): The key path, e.g. `odoo_data`.
+
+        Raises:
+            ConfigError: When the key path can't be determined.
+
+        Returns:
+            str: The path.
+        """
+        rel_path = self.get_config(key, section='key_paths') \
+            or self._default_key_paths().get(key)
+
+        if not rel_path:
+            raise ConfigError(
+                f'Cannot determine the path of `{key}` for the project {self.name}')
+
+        return os.path.join(self.data.project_path, rel_path)
+
+    @staticmethod
+    def _default_key_paths(struct: Union[dict, None] = None, path: str = '') -> dict:
+        """
+        Computes the relative key paths of the default project structure.
+        """
+        res = {}
+        for name, val in (struct or DEF_PROJECT_STRUCTURE).items():
+            f_path = os.path.join(path, name)
+            if val.get('key'):
+                res[val['key']] = f_path
+            if val.get('childs'):
+                res.update(Project._default_key_paths(val['childs'], f_path))
+        return res
+
     def _create_structure(self, struct: dict, path: str) -> None:
         """
         Recursive function that generates a folders structure based on input definition.
@@ -235,6 +334,7 @@ class Project(BaseConfig):
         Returns:
             dict: the project structure
         """
+        import yaml
         # struct_file_name = DEF_STRUCTURE_YML
 
         # if custom_structure and validate_yml_file(custom_structure):
@@ -262,6 +362,7 @@ class Project(BaseConfig):
         """
         Generates the default.yml file that represents default structure supported by oGen
         """
+        import yaml
         f_path = os.path.join(self.command.conf_dir, DEF_STRUCTURE_YML)
 
         click.echo(f'Default structure definition not found.{os.linesep}'
@@ -332,6 +433,7 @@ class Project(BaseConfig):
         - Populating a file
         - etc
         """
+        from ..utils import trace
         for key in EXPECTED_KEY_PATHS:
             key_action = f'_key_path_{key}'
 
@@ -344,7 +446,8 @@ class Project(BaseConfig):
             if not callable(f_key_action):
                 continue
 
-            f_key_action(path)
+            with trace.span(key_action, path=path):
+                f_key_action(path)
 
     def _key_path_odoo(self, path: str) -> None:
         """
@@ -355,10 +458,12 @@ class Project(BaseConfig):
         """
         odoo_repo = self.git_repos.get('odoo', DEF_ODOO_REPO)
 
+        from ..utils.prefetch import sources_cache_path
         git = GitUtils(repo=odoo_repo,
                        branch=self.data.odoo_version,
                        shallow=ODOO_SHALLOW_CLONE)
-        git.clone(path)
+        git.clone(path, cache=sources_cache_path(
+            self.data.workspace_path, odoo_repo))
 
     def _key_path_custom_addons(self, path: str) -> None:
         """
@@ -387,6 +492,7 @@ class Project(BaseConfig):
         Args:
             path (str): The path to the dockerfile
         """
+        self.update_requirements()
         docker_file = DockerFile(self.data.odoo_version, self.key_paths)
 
         with open(path, 'w', encoding='utf8') as file_handle:
@@ -435,11 +541,7 @@ class Project(BaseConfig):
 
         config['options'] = {
             'admin_passwd': admin_pass,
-            'addons_path': ','.join([
-                '/mnt/odoo/odoo/addons',
-                '/mnt/odoo/addons',
-                '/mnt/addons'
-            ]),
+            'addons_path': ','.join(self.get_addons_path()),
             'data_dir': '/var/lib/odoo',
             'db_host': 'db',
             'db_port': '5432',
@@ -474,21 +576,118 @@ class Project(BaseConfig):
 
 # region STEP 3: Build docker image
 
-    @use_project_path
-    def build(self) -> None:
+    def build(self, no_cache: bool = True) -> None:
         """
         Builds the docker image
+
+        Args:
+            no_cache (bool, optional): Rebuild every layer. Defaults to True.
+                                       A new project reuses the layers warmed by `ogen prefetch`.
         """
         if self.data.no_build:
             click.echo('Skip building the docker image')
             click.echo('Execute this later by running `ogen build`')
             return
-        DC.build(no_cache=True)
+        self.update_requirements()
+        fingerprint = self.build_fingerprint()
+        DC.build(self.compose, no_cache=no_cache, labels={
+            'ogen.project': self.name,
+            'ogen.odoo_version': self._odoo_version,
+            'ogen.fingerprint': fingerprint,
+        })
 
         if not self.data.docker_network_name:
             self.data.docker_network_name = f'net_{self.name}'
 
-        DC.create_network(self.data.docker_network_name)
+        DC.create_network(self.data.docker_network_name, self.data.workspace_path)
+
+        image_id = DC.image_id(self.compose)
+        if image_id:
+            self._record_build(image_id, fingerprint)
+        self.register({'image_id': image_id, 'build_date': time.time()})
+
+    @property
+    def _odoo_version(self) -> str:
+        return self.get_config('odoo_version') or self.data.odoo_version
+
+    @property
+    def build_history(self) -> 'BuildHistory':
+        """
+        The images built for the project.
+
+        Returns:
+            BuildHistory: The history.
+        """
+        from ..utils.build_history import BuildHistory
+        return BuildHistory(os.path.join(self.data_dir, BUILDS_FILE), self.compose.project_name)
+
+    def build_fingerprint(self) -> str:
+        """
+        Hashes the inputs of the image: the Odoo version and the files
+        next to the dockerfile (dockerfile, merged requirements, entrypoint).
+
+        Returns:
+            str: The fingerprint.
+        """
+        import hashlib
+        digest = hashlib.sha256(self._odoo_version.encode('utf8'))
+        docker_dir = os.path.dirname(self.get_key_path('docker_file'))
+        for name in sorted(os.listdir(docker_dir)):
+            path = os.path.join(docker_dir, name)
+            if not os.path.isfile(path):
+                continue
+            digest.update(name.encode('utf8'))
+            with open(path, 'rb') as build_file:
+                digest.update(build_file.read())
+        return digest.hexdigest()[:16]
+
+    def _record_build(self, image_id: str, fingerprint: str) -> None:
+        """
+        Tags the new image with its build number and removes the images
+        beyond the retention (`image_retention` of the project config).
+        """
+        history = self.build_history
+        build = history.add(image_id, fingerprint, self._odoo_version)
+        if not build['new']:
+            click.echo(f"Image unchanged, build #{build['number']} kept.")
+            return
+
+        DC.tag_image(image_id, build['tag'])
+        keep = int(self.get_config('image_retention') or DEF_IMAGE_RETENTION)
+        removed = history.prune(keep)
+        DC.remove_images([old['tag'] for old in removed])
+        click.echo(f"Image tagged {build['tag']}"
+                   + (f', {len(removed)} older image(s) removed.' if removed else '.'))
+
+    def rollback_build(self, number: Union[int, None] = None) -> None:
+        """
+        Makes a previous image the one used by the project, without rebuilding it.
+        The running odoo container is recreated from it.
+
+        Args:
+            number (int, optional): The build number. Defaults to the build before the current one.
+
+        Raises:
+            IntegrityError: When there is no such build or its image was removed.
+        """
+        history = self.build_history
+        build = history.previous(number)
+        if not build:
+            raise IntegrityError(f'No build #{number} in the history of {self.name}.'
+                                 if number is not None
+                                 else f'No previous build of {self.name} to roll back to.')
+
+        try:
+            DC.tag_image(build['tag'], DC.image_name(self.compose))
+        except OCLIError as err:
+            raise IntegrityError(f"The image {build['tag']} is not available anymore.") from err
+        history.set_current(build['number'])
+        self.register({'image_id': build['image_id']})
+
+        click.echo(f"Rolled back to build #{build['number']} of "
+                   f"{time.strftime('%Y-%m-%d %H:%M', time.localtime(build['date']))}.")
+        if self.is_running():
+            DC.recreate(self.compose, 'odoo')
 
 # endregion
 
@@ -514,15 +713,38 @@ class Project(BaseConfig):
         """
         self.command.set_config('active_project', self.name)
 
-    @use_project_path
-    def start(self) -> None:
+    def register(self, values: Union[dict, None] = None, size: bool = False) -> None:
+        """
+        Updates the entry of the project in the workspace registry.
+
+        Args:
+            values (dict, optional): Values set by the current action, e.g. `last_start`.
+            size (bool, optional): Compute the disk size of the project. Defaults to False.
+        """
+        registry = self.command.registry
+        previous = registry.load()['projects'].get(self.name)
+        entry = read_project_entry(self.data.project_path, previous)
+        entry.update(values or {})
+        if size:
+            entry['size'] = dir_size(self.data.project_path)
+            entry['size_date'] = time.time()
+        registry.update(self.name, entry)
+
+    def start(self, profile: bool = False) -> None:
         """
         Starts the current project
 
+        Args:
+            profile (bool, optional): Profile the startup phases until
+                                      the Odoo registry is loaded. Defaults to False.
+
         Raises:
             IntegrityError: In case the project is already running.
             UserAbortError: In case another project is running and the user doesn't want to sop it.
         """
+        from ..utils.start_profiler import StartProfiler
+        profiler = StartProfiler(self.compose) if profile else None
+
         active_project = self._get_active_project()
 
         if active_project.is_running():
@@ -550,34 +772,69 @@ class Project(BaseConfig):
             f'Starting the docker containers for project `{self.name}`...')
 
         # Check if odoo service exists
-        current_status = DC.status()
+        current_status = DC.status(self.compose)
+        if profiler:
+            profiler.mark('ogen_checks')
+            profiler.mark('compose_start')
+
         if not current_status.get('odoo', False):
-            DC.up()
-            return
+            DC.up(self.compose)
+        else:
+            DC.start(self.compose)
+
+        self.register({'last_start': time.time(), 'running': True})
+
+        if profiler:
+            profiler.mark('compose_done')
+            self._report_start_profile(profiler)
+
+    def _report_start_profile(self, profiler: 'StartProfiler') -> None:
+        """
+        Waits for Odoo to load its registry, then prints the startup phases
+        and stores them in the project's start history.
+
+        Args:
+            profiler (StartProfiler): The profiler of the current start.
+        """
+        click.echo('Profiling the startup until the Odoo registry is loaded...')
+        completed = profiler.collect_log_markers()
+        profiler.collect_events()
+
+        previous = profiler.save_history(
+            os.path.join(self.data_dir, 'start_history.jsonl'),
+            extra={'odoo_version': self.get_config('odoo_version')})
 
-        DC.start()
+        if not completed:
+            click.echo(click.style(
+                'Warning: the Odoo registry was not loaded before the timeout.', fg='yellow'))
+        click.echo(os.linesep.join(profiler.format_report(previous)))
 
-    @use_project_path
     def is_running(self) -> bool:
         """
         Checks if `odoo` and `db` for current project are running.
         """
-        status = DC.status(running=True)
+        status = DC.status(self.compose, running=True)
 
         return bool(status.get('odoo', False))
 
-    @use_project_path
-    def restart(self) -> None:
+    def restart(self, all_services: bool = False) -> None:
         """
-        Restarts the current project
+        Restarts the odoo service of the current project.
+        The database server keeps running, unless all the services are requested.
+
+        Args:
+            all_services (bool, optional): Restart the db service too. Defaults to False.
         """
-        click.echo(
-            f'Restarting the docker containers for project `{self.name}`...')
+        if all_services:
+            click.echo(
+                f'Restarting the docker containers for project `{self.name}`...')
+            DC.stop(self.compose)
+            DC.start(self.compose)
+            return
 
-        DC.stop()
-        DC.start()
+        click.echo(f'Restarting the odoo service of project `{self.name}`...')
+        DC.restart(self.compose, ['odoo'])
 
-    @use_project_path
     def stop(self, down: bool = False) -> None:
         """
         Stops the current project
@@ -589,55 +846,1453 @@ class Project(BaseConfig):
         click.echo(
             f'Stopping the docker containers for project `{self.name}`...')
 
+        # Keep the logs, `down` removes them together with the containers
+        self.collect_logs()
+
         if down:
-            DC.down()
+            DC.down(self.compose)
+        else:
+            DC.stop(self.compose)
+
+        self.register({'last_stop': time.time(), 'running': False})
+
+# endregion
+
+# region Database
+
+    def set_slowlog(self, enabled: bool, min_duration: int = 0) -> None:
+        """
+        Enables or disables the slow queries capture in the `db` service.
+        The db container is recreated if it is running.
+
+        Args:
+            enabled (bool): New state.
+            min_duration (int, optional): Threshold of the slow queries in ms.
+                                          Defaults to the last used value.
+        """
+        min_duration = min_duration \
+            or int(self.get_config('slowlog_min_duration') or DEF_SLOWLOG_MIN_DURATION)
+
+        DC.set_service_command(
+            self.compose, 'db',
+            DC.get_db_command(slowlog=enabled, min_duration=min_duration))
+
+        self.set_config('slowlog', 'on' if enabled else 'off')
+        self.set_config('slowlog_min_duration', str(min_duration))
+        self.save_config()
+
+        state = f'enabled (>= {min_duration} ms)' if enabled else 'disabled'
+        click.echo(f'Slow queries capture {state} for project `{self.name}`.')
+
+        if DC.status(self.compose, running=True).get('db', False):
+            click.echo('Recreating the `db` container...')
+            DC.recreate(self.compose, 'db')
+
+    def get_sql_stats(self, source: str = 'stats', since: str = '') -> 'QueryStats':
+        """
+        Aggregates the SQL statements executed on the project's database.
+
+        Args:
+            source (str, optional): `stats` reads `pg_stat_statements`,
+                `logs` parses the slow statements from the `db` service logs.
+                Defaults to 'stats'.
+            since (str, optional): Timestamp or relative duration, used with `logs`.
+
+        Raises:
+            ConfigError: When `pg_stat_statements` is not loaded.
+
+        Returns:
+            QueryStats: The aggregated statements.
+        """
+        from ..utils.sql_stats import QueryStats
+        try:
+            models = self.postgres.table_models(self.name)
+        except IntegrityError:
+            models = {}
+        stats = QueryStats(models=models)
+
+        if source == 'logs':
+            stats.feed_log(self.stream_service_logs('db', since=since))
+            return stats
+
+        try:
+            self.postgres.query('CREATE EXTENSION IF NOT EXISTS pg_stat_statements',
+                                dbname=self.name)
+            output = self.postgres.query(
+                'SELECT query, calls, total_exec_time, max_exec_time '
+                'FROM pg_stat_statements '
+                'WHERE dbid = (SELECT oid FROM pg_database WHERE datname = current_database())',
+                dbname=self.name, csv=True)
+        except IntegrityError as err:
+            raise ConfigError(
+                'Unable to read pg_stat_statements. '
+                'Enable it by running `ogen db slowlog on`.') from err
+
+        stats.feed_stat_statements(output.splitlines())
+        return stats
+
+    @property
+    def filestore_path(self) -> str:
+        """
+        Path to the filestore of the project's database.
+
+        Returns:
+            str: The path.
+        """
+        return os.path.join(self.get_key_path('odoo_data'), 'filestore', self.name)
+
+    def snapshot_db(self, name: str, method: str = 'auto', jobs: int = 0) -> None:
+        """
+        Saves the project's database and filestore as a named snapshot.
+
+        Args:
+            name (str): Snapshot name. An existing snapshot with the same name is replaced.
+            method (str, optional): `dump` uses a parallel directory format pg_dump
+                and needs the database running, `fs` copies the data folder
+                and needs the database stopped. `auto` picks one by the database state.
+            jobs (int, optional): Number of parallel pg_dump jobs. Defaults to the CPU count.
+
+        Raises:
+            IntegrityError: When the method doesn't match the database state.
+        """
+        from ..utils.db_snapshot import SnapshotStore
+        from ..utils.db_snapshot import validate_snapshot_name
+        validate_snapshot_name(name)
+        store = SnapshotStore(os.path.join(self.data_dir, 'snapshots'))
+        db_running = bool(DC.status(self.compose, running=True).get('db', False))
+        method = self._check_snapshot_method(method, db_running)
+        jobs = jobs or DEF_JOBS
+        started = time.time()
+
+        click.echo(f'Saving the database of project `{self.name}` ({method})...')
+        ref = {
+            'created': time.time(),
+            'method': method,
+            'odoo_version': self.get_config('odoo_version'),
+            'objects': {},
+        }
+        # The objects aren't referenced until the ref is saved, kept from a concurrent prune
+        with store.lock(shared=True):
+            if method == 'dump':
+                ref['dump'] = self._snapshot_dump(store, jobs)
+            else:
+                ref.update(self._snapshot_data_dir(store))
+
+            if os.path.isdir(self.filestore_path):
+                click.echo('Saving the filestore...')
+                writer = store.new_object()
+                with tarfile.open(fileobj=writer, mode='w|') as tar:
+                    tar.add(self.filestore_path, arcname='.')
+                ref['objects']['filestore'] = store.commit_object(writer)
+
+            ref['codecs'] = {part: store.object_codec(key)
+                             for part, key in ref['objects'].items()}
+            store.save_ref(name, ref)
+        self._prune_snapshots(store)
+
+        size = format_size(store.ref_size(ref))
+        click.echo(f'Snapshot "{name}" saved in {time.time() - started:.1f}s ({size}).')
+
+    def _snapshot_dump(self, store: 'SnapshotStore', jobs: int) -> dict:
+        """
+        Dumps the database in directory format straight into a staging folder
+        of the store, then moves the dump files to the objects.
+
+        Returns:
+            dict: {file name: object key}
+        """
+        from ..utils.db_snapshot import DUMP_COMPRESSION
+        staging = store.new_staging()
+        try:
+            execute_command(self.postgres.client_command(
+                ['pg_dump', '-Fd', '-Z', str(DUMP_COMPRESSION), '-j', str(jobs),
+                 '-f', '/snapshot/dump', self.name],
+                volumes=[f'{staging}:/snapshot']))
+            return store.add_files(os.path.join(staging, 'dump'), jobs=jobs)
+        finally:
+            shutil.rmtree(staging, ignore_errors=True)
+
+    def _snapshot_data_dir(self, store: 'SnapshotStore') -> dict:
+        """
+        Copies the data folder of the stopped database server into the store:
+        a reflink copy when the file system supports it (instant, the blocks are
+        shared until they change), a compressed tar object otherwise.
+
+        Returns:
+            dict: The entries of the snapshot ref, `tree` or the `db` object.
+        """
+        from ..utils import trace
+        tree = store.new_tree()
+        copy = self.postgres.run_command(
+            ['cp', '-a', '--reflink=always', f'{PG_DATA}/.', f'/snapshots/{tree}'],
+            volumes=[f'{store.path}:/snapshots'])
+        with trace.command_span(copy) as span:
+            return_code = subprocess.call(copy, stdout=subprocess.DEVNULL,
+                                          stderr=subprocess.DEVNULL)
+            span.set(exit_code=return_code)
+        if not return_code:
+            return {'tree': tree}
+
+        self._remove_snapshot_trees(store, [tree])
+        click.echo('No reflink support, the data folder is compressed...')
+        producer = self.postgres.run_command(['tar', '-C', PG_DATA, '-cf', '-', '.'])
+        with trace.command_span(producer) as span, \
+                subprocess.Popen(producer, stdout=subprocess.PIPE) as process:
+            writer = store.new_object(source=process.stdout)
+            return_code = process.wait()
+            span.set(exit_code=return_code)
+            if return_code:
+                writer.abort()
+                raise IntegrityError(f'Saving the database failed with code {return_code}.')
+            return {'objects': {'db': store.commit_object(writer)}}
+
+    def _prune_snapshots(self, store: 'SnapshotStore') -> None:
+        """
+        Removes the objects and trees not referenced by any snapshot,
+        once the snapshots in progress are saved.
+        """
+        with store.lock():
+            store.prune()
+            trees = store.unused_trees()
+            if trees:
+                self._remove_snapshot_trees(store, trees)
+
+    def _remove_snapshot_trees(self, store: 'SnapshotStore', trees: list) -> None:
+        """
+        Removes copies of the data folder, through the `db` service
+        as their files belong to the database user.
+        """
+        execute_command(self.postgres.run_command(
+            ['rm', '-rf'] + [f'/snapshots/{tree}' for tree in trees],
+            volumes=[f'{store.path}:/snapshots']), allow_error=True)
+
+    def _pg_dump_command(self, jobs: int) -> list:
+        """
+        Prepares the parallel pg_dump of the project's database,
+        the dump folder being written to stdout as a tar stream.
+
+        Args:
+            jobs (int): Number of parallel pg_dump jobs.
+
+        Returns:
+            list: The command.
+        """
+        dump_dir = shlex.quote(f'/tmp/ogen_dump_{self.name}')
+        # No compression in pg_dump, the stream is compressed on the host
+        return self.postgres.exec_command([
+            'sh', '-c',
+            f'rm -rf {dump_dir} '
+            f'&& pg_dump -U {PG_USER} -Fd -Z 0 -j {jobs} -f {dump_dir} "{self.name}" '
+            f'&& tar -C {dump_dir} -cf - . ; code=$? ; rm -rf {dump_dir} ; exit $code'])
+
+    def _pg_restore_command(self, jobs: int) -> list:
+        """
+        Prepares the parallel pg_restore into the project's database
+        of a dump read from stdin, as written by `_pg_dump_command`.
+
+        Args:
+            jobs (int): Number of parallel pg_restore jobs.
+
+        Returns:
+            list: The command.
+        """
+        restore_dir = shlex.quote(f'/tmp/ogen_restore_{self.name}')
+        return self.postgres.exec_command([
+            'sh', '-c',
+            f'rm -rf {restore_dir} && mkdir -p {restore_dir} '
+            f'&& tar -C {restore_dir} -xf - '
+            f'&& pg_restore -U {PG_USER} -j {jobs} -d "{self.name}" {restore_dir} '
+            f'; code=$? ; rm -rf {restore_dir} ; exit $code'])
+
+    def _remove_db_tmp_files(self) -> None:
+        """
+        Removes the dump files left in the `db` service container by an interrupted
+        export or import, the killed `docker exec` doesn't run their cleanup.
+        """
+        execute_command(self.postgres.exec_command(
+            ['rm', '-rf', f'/tmp/ogen_dump_{self.name}', f'/tmp/ogen_restore_{self.name}',
+             f'/tmp/ogen_import_{self.name}.dump']), allow_error=True)
+
+    @staticmethod
+    def _check_snapshot_method(method: str, db_running: bool) -> str:
+        if method == 'auto':
+            return 'dump' if db_running else 'fs'
+        if method == 'dump' and not db_running:
+            raise IntegrityError('The `dump` method needs the database running. '
+                                 'Start the project or use the `fs` method.')
+        if method == 'fs' and db_running:
+            raise IntegrityError('The `fs` method needs the database stopped. '
+                                 'Stop the project or use the `dump` method.')
+        return method
+
+    def restore_db(self, name: str, jobs: int = 0) -> None:
+        """
+        Replaces the project's database and filestore with a snapshot.
+
+        Args:
+            name (str): Snapshot name.
+            jobs (int, optional): Number of parallel pg_restore jobs. Defaults to the CPU count.
+        """
+        from ..utils.db_snapshot import SnapshotStore
+        store = SnapshotStore(os.path.join(self.data_dir, 'snapshots'))
+        ref = store.load_ref(name)
+        jobs = jobs or DEF_JOBS
+        started = time.time()
+
+        click.echo(f'Restoring the snapshot "{name}" of project `{self.name}`...')
+        with store.lock(shared=True), self._odoo_stopped() as status:
+            if ref['method'] == 'dump':
+                self._ensure_db_running(status)
+                self.postgres.drop_database(self.name)
+                self.postgres.create_database(self.name)
+                self._restore_dump(store, ref['dump'], jobs)
+            else:
+                db_running = bool(status.get('db', False))
+                if db_running:
+                    DC.stop(self.compose, ['db'])
+                try:
+                    self._restore_data_dir(store, ref)
+                finally:
+                    if db_running:
+                        DC.start(self.compose, ['db'])
+
+            self._restore_filestore(store, ref['objects'].get('filestore'))
+
+        click.echo(f'Snapshot "{name}" restored in {time.time() - started:.1f}s.')
+
+    def _restore_dump(self, store: 'SnapshotStore', files: dict, jobs: int) -> None:
+        """
+        Restores the dump files of a snapshot, linked into a staging folder
+        of the store, with a parallel pg_restore.
+        """
+        staging = store.new_staging()
+        try:
+            store.link_files(files, os.path.join(staging, 'dump'))
+            execute_command(self.postgres.client_command(
+                ['pg_restore', '-j', str(jobs), '-d', self.name, '/snapshot/dump'],
+                volumes=[f'{staging}:/snapshot:ro']))
+        finally:
+            shutil.rmtree(staging, ignore_errors=True)
+
+    def _restore_data_dir(self, store: 'SnapshotStore', ref: dict) -> None:
+        """
+        Replaces the data folder of the stopped database server
+        with the tree or the `db` object of a snapshot.
+        """
+        from ..utils.compression import decompress_command
+        if ref.get('tree'):
+            execute_command(self.postgres.run_command(
+                ['sh', '-c', f'find {PG_DATA} -mindepth 1 -delete '
+                 f'&& cp -a --reflink=auto /snapshots/{ref["tree"]}/. {PG_DATA}/'],
+                volumes=[f'{store.path}:/snapshots:ro']))
+            return
+
+        pipe_commands(decompress_command(store.object_path(ref['objects']['db'])),
+                      self.postgres.run_command([
+                          'sh', '-c',
+                          f'find {PG_DATA} -mindepth 1 -delete && tar -C {PG_DATA} -xpf -']))
+
+    def _restore_filestore(self, store: 'SnapshotStore', key: Union[str, None]) -> None:
+        """
+        Replaces the filestore of the project's database with the one stored in the object.
+        """
+        from ..utils.compression import decompress_command
+        if not key:
+            return
+
+        click.echo('Restoring the filestore...')
+        tmp_path = f'{self.filestore_path}.restore'
+        if os.path.isdir(tmp_path):
+            shutil.rmtree(tmp_path)
+
+        with subprocess.Popen(decompress_command(store.object_path(key)),
+                              stdout=subprocess.PIPE) as process:
+            with tarfile.open(fileobj=process.stdout, mode='r|') as tar:
+                safe_extract(tar, tmp_path)
+
+        if os.path.isdir(self.filestore_path):
+            shutil.rmtree(self.filestore_path)
+        os.replace(tmp_path, self.filestore_path)
+
+    @contextlib.contextmanager
+    def _odoo_stopped(self) -> Iterator[dict]:
+        """
+        Context in which the odoo service is stopped, so no Odoo worker
+        uses the database. The service is started again at the end if it was running.
+
+        Yields:
+            dict: The running services, as returned by DockerCompose.status
+        """
+        status = DC.status(self.compose, running=True)
+        odoo_running = bool(status.get('odoo', False))
+        if odoo_running:
+            DC.stop(self.compose, ['odoo'])
+
+        try:
+            yield status
+        finally:
+            if odoo_running:
+                DC.start(self.compose, ['db', 'odoo'])
+
+    def _ensure_db_running(self, status: dict) -> None:
+        """
+        Starts the db service if needed and waits for it to accept connections.
+
+        Args:
+            status (dict): The running services, as returned by DockerCompose.status
+        """
+        if not status.get('db', False):
+            DC.up(self.compose, services=['db'])
+        self.postgres.wait_ready()
+
+    @property
+    def template_db_name(self) -> str:
+        """
+        Name of the template database of the project.
+
+        Returns:
+            str: The name.
+        """
+        return f'{self.name}_template'
+
+    def save_db_template(self) -> None:
+        """
+        Freezes the project's database and filestore as a template.
+        The working database can then be reset from it in seconds.
+        """
+        started = time.time()
+        template = self.template_db_name
+        click.echo(f'Saving the database of project `{self.name}` as template...')
+
+        with self._odoo_stopped() as status:
+            self._ensure_db_running(status)
+            self.postgres.terminate_connections(self.name)
+            self._drop_template_db(template)
+            self.postgres.create_database(template, template=self.name)
+            self.postgres.query(
+                f'ALTER DATABASE "{template}" WITH IS_TEMPLATE true ALLOW_CONNECTIONS false')
+
+            template_filestore = os.path.join(os.path.dirname(self.filestore_path), template)
+            if os.path.isdir(template_filestore):
+                shutil.rmtree(template_filestore)
+            if os.path.isdir(self.filestore_path):
+                copy_tree(self.filestore_path, template_filestore)
+
+        click.echo(f'Template `{template}` saved in {time.time() - started:.1f}s.')
+
+    def reset_db_from_template(self, dbname: str = '') -> None:
+        """
+        Recreates a database and its filestore from the project's template,
+        using a file level copy (`CREATE DATABASE ... TEMPLATE`).
+
+        Args:
+            dbname (str, optional): Database to recreate. Defaults to the project's database.
+
+        Raises:
+            IntegrityError: When the template doesn't exist.
+        """
+        started = time.time()
+        dbname = dbname or self.name
+        template = self.template_db_name
+
+        with self._odoo_stopped() as status:
+            self._ensure_db_running(status)
+            if not self.postgres.database_exists(template):
+                raise IntegrityError(
+                    f'The template `{template}` doesn\'t exist. '
+                    'Create it by running `ogen db template save`.')
+
+            click.echo(f'Resetting the database `{dbname}` from the template...')
+            self.postgres.drop_database(dbname)
+            self.postgres.create_database(dbname, template=template)
+
+            filestores = os.path.dirname(self.filestore_path)
+            db_filestore = os.path.join(filestores, dbname)
+            if os.path.isdir(db_filestore):
+                shutil.rmtree(db_filestore)
+            if os.path.isdir(os.path.join(filestores, template)):
+                copy_tree(os.path.join(filestores, template), db_filestore)
+
+        click.echo(f'Database `{dbname}` reset in {time.time() - started:.1f}s.')
+
+    def drop_db_template(self) -> None:
+        """
+        Removes the template database and its filestore.
+        """
+        with self._odoo_stopped() as status:
+            self._ensure_db_running(status)
+            self._drop_template_db(self.template_db_name)
+
+        template_filestore = os.path.join(
+            os.path.dirname(self.filestore_path), self.template_db_name)
+        if os.path.isdir(template_filestore):
+            shutil.rmtree(template_filestore)
+
+        click.echo(f'Template `{self.template_db_name}` removed.')
+
+    def _drop_template_db(self, template: str) -> None:
+        # A template database can't be dropped
+        if self.postgres.database_exists(template):
+            self.postgres.query(f'ALTER DATABASE "{template}" WITH IS_TEMPLATE false')
+        self.postgres.drop_database(template)
+
+    def list_snapshots(self) -> None:
+        """
+        Outputs the snapshots of the project.
+        """
+        from ..utils.db_snapshot import SnapshotStore
+        store = SnapshotStore(os.path.join(self.data_dir, 'snapshots'))
+        refs = store.list_refs()
+        if not refs:
+            click.echo(f'No snapshots found for project `{self.name}`.')
+            return
+
+        for ref in refs:
+            created = time.strftime('%Y-%m-%d %H:%M', time.localtime(ref['created']))
+            parts = '+'.join(['db'] + [part for part in ref['objects'] if part != 'db'])
+            # The reflink copies share their blocks with the database, not counted
+            size = format_size(store.ref_size(ref)) + (' +reflink' if ref.get('tree') else '')
+            click.echo(f"  {ref['name']:<24} {created}  {ref['method']:<4} "
+                       f"{parts:<12} {size:>10}")
+
+    # pylint: disable-next=too-many-locals
+    def import_backup(self, path: str, jobs: int = 0, neutralize: bool = True,
+                      neutralize_sql: str = '', restart: bool = False) -> None:
+        """
+        Replaces the project's database and filestore with a backup of the Odoo
+        database manager (e.g. of the production), then neutralizes the database.
+        The dump is restored while the filestore is extracted. The completed phases
+        are recorded, an interrupted import resumes with the remaining ones.
+
+        Args:
+            path (str): The backup: zip with `dump.sql` and filestore, or pg_dump custom format.
+            jobs (int, optional): Number of parallel pg_restore jobs and filestore threads.
+                Defaults to the CPU count.
+            neutralize (bool, optional): Disable the crons and the mail servers
+                and reset the passwords. Defaults to True.
+            neutralize_sql (str, optional): File of SQL statements run after the default
+                neutralization. Defaults to the `neutralize_sql` of the project config.
+            restart (bool, optional): Run all the phases again. Defaults to False.
+
+        Raises:
+            InputError: When the neutralization file is missing.
+            IntegrityError: When the backup can't be read or restored.
+        """
+        from ..utils import trace
+        from ..utils.db_import import OdooBackup, ImportState
+        from ..utils.db_import import IMPORT_PHASES, NEUTRALIZE_SQL
+        jobs = jobs or DEF_JOBS
+        started = time.time()
+
+        sql = NEUTRALIZE_SQL
+        neutralize_sql = neutralize_sql or self.get_config('neutralize_sql') or ''
+        if neutralize and neutralize_sql:
+            neutralize_sql = os.path.join(self.data.project_path,
+                                          os.path.expanduser(neutralize_sql))
+            if not os.path.isfile(neutralize_sql):
+                raise InputError(f'The neutralization file "{neutralize_sql}" doesn\'t exist.')
+            with open(neutralize_sql, 'r', encoding='utf8') as sql_file:
+                sql += sql_file.read()
+
+        with OdooBackup(path) as backup:
+            odoo_version = self.get_config('odoo_version')
+            if backup.odoo_version and backup.odoo_version != odoo_version:
+                click.echo(click.style(
+                    f'The backup is of Odoo {backup.odoo_version}, '
+                    f'project `{self.name}` runs Odoo {odoo_version}.', fg='yellow'))
+
+            state = ImportState(os.path.join(self.data_dir, IMPORT_STATE_FILE),
+                                backup.fingerprint(), restart=restart)
+            resumed = [phase for phase in IMPORT_PHASES if not state.pending(phase)]
+            if resumed:
+                click.echo(f'Resuming the import, already done: {", ".join(resumed)}.')
+
+            click.echo(f'Importing "{path}" into project `{self.name}`...')
+            with self._odoo_stopped() as status:
+                self._ensure_db_running(status)
+                self._import_backup_data(backup, state, jobs)
+
+                if neutralize and state.pending('neutralize'):
+                    click.echo('Neutralizing the database...')
+                    phase_started = time.time()
+                    try:
+                        with trace.span('db_import.neutralize'):
+                            self.postgres.query(sql, dbname=self.name)
+                    except IntegrityError as err:
+                        raise IntegrityError(
+                            'Neutralizing the database failed. Fix the statements and run '
+                            '`ogen db import` again, the import resumes there.') from err
+                    state.complete('neutralize', time.time() - phase_started)
+
+        for phase in IMPORT_PHASES:
+            if phase in state.done:
+                note = ' (previous run)' if phase in resumed else ''
+                click.echo(f'  {phase:<12} {state.done[phase]:>7.1f}s{note}')
+            else:
+                click.echo(f'  {phase:<12} {"skipped":>8}')
+        state.clear()
+        click.echo(f'Backup imported in {time.time() - started:.1f}s.')
+
+    def _import_backup_data(self, backup: 'OdooBackup', state: 'ImportState',
+                            jobs: int) -> None:
+        """
+        Restores the dump of the backup and, in a thread, extracts its filestore.
+        The extraction stops when the restore fails.
+        """
+        import threading
+        from concurrent.futures import ThreadPoolExecutor
+        cancel = threading.Event()
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            filestore = None
+            if state.pending('filestore') and backup.filestore_members():
+                click.echo('Copying the filestore...')
+                filestore = executor.submit(self._import_backup_filestore, backup, jobs, cancel)
+
+            try:
+                if state.pending('database'):
+                    phase_started = time.time()
+                    self._restore_backup_dump(backup, jobs)
+                    state.complete('database', time.time() - phase_started)
+            except BaseException:
+                cancel.set()
+                raise
+
+            if filestore is not None:
+                state.complete('filestore', filestore.result())
+
+    def _import_backup_filestore(self, backup: 'OdooBackup', jobs: int,
+                                 cancel: 'threading.Event') -> float:
+        """
+        Replaces the filestore of the project's database with the one of the backup.
+
+        Returns:
+            float: The duration in seconds.
+        """
+        from ..utils import trace
+        started = time.time()
+        tmp_path = f'{self.filestore_path}.import'
+        if os.path.isdir(tmp_path):
+            shutil.rmtree(tmp_path)
+
+        with trace.span('db_import.filestore'):
+            backup.extract_filestore(tmp_path, jobs, cancel=cancel)
+        if cancel.is_set():
+            shutil.rmtree(tmp_path, ignore_errors=True)
+            return time.time() - started
+
+        if os.path.isdir(self.filestore_path):
+            shutil.rmtree(self.filestore_path)
+        os.replace(tmp_path, self.filestore_path)
+        return time.time() - started
+
+    def _restore_backup_dump(self, backup: 'OdooBackup', jobs: int) -> None:
+        """
+        Recreates the project's database from the dump of the backup,
+        streamed to psql (plain format) or to a parallel pg_restore (custom format).
+        """
+        from ..utils import trace
+        from ..utils.db_import import SKIPPED_STATEMENTS
+        click.echo(f'Restoring the database ({backup.dump_format} format)...')
+        self.postgres.drop_database(self.name)
+        self.postgres.create_database(self.name)
+
+        if backup.dump_format == 'custom':
+            command = self._pg_restore_file_command(jobs)
+        else:
+            # Stops at the first error, rolling back the whole restore. The statements
+            # failing on the dumps made without owner are left out (SKIPPED_STATEMENTS)
+            command = self.postgres.exec_command(
+                ['psql', '-X', '-q', '-1', '-v', 'ON_ERROR_STOP=1', '-U', PG_USER,
+                 '-d', self.name, '-o', '/dev/null'])
+
+        with trace.command_span(command) as span:
+            restore = subprocess.Popen(  # pylint: disable=consider-using-with
+                command, stdin=subprocess.PIPE)
+            try:
+                size = backup.copy_dump(
+                    restore.stdin, skip=SKIPPED_STATEMENTS if backup.dump_format == 'sql' else ())
+                restore.stdin.close()
+            except BrokenPipeError:
+                # The restore exited early, its exit code is reported below
+                size = 0
+            except BaseException:
+                restore.kill()
+                restore.wait()
+                self._remove_db_tmp_files()
+                raise
+            return_code = restore.wait()
+            span.set(exit_code=return_code, size=size)
+
+        if return_code:
+            raise IntegrityError(f'Restoring the database failed with code {return_code}.')
+
+    def _pg_restore_file_command(self, jobs: int) -> list:
+        """
+        Prepares the parallel pg_restore into the project's database of a custom
+        format dump read from stdin. pg_restore needs a seekable file to run
+        several jobs, the dump is written first in the container.
+
+        Args:
+            jobs (int): Number of parallel pg_restore jobs.
+
+        Returns:
+            list: The command.
+        """
+        dump_file = shlex.quote(f'/tmp/ogen_import_{self.name}.dump')
+        return self.postgres.exec_command([
+            'sh', '-c',
+            f'cat > {dump_file} '
+            f'&& pg_restore -U {PG_USER} -j {jobs} --no-owner --no-privileges '
+            f'-d "{self.name}" {dump_file} '
+            f'; code=$? ; rm -f {dump_file} ; exit $code'])
+
+# endregion
+
+# region Bundles
+
+    # pylint: disable-next=too-many-locals
+    def export_bundle(self, dest: IO, include_odoo: bool = False, jobs: int = 0) -> None:
+        """
+        Streams the project as a bundle: its files, a parallel dump of the database
+        and the filestore. The Odoo sources are left out, unless requested,
+        and fetched again by commit on import.
+        The messages go to stderr, the bundle may be written to stdout.
+
+        Args:
+            dest (file): Binary file receiving the bundle, e.g. stdout.
+            include_odoo (bool, optional): Add the Odoo sources. Defaults to False.
+            jobs (int, optional): Number of parallel pg_dump jobs. Defaults to the CPU count.
+
+        Raises:
+            IntegrityError: When the dump fails.
+        """
+        from ..utils import trace
+        from ..utils.bundle import BundleWriter
+        from ..utils.bundle import PROJECT_DIR, DATABASE_DIR, FILESTORE_DIR
+        jobs = jobs or DEF_JOBS
+        started = time.time()
+
+        odoo_path = self.get_key_path('odoo')
+        odoo_source = {} if include_odoo else GitUtils.head(odoo_path)
+        if not include_odoo and not odoo_source:
+            click.echo(f'The Odoo sources of `{self.name}` are not a git checkout, '
+                       'they are added to the bundle.', err=True)
+
+        exclude = [self.data_dir, self.get_key_path('db_data'), self.get_key_path('odoo_data'),
+                   f'{self._config_file_path}.lock']
+        if odoo_source:
+            exclude.append(odoo_path)
+
+        self._ensure_db_running(DC.status(self.compose, running=True))
+
+        with BundleWriter(dest) as bundle:
+            bundle.add_manifest({
+                'project_name': self.name,
+                'odoo_version': self.get_config('odoo_version'),
+                'odoo_source': odoo_source,
+                'created': time.time(),
+            })
+
+            click.echo(f'Exporting the files of project `{self.name}`...', err=True)
+            with trace.span('bundle.project_files'):
+                bundle.add_tree(self.data.project_path, PROJECT_DIR, exclude=exclude)
+
+            click.echo('Exporting the database...', err=True)
+            producer = self._pg_dump_command(jobs)
+            with trace.command_span(producer) as span, \
+                    subprocess.Popen(producer, stdout=subprocess.PIPE) as process:
+                try:
+                    size = bundle.add_stream(process.stdout, DATABASE_DIR)
+                except BaseException:
+                    process.kill()
+                    process.wait()
+                    self._remove_db_tmp_files()
+                    raise
+                return_code = process.wait()
+                span.set(exit_code=return_code, size=size)
+            if return_code:
+                raise IntegrityError(f'Dumping the database failed with code {return_code}.')
+
+            if os.path.isdir(self.filestore_path):
+                click.echo('Exporting the filestore...', err=True)
+                with trace.span('bundle.filestore'):
+                    bundle.add_tree(self.filestore_path, FILESTORE_DIR)
+
+        click.echo(f'Project `{self.name}` exported in {time.time() - started:.1f}s '
+                   f'(database dump {format_size(size)}).', err=True)
+
+    def import_bundle(self, bundle: 'BundleReader', jobs: int = 0) -> None:
+        """
+        Creates the project from a bundle read as a stream: the files are extracted,
+        the dump parts are piped into pg_restore as they arrive
+        and the Odoo sources are fetched by commit when they aren't in the bundle.
+
+        Args:
+            bundle (BundleReader): The opened bundle.
+            jobs (int, optional): Number of parallel pg_restore jobs. Defaults to the CPU count.
+
+        Raises:
+            IntegrityError: When the restore fails.
+        """
+        from ..utils.bundle import PROJECT_DIR, DATABASE_DIR, FILESTORE_DIR
+        jobs = jobs or DEF_JOBS
+        started = time.time()
+        click.echo(f'Importing project `{self.name}`...')
+
+        restore = None
+        try:
+            for member in bundle:
+                section = bundle.section(member)
+                if section == PROJECT_DIR:
+                    bundle.extract(member, self.data.project_path)
+                elif section == DATABASE_DIR:
+                    if restore is None:
+                        restore = self._start_bundle_restore(jobs)
+                    bundle.copy(member, restore.stdin)
+                elif section == FILESTORE_DIR:
+                    bundle.extract(member, self.filestore_path)
+            if restore is not None:
+                restore.stdin.close()
+        except BrokenPipeError:
+            # pg_restore exited early, its exit code is reported below
+            pass
+        except BaseException:
+            if restore is not None:
+                restore.kill()
+                restore.wait()
+                self._remove_db_tmp_files()
+            raise
+
+        if restore is not None:
+            return_code = restore.wait()
+            if return_code:
+                raise IntegrityError(f'Restoring the database failed with code {return_code}.')
+
+        odoo_source = bundle.manifest.get('odoo_source')
+        odoo_path = self.get_key_path('odoo')
+        if odoo_source and not (os.path.isdir(odoo_path) and os.listdir(odoo_path)):
+            GitUtils(repo=odoo_source['repo']).checkout_commit(odoo_path, odoo_source['commit'])
+
+        self.register({'created': time.time()}, size=True)
+        click.echo(f'Project `{self.name}` imported in {time.time() - started:.1f}s.')
+        click.echo('Run `ogen build` to build its docker image.')
+
+    def _start_bundle_restore(self, jobs: int) -> subprocess.Popen:
+        """
+        Starts the database server of the project being imported
+        and the pg_restore reading the dump from its stdin.
+        """
+        # The project files were extracted, the config now has the key paths
+        self.load_config()
+        DC.create_network(f'net_{self.name}', self.data.workspace_path)
+        self._ensure_db_running({})
+        self.postgres.create_database(self.name)
+
+        click.echo('Restoring the database...')
+        return subprocess.Popen(  # pylint: disable=consider-using-with
+            self._pg_restore_command(jobs), stdin=subprocess.PIPE)
+
+# endregion
+
+# region Modules
+
+    def _addons_roots(self, include_odoo: bool = False) -> list:
+        """
+        Host paths of the addons folders, in the order of Odoo's addons_path.
+
+        Args:
+            include_odoo (bool, optional): Include the addons of the Odoo sources.
+
+        Returns:
+            list: The paths.
+        """
+        roots = []
+        if include_odoo:
+            odoo_path = self.get_key_path('odoo')
+            roots += [os.path.join(odoo_path, 'odoo', 'addons'),
+                      os.path.join(odoo_path, 'addons')]
+        return roots + [self.get_key_path('custom_addons')]
+
+    @property
+    def addons_index(self) -> AddonsIndex:
+        """
+        Returns:
+            AddonsIndex: The index of the project's modules.
+        """
+        return AddonsIndex(os.path.join(self.data_dir, 'addons_index.json'))
+
+    def get_addons_graph(self, include_odoo: bool = False) -> AddonsGraph:
+        """
+        Builds the dependency graph of the project's modules.
+
+        Args:
+            include_odoo (bool, optional): Include the modules of the Odoo sources.
+
+        Returns:
+            AddonsGraph: The graph.
+        """
+        cache_name = 'addons_graph_odoo.json' if include_odoo else 'addons_graph.json'
+        graph = AddonsGraph(os.path.join(self.data_dir, cache_name), self.addons_index)
+        return graph.load(self._addons_roots(include_odoo))
+
+    def get_addons_path(self) -> list:
+        """
+        Computes the addons_path of the Odoo instance: Odoo's addons folders followed
+        by the folders of the custom addons tree which contain modules.
+
+        Returns:
+            list: The container paths.
+        """
+        modules = self.addons_index.scan(self._addons_roots(include_odoo=True))
+        addons_path = build_addons_path(modules, [
+            (self.get_key_path('odoo'), '/mnt/odoo'),
+            (self.get_key_path('custom_addons'), '/mnt/addons'),
+        ])
+
+        # Keep the root of an empty addons tree, for the modules added later
+        if not any(path.startswith('/mnt/addons') for path in addons_path):
+            addons_path.append('/mnt/addons')
+        return addons_path
+
+    def list_addons(self, include_odoo: bool = False) -> None:
+        """
+        Outputs the modules of the project, flagging the duplicated names.
+
+        Args:
+            include_odoo (bool, optional): Include the modules of the Odoo sources.
+        """
+        # The Odoo modules are always indexed to detect the custom ones they shadow
+        modules = self.addons_index.scan(self._addons_roots(include_odoo=True))
+        duplicates = find_duplicates(modules)
+        custom_addons = self.get_key_path('custom_addons') + os.sep
+        seen = set()
+        listed = set()
+
+        for name, path, _manifest in modules:
+            state = ''
+            if name in duplicates:
+                state = click.style('shadowed' if name in seen else 'duplicated', fg='yellow')
+            seen.add(name)
+            if not include_odoo and not path.startswith(custom_addons):
+                continue
+
+            listed.add(name)
+            rel_path = os.path.relpath(path, self.data.project_path)
+            click.echo(f'  {name:<40} {rel_path}  {state}'.rstrip())
+
+        click.echo(f'{len(listed)} modules found.')
+        for name, paths in duplicates.items():
+            click.echo(click.style(
+                f'Warning: module `{name}` found {len(paths)} times, '
+                f'the first one is used: {paths[0]}', fg='yellow'))
+
+    def write_addons_path(self) -> None:
+        """
+        Updates the addons_path of odoo.conf with the current modules.
+        """
+        conf_path = self.get_key_path('odoo_conf')
+        config = configparser.ConfigParser()
+        config.read(conf_path)
+        if not config.has_section('options'):
+            config.add_section('options')
+
+        addons_path = ','.join(self.get_addons_path())
+        if config['options'].get('addons_path') == addons_path:
+            click.echo('The addons_path is up to date.')
+            return
+
+        config['options']['addons_path'] = addons_path
+        content = io.StringIO()
+        config.write(content)
+        # The running Odoo may read the file at any time
+        atomic_write(conf_path, content.getvalue())
+        click.echo('The addons_path was updated. Restart the project to apply it.')
+
+    def update_requirements(self) -> bool:
+        """
+        Aggregates the python requirements of Odoo and of the custom addons
+        (requirements.txt files) into the merged requirements file installed by the dockerfile.
+        The version conflicts and the modules of the manifests `external_dependencies`
+        without a requirement of the same name are reported, pip resolves the requirements.
+
+        Returns:
+            bool: True if the merged requirements file changed.
+        """
+        from ..utils.requirements import collect_requirements
+        from ..utils.requirements import write_merged_file
+        custom_addons = self.get_key_path('custom_addons')
+        aggregator = collect_requirements(
+            odoo_path=self.get_key_path('odoo'),
+            addons_roots=[custom_addons],
+            modules=self.addons_index.scan([custom_addons]),
+            project_path=self.data.project_path)
+
+        conflicts = aggregator.conflicts()
+        if conflicts:
+            click.echo(f'Conflicting python requirements, pip will fail to install them:'
+                       f'{os.linesep}  ' + f'{os.linesep}  '.join(conflicts), err=True)
+
+        missing = aggregator.missing_imports()
+        if missing:
+            click.echo('Python modules of the manifests `external_dependencies` without '
+                       f'a requirement of the same name:{os.linesep}  '
+                       + f'{os.linesep}  '.join(missing)
+                       + f'{os.linesep}Check that a requirements.txt installs them.', err=True)
+
+        merged_path = os.path.join(
+            os.path.dirname(self.get_key_path('docker_file')), REQUIREMENTS_MERGED)
+        changed = write_merged_file(merged_path, aggregator.merged_lines())
+        click.echo(f'{len(aggregator.packages)} python requirements '
+                   f"{'written to' if changed else 'unchanged in'} "
+                   f'{os.path.relpath(merged_path, self.data.project_path)}')
+        return changed
+
+    def watch(self, debounce: float = 0.5) -> None:
+        """
+        Watches the custom addons and applies the changes to the running instance:
+        - python changes restart the odoo service
+        - data changes (xml, csv) upgrade the changed modules only
+        - static assets need nothing, they are served from the sources
+
+        Args:
+            debounce (float, optional): Seconds without changes before applying them.
+        """
+        from ..utils.file_watcher import FileWatcher
+        if not self.is_running():
+            raise IntegrityError(f'The project `{self.name}` is not running. '
+                                 'Start it by running `ogen start`.')
+
+        watcher = FileWatcher(self.get_key_path('custom_addons'), debounce=debounce)
+        click.echo(f'Watching the addons of project `{self.name}` ({watcher.backend}). '
+                   'Press Ctrl+C to stop.')
+
+        try:
+            for changed_files in watcher.watch():
+                self._apply_changes(changed_files)
+        except KeyboardInterrupt:
+            click.echo('Stopped watching.')
+
+    def _apply_changes(self, changed_files: set) -> None:
+        """
+        Applies a batch of changed files to the running instance.
+
+        Args:
+            changed_files (set): Paths of the changed files.
+        """
+        from ..utils.file_watcher import classify_change
+        started = time.time()
+        graph = self.get_addons_graph()
+        restart = False
+        upgrade = set()
+
+        for path in changed_files:
+            module = graph.module_of(path)
+            kind = classify_change(path)
+            if not module or kind == 'static' or not kind:
+                continue
+            if kind == 'python':
+                restart = True
+            else:
+                upgrade.add(module)
+
+        if upgrade:
+            modules = graph.sorted(upgrade)
+            click.echo(f"Upgrading {', '.join(modules)}...")
+            return_code = call_command(DC.exec_command(self.compose, 'odoo', [
+                'python3', '/mnt/odoo/odoo-bin', '-d', self.name, '-u', ','.join(modules),
+                '--stop-after-init', '--no-http', '--max-cron-threads=0']))
+            if return_code:
+                click.echo(click.style('The upgrade failed, see the output above.', fg='red'))
+                return
+
+        if restart:
+            DC.restart(self.compose, ['odoo'])
+
+        if upgrade or restart:
+            click.echo(f'Changes applied in {time.time() - started:.1f}s.')
+
+    def update_modules(self,
+                       modules: list,
+                       changed_since: str = '',
+                       include_odoo: bool = False,
+                       dry_run: bool = False) -> None:
+        """
+        Upgrades modules with a single `odoo-bin -u`, while the odoo service is stopped.
+
+        Args:
+            modules (list): Modules to upgrade.
+            changed_since (str, optional): Also upgrade the modules changed since this
+                git revision, together with the modules depending on them.
+            include_odoo (bool, optional): Consider the Odoo sources too. Defaults to False.
+            dry_run (bool, optional): Only show the modules to upgrade. Defaults to False.
+
+        Raises:
+            InputError: When there's nothing to upgrade.
+            IntegrityError: When the upgrade fails.
+        """
+        started = time.time()
+        modules = list(modules)
+
+        if changed_since:
+            graph = self.get_addons_graph(include_odoo=include_odoo)
+            roots = [self.get_key_path('custom_addons')]
+            if include_odoo:
+                roots.append(self.get_key_path('odoo'))
+
+            changed_files = []
+            for root in roots:
+                changed_files += GitUtils.changed_files(root, changed_since)
+            changed = graph.upgrade_set(changed_files)
+            modules += [name for name in changed if name not in modules]
+            click.echo(f'{len(changed_files)} files changed since `{changed_since}`.')
+
+        if not modules:
+            if changed_since:
+                click.echo('No module to upgrade.')
+                return
+            raise InputError('Specify the modules to upgrade or use `--changed`.')
+
+        click.echo(f"Modules to upgrade: {', '.join(modules)}")
+        if dry_run:
             return
 
-        DC.stop()
+        with self._odoo_stopped() as status:
+            self._ensure_db_running(status)
+            return_code = call_command(DC.run_command(self.compose, 'odoo', [
+                '--stop-after-init', '--max-cron-threads=0',
+                '-d', self.name, '-u', ','.join(modules)]))
+
+        if return_code:
+            raise IntegrityError('The upgrade of the modules failed.')
+        click.echo(f'{len(modules)} modules upgraded in {time.time() - started:.1f}s.')
+
+# endregion
+
+# region Tests
+
+    @property
+    def test_template_db_name(self) -> str:
+        """
+        Name of the database the test databases are copied from.
+
+        Returns:
+            str: The name.
+        """
+        return f'{self.name}_test_template'
+
+    def _ensure_test_template(self, rebuild: bool = False) -> str:
+        """
+        Creates the template of the test databases (`base` installed), if missing.
+
+        Args:
+            rebuild (bool, optional): Recreate the template. Defaults to False.
+
+        Raises:
+            IntegrityError: When the template can't be initialized.
+
+        Returns:
+            str: The template name.
+        """
+        template = self.test_template_db_name
+        if rebuild:
+            self._drop_template_db(template)
+        elif self.postgres.database_exists(template):
+            return template
+
+        click.echo(f'Creating the test template `{template}`...')
+        self.postgres.create_database(template)
+        return_code = call_command(DC.run_command(self.compose, 'odoo', [
+            '--stop-after-init', '--max-cron-threads=0', '-d', template, '-i', 'base']))
+        if return_code:
+            self._drop_template_db(template)
+            raise IntegrityError(f'Unable to initialize the test template `{template}`.')
+
+        self.postgres.query(
+            f'ALTER DATABASE "{template}" WITH IS_TEMPLATE true ALLOW_CONNECTIONS false')
+        return template
+
+    # pylint: disable-next=too-many-arguments,too-many-locals,too-many-positional-arguments
+    def run_tests(self,
+                  modules: list,
+                  tags: str = '',
+                  shards: int = 0,
+                  junit: str = '',
+                  keep_dbs: bool = False,
+                  rebuild_template: bool = False,
+                  verbose: bool = False) -> None:
+        """
+        Runs the tests of the modules in parallel odoo containers.
+        The modules are split in shards balanced by their historical duration,
+        each shard having its own database copied from a common template.
+
+        Args:
+            modules (list): Modules to test.
+            tags (str, optional): Comma separated test tags (`--test-tags`).
+            shards (int, optional): Number of parallel containers.
+                                    Defaults to DEF_TEST_SHARDS.
+            junit (str, optional): Absolute path of the JUnit XML report.
+                                   Defaults to `.ogen/test-results.xml`.
+            keep_dbs (bool, optional): Keep the test databases. Defaults to False.
+            rebuild_template (bool, optional): Recreate the test template. Defaults to False.
+            verbose (bool, optional): Output all the odoo logs. Defaults to False.
+
+        Raises:
+            InputError: When no module is specified.
+            IntegrityError: When tests fail.
+        """
+        from ..utils.test_runner import ShardedTestRunner
+        from ..utils.test_runner import load_durations
+        from ..utils.test_runner import modules_from_tags
+        from ..utils.test_runner import plan_shards
+        from ..utils.test_runner import tags_for_modules
+        started = time.time()
+        tag_list = [tag.strip() for tag in tags.split(',') if tag.strip()]
+        modules = list(dict.fromkeys(list(modules) + modules_from_tags(tag_list)))
+        if not modules:
+            raise InputError('Specify the modules to test, '
+                             'directly or through the test tags (e.g. `/sale`).')
+
+        history_path = os.path.join(self.data_dir, 'test_durations.json')
+        plan = plan_shards(modules, load_durations(history_path), shards or DEF_TEST_SHARDS)
+
+        self._ensure_db_running(DC.status(self.compose, running=True))
+        template = self._ensure_test_template(rebuild=rebuild_template)
+        filestores = os.path.dirname(self.filestore_path)
+
+        shard_specs = {}
+        for idx, shard_modules in enumerate(plan, 1):
+            shard_tags = tags_for_modules(tag_list, shard_modules)
+            if not shard_tags:
+                # None of the tests of the shard's modules is selected
+                continue
+            dbname = f'{self.name}_test_{idx}'
+            self.postgres.drop_database(dbname)
+            self.postgres.create_database(dbname, template=template)
+            if os.path.isdir(os.path.join(filestores, dbname)):
+                shutil.rmtree(os.path.join(filestores, dbname))
+
+            args = ['--test-enable', '--stop-after-init', '--log-level=test',
+                    '--max-cron-threads=0', '-d', dbname, '-i', ','.join(shard_modules),
+                    '--test-tags', ','.join(shard_tags)]
+            shard_specs[dbname] = (DC.run_command(self.compose, 'odoo', args), shard_modules)
+        if not shard_specs:
+            raise InputError(f'The test tags "{tags}" select no test of the modules.')
+
+        click.echo(f'Running the tests of {len(modules)} modules '
+                   f'in {len(shard_specs)} shards...')
+        runner = ShardedTestRunner(
+            shard_specs, on_progress=lambda name, msg: click.echo(f'[{name}] {msg}'))
+        try:
+            results = runner.run(verbose=verbose)
+        finally:
+            if not keep_dbs:
+                for dbname in shard_specs:
+                    self.postgres.drop_database(dbname)
+                    shutil.rmtree(os.path.join(filestores, dbname), ignore_errors=True)
+
+        junit = junit or os.path.join(self.data_dir, 'test-results.xml')
+        runner.write_junit(results, junit)
+        runner.update_durations(history_path, results)
+
+        tests = sum(len(result.cases) for result in results)
+        failed = sum(result.failed_count + len(result.errors) for result in results)
+        click.echo(f'{tests} tests, {failed} failed in {time.time() - started:.1f}s. '
+                   f'JUnit report: {junit}')
+        if failed:
+            raise IntegrityError(f'{failed} tests failed.', show_details=False)
 
 # endregion
 
 # region Info
 
-    @use_project_path
-    def show_logs(self, follow: bool = False, service: str = '') -> None:
+    def collect_logs(self) -> None:
+        """
+        Appends the new log lines of all services to the project's log store.
+        """
+        from ..utils.log_store import LogStore
+        store = LogStore(os.path.join(self.data_dir, 'logs'))
+        for service in DC.services(self.compose):
+            store.collect(self.compose, service)
+
+    def show_logs(self,  # pylint: disable=too-many-arguments,too-many-positional-arguments
+                  follow: bool = False,
+                  service: str = '',
+                  since: str = '',
+                  until: str = '',
+                  level: str = '',
+                  grep: str = '') -> None:
         """
         Show or follow the logs of all or specified container.
+        When any filter is passed, the logs are searched in the project's log store.
 
         Args:
             service (str, optional): Service to display the logs for. Defaults to ''.
             follow (bool, optional): Follow log output. Defaults to False.
+            since (str, optional): Show logs since timestamp or relative duration.
+            until (str, optional): Show logs before timestamp or relative duration.
+            level (str, optional): Show only logs with this level or higher.
+            grep (str, optional): Show only logs matching this regular expression.
         """
+        from ..utils.log_store import LogStore
+        if service:
+            services = DC.services(self.compose)
+            if service not in services:
+                raise InputError(
+                    f'Invalid value "{service}" for a service. Allowed values: {services}')
+
+        if since or until or level or grep:
+            if follow:
+                raise InputError(
+                    'The --follow option can\'t be combined with '
+                    '--since, --until, --level or --grep.')
+
+            try:
+                re.compile(grep)
+            except re.error as err:
+                raise InputError(f'Invalid value "{grep}" for --grep: {err}') from err
+
+            self.collect_logs()
+            store = LogStore(os.path.join(self.data_dir, 'logs'))
+            for line in store.search(since=parse_time_arg(since),
+                                     until=parse_time_arg(until),
+                                     level=level,
+                                     grep=grep,
+                                     service=service):
+                click.echo(line)
+            return
+
         click.echo(
             f'Showing logs for the project `{self.name}`...')
 
-        command = ['docker', 'compose', 'logs']
+        command = self.compose.command('logs')
         if follow:
             command.append('--follow')
 
         if service:
-            # Getting services from the docker compose
-            service_lines = execute_command(
-                ['docker', 'compose', 'ps', '--services'], return_output=True)
-            services = service_lines.split(os.linesep)
-            if service not in services:
-                raise InputError(
-                    f'Invalid value "{service}" for a service. Allowed values: {services}')
-
             command.append(service)
 
-        execute_command(command)
+        execute_command(command, cwd=self.data.project_path)
+
+    def stream_service_logs(self, service: str,
+                            follow: bool = False,
+                            since: str = '') -> Iterator[str]:
+        """
+        Streams the raw log lines of a service, without keeping them in memory.
+
+        Args:
+            service (str): Service name.
+            follow (bool, optional): Keep streaming the new lines. Defaults to False.
+            since (str, optional): Timestamp or relative duration understood by docker.
+
+        Returns:
+            Iterator[str]: The log lines.
+        """
+        return stream_command(self.service_logs_command(service, follow=follow, since=since),
+                              cwd=self.data.project_path)
+
+    def service_logs_command(self, service: str,
+                             follow: bool = False,
+                             since: str = '') -> list:
+        """
+        Prepares the command printing the raw log lines of a service.
 
-    @use_project_path
-    def show_status(self):
+        Args:
+            service (str): Service name.
+            follow (bool, optional): Keep printing the new lines. Defaults to False.
+            since (str, optional): Timestamp or relative duration understood by docker.
+
+        Returns:
+            list: The command.
+        """
+        command = self.compose.command('logs', '--no-color', '--no-log-prefix')
+        if follow:
+            command += ['--follow', '--tail', '0']
+        if since:
+            command += ['--since', since]
+        command.append(service)
+        return command
+
+    def show_stats(self,
+                   interval: float = 2,
+                   count: int = 0,
+                   record: Union[str, None] = None) -> None:
+        """
+        Samples the CPU, memory, block and network I/O of the project's containers,
+        renders them as a live table and outputs a summary at the end.
+
+        Args:
+            interval (float, optional): Seconds between samples. Defaults to 2.
+            count (int, optional): Number of samples. Defaults to 0, until interrupted.
+            record (str, optional): CSV file where the samples are recorded.
+
+        Raises:
+            IntegrityError: When no container of the project is running.
+        """
+        from ..utils.docker_stats import StatsSampler
+        status = DC.status(self.compose, running=True)
+        if not status:
+            raise IntegrityError(
+                f'The containers for project `{self.name}` are not running',
+                show_details=False)
+
+        sampler = StatsSampler(
+            {service: cont_data['id'] for service, cont_data in status.items()},
+            record_path=record and os.path.abspath(record))
+
+        live = sys.stdout.isatty()
+        taken = 0
+        try:
+            while not count or taken < count:
+                started = time.time()
+                usages = sampler.sample()
+                taken += 1
+
+                if live:
+                    click.clear()
+                    click.echo(f'Resource usage of project `{self.name}` (Ctrl+C to stop)')
+                click.echo(os.linesep.join(sampler.format_table(usages)))
+
+                if count and taken >= count:
+                    break
+                time.sleep(max(interval - (time.time() - started), 0))
+        except KeyboardInterrupt:
+            pass
+
+        if not sampler.summary:
+            return
+
+        click.echo()
+        click.echo('Summary:')
+        click.echo(os.linesep.join(sampler.format_summary()))
+        if record:
+            click.echo(f'Samples recorded in {record}')
+
+    def get_status(self) -> Union[dict, None]:
+        """
+        Retrieves the status of the project's containers.
+        Safe to call from several threads for different projects.
+
+        Returns:
+            dict: The status by service, None when docker compose fails for the project.
+        """
+        try:
+            return DC.status(self.compose)
+        except subprocess.CalledProcessError:
+            return None
+
+    def show_status(self, status: Union[dict, None] = None):
         """
         Outputs status info about the project
+
+        Args:
+            status (dict, optional): The status already retrieved by `get_status`.
         """
         click.echo(f'  Name: {self.name}')
         click.echo(f'  Path: {self.data.project_path}')
         click.echo('  Containers:')
 
-        status = DC.status()
+        if status is None:
+            status = DC.status(self.compose)
         for service, cont_data in status.items():
             state = cont_data['state']
             if state == 'exited':
@@ -2,28 +2,82 @@
 oGen - odoo Command Line Interface - Helper tool for developers working on multiple odoo projects
 """
 
+import importlib
 import click
 
-from .commands import CreateCommand
-from .commands import BuildCommand
-from .commands import ControlCommand
-from .commands import InfoCommand
-
+from .commands import COMMANDS
 from .constants import VERSION
 
 
-@click.group(no_args_is_help=True, invoke_without_command=True)
+class LazyGroup(click.Group):
+    """
+    Group of commands which imports the command modules on first use.
+    A command module is imported only when one of its commands is invoked
+    (or its own help is requested), the main help uses the registered short help.
+    """
+
+    lazy_commands: dict
+
+    def __init__(self, *args, lazy_commands: dict, **kwargs):
+        """
+        Args:
+            lazy_commands (dict): {command name: (module, command class, short help)},
+                                  the modules being relative to `ogen.commands`.
+        """
+        super().__init__(*args, **kwargs)
+        self.lazy_commands = lazy_commands
+
+    def list_commands(self, ctx: click.Context) -> list:
+        return sorted(set(super().list_commands(ctx)) | set(self.lazy_commands))
+
+    def get_command(self, ctx: click.Context, cmd_name: str) -> click.Command:
+        if cmd_name not in self.commands and cmd_name in self.lazy_commands:
+            self._load(cmd_name)
+        return super().get_command(ctx, cmd_name)
+
+    def _load(self, cmd_name: str) -> None:
+        module_name, class_name, _help = self.lazy_commands[cmd_name]
+        module = importlib.import_module(module_name, 'ogen.commands')
+
+        # `init` attaches all the commands of the class
+        holder = click.Group()
+        getattr(module, class_name).init(holder)
+        for name, command in holder.commands.items():
+            self.add_command(command, name)
+
+    def format_commands(self, ctx: click.Context, formatter: click.HelpFormatter) -> None:
+        names = self.list_commands(ctx)
+        if not names:
+            return
+
+        limit = formatter.width - 6 - max(len(name) for name in names)
+        rows = []
+        for name in names:
+            if name in self.commands:
+                if self.commands[name].hidden:
+                    continue
+                rows.append((name, self.commands[name].get_short_help_str(limit)))
+            else:
+                rows.append((name, click.utils.make_default_short_help(
+                    self.lazy_commands[name][2], limit)))
+
+        with formatter.section('Commands'):
+            formatter.write_dl(rows)
+
+
+@click.group(cls=LazyGroup, lazy_commands=COMMANDS,
+             no_args_is_help=True, invoke_without_command=True)
 @click.option('-v', '--version', flag_value=True, help='Show installed version of ogen')
-def gen(version=False):
+@click.option('--trace', 'trace_file', envvar='OGEN_TRACE', type=click.Path(dir_okay=False),
+              metavar='TRACE_FILE',
+              help='Record a Chrome trace of the run in TRACE_FILE (open it in ui.perfetto.dev).')
+def gen(version=False, trace_file=None):
     """
     Generator definition as group of commands.
     Running oGen without a command will trigger the help info.
     """
+    if trace_file:
+        from .utils import trace  # pylint: disable=import-outside-toplevel
+        trace.start(trace_file)
     if version:
         click.echo(f'oGen version {VERSION}')
-
-
-CreateCommand.init(gen)
-BuildCommand.init(gen)
-ControlCommand.init(gen)
-InfoCommand.init(gen)
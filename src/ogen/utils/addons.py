@@ -0,0 +1,319 @@
+"""
+Odoo addons discovery, addons_path generation and dependency graph,
+based on the modules manifests.
+"""
+
+import os
+import ast
+from typing import Iterable, Union
+
+from ..constants import DEF_JOBS
+from ..exceptions import IntegrityError
+from .fileio import load_json
+from .fileio import save_json
+
+MANIFEST_NAMES = ('__manifest__.py', '__openerp__.py')
+# Folders never containing modules
+SKIP_DIRS = ('__pycache__', 'node_modules', 'static', 'tests', 'setup')
+
+
+def read_manifest(path: str) -> dict:
+    """
+    Reads a module manifest without executing it.
+
+    Args:
+        path (str): Path to the manifest file.
+
+    Raises:
+        IntegrityError: When the manifest is not a valid python dict.
+
+    Returns:
+        dict: The manifest content.
+    """
+    with open(path, 'r', encoding='utf8') as manifest_file:
+        content = manifest_file.read()
+
+    try:
+        manifest = ast.literal_eval(content)
+    except (ValueError, SyntaxError) as err:
+        raise IntegrityError(f'Invalid manifest "{path}": {err}') from err
+
+    if not isinstance(manifest, dict):
+        raise IntegrityError(f'Invalid manifest "{path}": not a dictionary.')
+    return manifest
+
+
+class AddonsIndex:  # pylint: disable=too-few-public-methods
+    """
+    Index of the modules found in addons folders, also nested in sub-folders.
+
+    The folders are listed in parallel with `os.scandir` and the listings are cached
+    with the folders mtime: a folder is listed again only if entries were added,
+    removed or renamed in it, so re-indexing an unchanged tree costs one `stat` per folder.
+    """
+
+    cache_path: str
+    jobs: int
+
+    def __init__(self, cache_path: str, jobs: int = DEF_JOBS):
+        """
+        Args:
+            cache_path (str): Path to the json cache file.
+            jobs (int, optional): Number of folders listed in parallel.
+        """
+        self.cache_path = cache_path
+        self.jobs = jobs
+
+    @staticmethod
+    def _list_dir(path: str, cached: Union[dict, None]) -> Union[dict, None]:
+        try:
+            mtime = os.stat(path).st_mtime
+        except OSError:
+            return None
+        if cached and cached['mtime'] == mtime:
+            return cached
+
+        try:
+            entries = list(os.scandir(path))
+        except OSError:
+            return None
+
+        listing = {'mtime': mtime, 'manifest': '', 'dirs': []}
+        names = {entry.name for entry in entries}
+        for name in MANIFEST_NAMES:
+            if name in names:
+                listing['manifest'] = name
+                return listing
+
+        listing['dirs'] = sorted(
+            entry.name for entry in entries
+            if not entry.name.startswith('.') and entry.name not in SKIP_DIRS
+            and entry.is_dir(follow_symlinks=False))
+        return listing
+
+    def scan(self, roots: Iterable[str]) -> list:
+        """
+        Finds the modules of the addons folders.
+
+        Args:
+            roots (Iterable[str]): Addons folders.
+
+        Returns:
+            list: (module name, module path, manifest path) tuples, ordered by root
+                  then by path. Duplicated names are all listed.
+        """
+        # Imported on first use, it weighs on the CLI startup
+        from concurrent.futures import ThreadPoolExecutor  # pylint: disable=import-outside-toplevel
+
+        cache = load_json(self.cache_path)
+        new_cache = {}
+        modules = []
+
+        with ThreadPoolExecutor(max_workers=self.jobs) as executor:
+            for root in roots:
+                root = os.path.abspath(root)
+                found = []
+                level = [root]
+                while level:
+                    # One folder level is listed in parallel
+                    listings = executor.map(
+                        lambda path: self._list_dir(path, cache.get(path)), level)
+                    next_level = []
+                    for path, listing in zip(level, listings):
+                        if listing is None:
+                            continue
+                        new_cache[path] = listing
+                        if listing['manifest'] and path != root:
+                            found.append((os.path.basename(path), path,
+                                          os.path.join(path, listing['manifest'])))
+                        else:
+                            next_level += [os.path.join(path, name)
+                                           for name in listing['dirs']]
+                    level = next_level
+                modules += sorted(found, key=lambda module: module[1])
+
+        if new_cache != cache:
+            save_json(self.cache_path, new_cache)
+        return modules
+
+
+def find_duplicates(modules: list) -> dict:
+    """
+    Args:
+        modules (list): Modules as returned by AddonsIndex.scan
+
+    Returns:
+        dict: {module name: [module paths]} of the names found more than once.
+    """
+    paths = {}
+    for name, path, _manifest in modules:
+        paths.setdefault(name, []).append(path)
+    return {name: mod_paths for name, mod_paths in paths.items() if len(mod_paths) > 1}
+
+
+def build_addons_path(modules: list, mapping: list) -> list:
+    """
+    Computes the minimal addons_path: the folders containing at least one module
+    not shadowed by a module of the same name found before.
+
+    Args:
+        modules (list): Modules as returned by AddonsIndex.scan
+        mapping (list): (host path, container path) pairs of the mounted folders.
+
+    Returns:
+        list: Container paths of the addons folders, in order.
+    """
+    seen = set()
+    folders = []
+    for name, path, _manifest in modules:
+        if name in seen:
+            continue
+        seen.add(name)
+        folder = os.path.dirname(path)
+        if folder not in folders:
+            folders.append(folder)
+
+    res = []
+    for folder in folders:
+        for host_path, container_path in mapping:
+            host_path = os.path.abspath(host_path)
+            if folder == host_path or folder.startswith(host_path + os.sep):
+                rel_path = os.path.relpath(folder, host_path)
+                res.append(container_path if rel_path == '.'
+                           else f"{container_path}/{rel_path.replace(os.sep, '/')}")
+                break
+    return res
+
+
+class AddonsGraph:
+    """
+    Dependency graph of the modules of some addons folders.
+    The parsed manifests are cached and re-read only when their mtime changes.
+    """
+
+    cache_path: str
+    index: AddonsIndex
+    modules: dict
+
+    def __init__(self, cache_path: str, index: AddonsIndex):
+        """
+        Args:
+            cache_path (str): Path to the json cache file.
+            index (AddonsIndex): Index used to find the modules.
+        """
+        self.cache_path = cache_path
+        self.index = index
+        self.modules = {}
+
+    def load(self, roots: Iterable[str]) -> 'AddonsGraph':
+        """
+        Builds the graph of the modules found in the roots.
+        On duplicate names the module of the first root wins, like in Odoo's addons_path.
+
+        Args:
+            roots (Iterable[str]): Addons folders.
+
+        Returns:
+            AddonsGraph: self
+        """
+        cache = load_json(self.cache_path)
+        new_cache = {}
+
+        for name, path, manifest in self.index.scan(roots):
+            if name in self.modules:
+                continue
+            mtime = os.stat(manifest).st_mtime
+            cached = cache.get(manifest)
+            if not cached or cached['mtime'] != mtime:
+                cached = {
+                    'mtime': mtime,
+                    'depends': read_manifest(manifest).get('depends', []),
+                }
+            new_cache[manifest] = cached
+            self.modules[name] = {'path': path, 'depends': cached['depends']}
+
+        if new_cache != cache:
+            save_json(self.cache_path, new_cache)
+        return self
+
+    def module_of(self, path: str) -> str:
+        """
+        Args:
+            path (str): A file path.
+
+        Returns:
+            str: The module containing the file or an empty string.
+        """
+        path = os.path.abspath(path)
+        best = ''
+        best_len = 0
+        for name, module in self.modules.items():
+            mod_path = os.path.abspath(module['path'])
+            if path.startswith(mod_path + os.sep) and len(mod_path) > best_len:
+                best, best_len = name, len(mod_path)
+        return best
+
+    def dependents(self, modules: Iterable[str]) -> set:
+        """
+        Computes the modules depending, directly or not, on the given ones.
+
+        Args:
+            modules (Iterable[str]): Module names.
+
+        Returns:
+            set: The given modules and all their reverse dependencies.
+        """
+        reverse = {}
+        for name, module in self.modules.items():
+            for dep in module['depends']:
+                reverse.setdefault(dep, set()).add(name)
+
+        result = set()
+        pending = list(modules)
+        while pending:
+            name = pending.pop()
+            if name in result:
+                continue
+            result.add(name)
+            pending += reverse.get(name, ())
+        return result
+
+    def sorted(self, modules: Iterable[str]) -> list:
+        """
+        Orders modules so that every module comes after its dependencies.
+
+        Args:
+            modules (Iterable[str]): Module names.
+
+        Returns:
+            list: The ordered names.
+        """
+        modules = set(modules)
+        ordered = []
+        done = set()
+
+        def visit(name: str, stack: tuple) -> None:
+            if name in done or name in stack:
+                return
+            for dep in self.modules.get(name, {}).get('depends', []):
+                visit(dep, stack + (name,))
+            done.add(name)
+            if name in modules:
+                ordered.append(name)
+
+        for name in sorted(modules):
+            visit(name, ())
+        return ordered
+
+    def upgrade_set(self, changed_files: Iterable[str]) -> list:
+        """
+        Computes the minimal set of modules to upgrade after some files changed.
+
+        Args:
+            changed_files (Iterable[str]): Paths of the changed files.
+
+        Returns:
+            list: The changed modules and their reverse dependencies, in dependency order.
+        """
+        changed = {self.module_of(path) for path in changed_files} - {''}
+        return self.sorted(self.dependents(changed))
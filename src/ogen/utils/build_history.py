@@ -0,0 +1,141 @@
+"""
+History of the docker images built for a project.
+
+Every build is tagged `ogen/<project>:<number>`, so the previous images stay
+available (they aren't left dangling) and a rollback only has to move
+the name used by compose back to one of them.
+"""
+
+import time
+from typing import Union
+
+from .fileio import FileLock
+from .fileio import load_json
+from .fileio import save_json
+
+IMAGE_REPOSITORY = 'ogen'
+
+
+class BuildHistory:
+    """
+    The builds of a project {number, image_id, tag, fingerprint, odoo_version, date},
+    oldest first, and the number of the build in use.
+    """
+
+    path: str
+    repository: str
+
+    def __init__(self, path: str, project_name: str):
+        """
+        Args:
+            path (str): The history file.
+            project_name (str): The compose project name, used in the image tags.
+        """
+        self.path = path
+        self.repository = f'{IMAGE_REPOSITORY}/{project_name}'
+
+    def load(self) -> dict:
+        """
+        Returns:
+            dict: The content of the history {builds, current}.
+        """
+        content = load_json(self.path)
+        content.setdefault('builds', [])
+        content.setdefault('current', 0)
+        return content
+
+    def tag(self, number: int) -> str:
+        """
+        Returns:
+            str: The image tag of a build.
+        """
+        return f'{self.repository}:{number}'
+
+    def current(self) -> Union[dict, None]:
+        """
+        Returns:
+            dict: The build in use, None before the first build.
+        """
+        content = self.load()
+        return next((build for build in content['builds']
+                     if build['number'] == content['current']), None)
+
+    def add(self, image_id: str, fingerprint: str, odoo_version: str) -> dict:
+        """
+        Records a new build, unless the image is the one of the current build
+        (nothing changed and the build was served by the cache).
+
+        Args:
+            image_id (str): The built image.
+            fingerprint (str): The hash of the build inputs.
+            odoo_version (str): The Odoo version of the project.
+
+        Returns:
+            dict: The build, `new` telling whether it was added.
+        """
+        with FileLock(self.path):
+            content = self.load()
+            builds = content['builds']
+            for build in builds:
+                if build['number'] == content['current'] and build['image_id'] == image_id:
+                    return dict(build, new=False)
+
+            number = max((build['number'] for build in builds), default=0) + 1
+            build = {
+                'number': number,
+                'image_id': image_id,
+                'tag': self.tag(number),
+                'fingerprint': fingerprint,
+                'odoo_version': odoo_version,
+                'date': time.time(),
+            }
+            builds.append(build)
+            content['current'] = number
+            save_json(self.path, content)
+        return dict(build, new=True)
+
+    def set_current(self, number: int) -> None:
+        """
+        Records the build in use, e.g. after a rollback.
+
+        Args:
+            number (int): The build number.
+        """
+        with FileLock(self.path):
+            content = self.load()
+            content['current'] = number
+            save_json(self.path, content)
+
+    def previous(self, number: Union[int, None] = None) -> Union[dict, None]:
+        """
+        Returns:
+            dict: The given build, or the one before the build in use, None if there is none.
+        """
+        content = self.load()
+        builds = content['builds']
+        if number is not None:
+            return next((build for build in builds if build['number'] == number), None)
+        older = [build for build in builds if build['number'] < content['current']]
+        return older[-1] if older else None
+
+    def prune(self, keep: int) -> list:
+        """
+        Forgets the oldest builds beyond the last `keep` ones. The build in use is always kept.
+
+        Args:
+            keep (int): Number of builds kept.
+
+        Returns:
+            list: The forgotten builds, their images are to be removed.
+        """
+        with FileLock(self.path):
+            content = self.load()
+            builds = content['builds']
+            kept = builds[-max(keep, 1):]
+            removed = [build for build in builds[:-max(keep, 1)]
+                       if build['number'] != content['current']]
+            content['builds'] = [build for build in builds
+                                 if build in kept or build['number'] == content['current']]
+            if removed:
+                save_json(self.path, content)
+        return removed
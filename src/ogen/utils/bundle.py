@@ -0,0 +1,240 @@
+"""
+Project bundles, to move a project to another machine (`ogen export` / `ogen import`).
+
+A bundle is a single compressed tar stream. Its members, in stream order:
+- `bundle.json`: the manifest (project name, Odoo version, Odoo source commit)
+- `project/...`: the project files, without the database data
+- `database/000000`, ...: consecutive parts of the pg_dump stream
+- `filestore/...`: the filestore of the database
+
+A tar member needs its size upfront, so the dump is cut in parts of DB_PART_SIZE:
+the memory use is bounded whatever the size of the database.
+"""
+
+import io
+import os
+import json
+import time
+import shutil
+import tarfile
+import contextlib
+from typing import IO, Iterable, Iterator
+
+from ..exceptions import IntegrityError
+from .compression import CHUNK_SIZE
+from .compression import AbortOnError
+from .compression import CompressedStream
+from .compression import DecompressedStream
+from .helper import safe_extract_member
+
+BUNDLE_FORMAT = 1
+MANIFEST_NAME = 'bundle.json'
+PROJECT_DIR = 'project'
+DATABASE_DIR = 'database'
+FILESTORE_DIR = 'filestore'
+DB_PART_SIZE = 16 * 1024 * 1024
+
+
+class BundleWriter(AbortOnError):
+    """
+    Writes a bundle to an open binary file, e.g. stdout.
+
+    Usage:
+        with BundleWriter(out_file) as bundle:
+            bundle.add_manifest({...})
+            bundle.add_tree(project_path, PROJECT_DIR, exclude=[...])
+    """
+
+    def __init__(self, dest: IO):
+        """
+        Args:
+            dest (file): Binary file with a file descriptor.
+        """
+        self._stream = CompressedStream(dest)
+        self._tar = tarfile.open(  # pylint: disable=consider-using-with
+            fileobj=self._stream, mode='w|')
+
+    def add_manifest(self, manifest: dict) -> None:
+        """
+        Adds the manifest, the first member of the bundle.
+
+        Args:
+            manifest (dict): The manifest.
+        """
+        self._add_bytes(MANIFEST_NAME, json.dumps(dict(manifest, format=BUNDLE_FORMAT),
+                                                  indent=2).encode('utf8'))
+
+    def _add_bytes(self, name: str, data: bytes) -> None:
+        info = tarfile.TarInfo(name)
+        info.size = len(data)
+        info.mtime = int(time.time())
+        self._tar.addfile(info, io.BytesIO(data))
+
+    def add_tree(self, path: str, arcname: str, exclude: Iterable[str] = ()) -> None:
+        """
+        Adds a folder, file by file.
+
+        Args:
+            path (str): The folder.
+            arcname (str): Its name in the bundle.
+            exclude (Iterable[str], optional): Absolute paths of the sub-folders left out.
+        """
+        excluded = {os.path.normpath(os.path.join(arcname, os.path.relpath(item, path)))
+                    for item in exclude}
+
+        def _filter(info: tarfile.TarInfo):
+            return None if os.path.normpath(info.name) in excluded else info
+
+        self._tar.add(path, arcname=arcname, filter=_filter)
+
+    def add_stream(self, source: IO, arcname: str) -> int:
+        """
+        Adds the content of a pipe as consecutive parts.
+
+        Args:
+            source (file): The pipe, e.g. the stdout of pg_dump.
+            arcname (str): Folder of the parts in the bundle.
+
+        Returns:
+            int: Number of bytes added.
+        """
+        total = 0
+        part = 0
+        while True:
+            data = source.read(DB_PART_SIZE)
+            if not data:
+                return total
+            self._add_bytes(f'{arcname}/{part:06d}', data)
+            total += len(data)
+            part += 1
+
+    def close(self) -> None:
+        """
+        Ends the bundle.
+
+        Raises:
+            IntegrityError: When the compressor fails.
+        """
+        self._tar.close()
+        self._stream.close()
+
+    def abort(self) -> None:
+        """
+        Stops writing, the bundle is incomplete.
+        """
+        self._stream.abort()
+
+
+class BundleReader(AbortOnError):
+    """
+    Reads a bundle from a file or a pipe, member by member.
+    The manifest is read when the bundle is opened.
+    """
+
+    manifest: dict
+    label: str
+
+    def __init__(self, source: IO, label: str = 'the bundle'):
+        """
+        Args:
+            source (file): Binary file or pipe, e.g. stdin.
+            label (str, optional): Name of the source in the error messages.
+
+        Raises:
+            IntegrityError: When the source isn't an oGen bundle.
+        """
+        self.label = label
+        self._stream = DecompressedStream(source, label)
+        try:
+            self._tar = tarfile.open(  # pylint: disable=consider-using-with
+                fileobj=self._stream.stdout, mode='r|')
+            self._members = iter(self._tar)
+            first = next(self._members, None)
+            if first is None or first.name != MANIFEST_NAME:
+                raise IntegrityError(f'{label.capitalize()} is not an oGen bundle.')
+            self.manifest = json.load(self._tar.extractfile(first))
+        except tarfile.ReadError as err:
+            self._stream.abort()
+            raise IntegrityError(f'{label.capitalize()} is not an oGen bundle.') from err
+        except (tarfile.TarError, ValueError) as err:
+            self._stream.abort()
+            raise IntegrityError(f'Unable to read {label}: {err}') from err
+        except IntegrityError:
+            self._stream.abort()
+            raise
+
+        if self.manifest.get('format', 0) > BUNDLE_FORMAT:
+            self._stream.abort()
+            raise IntegrityError(f'{label.capitalize()} was made by a newer version of oGen.')
+
+    @contextlib.contextmanager
+    def _reading(self) -> Iterator[None]:
+        """
+        Context reporting the errors of a truncated or corrupted bundle.
+        """
+        try:
+            yield
+        except (tarfile.TarError, EOFError) as err:
+            raise IntegrityError(f'{self.label.capitalize()} is truncated or corrupted: {err}') \
+                from err
+
+    def __iter__(self) -> Iterator[tarfile.TarInfo]:
+        """
+        Yields:
+            tarfile.TarInfo: The members following the manifest, in stream order.
+        """
+        with self._reading():
+            yield from self._members
+
+    @staticmethod
+    def section(member: tarfile.TarInfo) -> str:
+        """
+        Returns:
+            str: The top folder of a member, e.g. PROJECT_DIR.
+        """
+        return member.name.split('/', 1)[0]
+
+    def extract(self, member: tarfile.TarInfo, path: str) -> None:
+        """
+        Extracts the current member, without its top folder.
+
+        Args:
+            member (tarfile.TarInfo): The member.
+            path (str): Destination folder.
+        """
+        prefix = f'{self.section(member)}/'
+        if not member.name.startswith(prefix):
+            os.makedirs(path, exist_ok=True)
+            return
+        member.name = member.name[len(prefix):]
+        if member.islnk() and member.linkname.startswith(prefix):
+            member.linkname = member.linkname[len(prefix):]
+        with self._reading():
+            safe_extract_member(self._tar, member, path)
+
+    def copy(self, member: tarfile.TarInfo, dest: IO) -> None:
+        """
+        Copies the content of the current member.
+
+        Args:
+            member (tarfile.TarInfo): The member.
+            dest (file): Binary file or pipe.
+        """
+        with self._reading():
+            shutil.copyfileobj(self._tar.extractfile(member), dest, CHUNK_SIZE)
+
+    def close(self) -> None:
+        """
+        Ends the reading.
+
+        Raises:
+            IntegrityError: When the decompressor fails, e.g. truncated bundle.
+        """
+        self._tar.close()
+        self._stream.close()
+
+    def abort(self) -> None:
+        """
+        Stops reading.
+        """
+        self._stream.abort()
@@ -0,0 +1,267 @@
+"""
+Asyncio based execution of external commands (docker, git, etc):
+bounded concurrency, timeouts and cancellation, streamed output lines
+and the duration and exit status of every command.
+"""
+
+import os
+import time
+import asyncio
+import dataclasses
+import subprocess
+from typing import Callable, Iterable, Union
+
+from ..constants import DEF_JOBS
+from . import trace
+
+STREAM_LIMIT = 1024 * 1024  # Buffered output, the longer lines are read in chunks
+KILL_GRACE = 5  # Seconds between SIGTERM and SIGKILL of a command being stopped
+
+# Called with each output line (without line separator) and its stream: `stdout` or `stderr`
+LineCallback = Callable[[str, str], None]
+
+
+async def _read_line(stream: asyncio.StreamReader) -> bytes:
+    """
+    Reads a line of any length, `readline` fails on the lines longer than the buffer
+    and drops it. Such a line is read in chunks until its end.
+
+    Returns:
+        bytes: The line with its separator, empty at the end of the stream.
+    """
+    chunks = []
+    while True:
+        try:
+            chunks.append(await stream.readuntil(b'\n'))
+            return b''.join(chunks)
+        except asyncio.IncompleteReadError as err:
+            # End of the stream, without separator
+            chunks.append(err.partial)
+            return b''.join(chunks)
+        except asyncio.LimitOverrunError as err:
+            chunks.append(await stream.read(err.consumed))
+
+
+@dataclasses.dataclass
+class CommandResult:
+    """
+    Outcome of a command.
+    """
+    command: list
+    returncode: Union[int, None] = None
+    stdout: str = ''
+    stderr: str = ''
+    duration: float = 0.0
+    timed_out: bool = False
+
+    @property
+    def ok(self) -> bool:  # pylint: disable=invalid-name
+        """
+        Returns:
+            bool: True if the command exited with 0.
+        """
+        return self.returncode == 0
+
+    def check(self) -> 'CommandResult':
+        """
+        Raises:
+            subprocess.TimeoutExpired: When the command timed out.
+            subprocess.CalledProcessError: When the command failed.
+
+        Returns:
+            CommandResult: The result itself, when the command succeeded.
+        """
+        if self.timed_out:
+            raise subprocess.TimeoutExpired(self.command, self.duration,
+                                            output=self.stdout, stderr=self.stderr)
+        if not self.ok:
+            raise subprocess.CalledProcessError(self.returncode, self.command,
+                                                output=self.stdout, stderr=self.stderr)
+        return self
+
+
+@dataclasses.dataclass
+class CommandSpec:
+    """
+    A command to be executed by `CommandEngine.run_all`, with the options of `CommandEngine.run`.
+    """
+    command: list
+    cwd: Union[str, None] = None
+    env: Union[dict, None] = None
+    timeout: Union[float, None] = None
+    capture: bool = False
+    on_line: Union[LineCallback, None] = None
+
+
+class CommandEngine:
+    """
+    Executes commands as asyncio subprocesses, at most `max_concurrency` at a time.
+
+    Usage:
+        engine = CommandEngine(max_concurrency=4)
+        results = engine.run_many_sync([CommandSpec(['git', 'fetch'], cwd=path), ...])
+    """
+
+    max_concurrency: int
+    timeout: Union[float, None]
+
+    def __init__(self, max_concurrency: int = DEF_JOBS, timeout: Union[float, None] = None):
+        """
+        Args:
+            max_concurrency (int, optional): Commands running at the same time.
+            timeout (float, optional): Default timeout of the commands, in seconds.
+                                       Defaults to None, no timeout.
+        """
+        self.max_concurrency = max(max_concurrency, 1)
+        self.timeout = timeout
+        self._semaphore = None
+        self._loop = None
+
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        # A semaphore belongs to the event loop it was created in
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._semaphore
+
+    @staticmethod
+    async def _read_stream(stream: asyncio.StreamReader, name: str,
+                           lines: Union[list, None],
+                           on_line: Union[LineCallback, None]) -> None:
+        while True:
+            raw = await _read_line(stream)
+            if not raw:
+                return
+            line = raw.decode('utf8', errors='replace')
+            if lines is not None:
+                lines.append(line)
+            if on_line:
+                on_line(line.rstrip('\r\n'), name)
+
+    @staticmethod
+    async def _stop(process: 'asyncio.subprocess.Process') -> None:
+        if process.returncode is not None:
+            return
+        try:
+            process.terminate()
+            await asyncio.wait_for(process.wait(), KILL_GRACE)
+        except ProcessLookupError:
+            return
+        except asyncio.TimeoutError:
+            process.kill()
+            await process.wait()
+
+    async def _execute(self,  # pylint: disable=too-many-arguments,too-many-positional-arguments
+                       command: list,
+                       result: CommandResult,
+                       span: 'trace.Span',
+                       cwd: Union[str, None],
+                       env: Union[dict, None],
+                       timeout: Union[float, None],
+                       capture: bool,
+                       on_line: Union[LineCallback, None]) -> None:
+        piped = capture or on_line is not None
+        started = time.monotonic()
+        process = await asyncio.create_subprocess_exec(
+            *command,
+            cwd=cwd,
+            env=dict(os.environ, **env) if env else None,
+            stdout=asyncio.subprocess.PIPE if piped else None,
+            stderr=asyncio.subprocess.PIPE if piped else None,
+            limit=STREAM_LIMIT)
+
+        out_lines = [] if capture else None
+        err_lines = [] if capture else None
+        waiters = [process.wait()]
+        if piped:
+            waiters += [
+                self._read_stream(process.stdout, 'stdout', out_lines, on_line),
+                self._read_stream(process.stderr, 'stderr', err_lines, on_line),
+            ]
+
+        try:
+            await asyncio.wait_for(asyncio.gather(*waiters), timeout)
+        except asyncio.TimeoutError:
+            result.timed_out = True
+            await self._stop(process)
+        except asyncio.CancelledError:
+            await self._stop(process)
+            raise
+        finally:
+            result.duration = time.monotonic() - started
+
+        result.returncode = process.returncode
+        span.set(exit_code=result.returncode, timed_out=result.timed_out)
+        if capture:
+            result.stdout = ''.join(out_lines)
+            result.stderr = ''.join(err_lines)
+
+    async def run(self,  # pylint: disable=too-many-arguments,too-many-positional-arguments
+                  command: list,
+                  cwd: Union[str, None] = None,
+                  env: Union[dict, None] = None,
+                  timeout: Union[float, None] = None,
+                  capture: bool = False,
+                  on_line: Union[LineCallback, None] = None) -> CommandResult:
+        """
+        Executes a command. Without `capture` nor `on_line`,
+        its output goes to the console.
+        When the task is cancelled, the command is stopped too.
+
+        Args:
+            command (list): The command and its args.
+            cwd (str, optional): Working directory of the command.
+            env (dict, optional): Extra environment variables.
+            timeout (float, optional): Seconds after which the command is stopped.
+                                       Defaults to the engine's timeout.
+            capture (bool, optional): Keep the output in the result. Defaults to False.
+            on_line (LineCallback, optional): Called with every output line.
+
+        Raises:
+            OSError: When the command can't be started, e.g. not installed.
+
+        Returns:
+            CommandResult: The result.
+        """
+        timeout = timeout if timeout is not None else self.timeout
+        result = CommandResult(command=list(command))
+
+        async with self._get_semaphore():
+            with trace.command_span(command, cwd=cwd,
+                                    overlapping=self.max_concurrency > 1) as span:
+                await self._execute(command, result, span, cwd=cwd, env=env,
+                                    timeout=timeout, capture=capture, on_line=on_line)
+        return result
+
+    async def run_all(self, specs: Iterable[CommandSpec]) -> list:
+        """
+        Executes commands concurrently, within the engine's concurrency limit.
+
+        Args:
+            specs (Iterable[CommandSpec]): The commands.
+
+        Returns:
+            list: The CommandResult of every command, in the same order.
+        """
+        return list(await asyncio.gather(*[
+            self.run(spec.command, cwd=spec.cwd, env=spec.env, timeout=spec.timeout,
+                     capture=spec.capture, on_line=spec.on_line)
+            for spec in specs
+        ]))
+
+# region Synchronous facade
+
+    def run_sync(self, command: list, **kwargs) -> CommandResult:
+        """
+        Synchronous version of `run`, for the code not running in an event loop.
+        """
+        return asyncio.run(self.run(command, **kwargs))
+
+    def run_many_sync(self, specs: Iterable[CommandSpec]) -> list:
+        """
+        Synchronous version of `run_all`, for the code not running in an event loop.
+        """
+        return asyncio.run(self.run_all(specs))
+
+# endregion
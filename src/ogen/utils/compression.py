@@ -0,0 +1,354 @@
+"""
+Streaming compression based on the fastest compressor available on the host:
+`zstd` (multi-threaded), `pigz` (multi-threaded gzip) or `gzip`.
+"""
+
+import os
+import shutil
+import hashlib
+import threading
+import subprocess
+from typing import IO, Union
+
+from ..exceptions import IntegrityError
+
+CHUNK_SIZE = 1024 * 1024
+
+# (executable, compress args, decompress args, file extension)
+COMPRESSORS = [
+    ('zstd', ['-T0', '-3', '-q', '-c'], ['-d', '-q', '-c'], 'zst'),
+    ('pigz', ['-c', '-6'], ['-d', '-c'], 'gz'),
+    ('gzip', ['-c', '-6'], ['-d', '-c'], 'gz'),
+]
+
+ZSTD_MAGIC = b'\x28\xb5\x2f\xfd'
+GZIP_MAGIC = b'\x1f\x8b'
+
+
+def get_compressor() -> tuple:
+    """
+    Returns the best compressor available on the host.
+
+    Raises:
+        IntegrityError: When none is installed.
+
+    Returns:
+        tuple: (executable, compress args, decompress args, file extension)
+    """
+    for compressor in COMPRESSORS:
+        if shutil.which(compressor[0]):
+            return compressor
+
+    raise IntegrityError('No compressor found. Please install zstd or gzip.')
+
+
+def _decompressor(magic: bytes, label: str) -> list:
+    """
+    Returns the command that decompresses its stdin, based on the magic number of the data.
+    """
+    if magic.startswith(ZSTD_MAGIC):
+        names = ['zstd']
+    elif magic.startswith(GZIP_MAGIC):
+        names = ['pigz', 'gzip']
+    else:
+        raise IntegrityError(f'Unknown compression format of {label}.')
+
+    for executable, _comp_args, decomp_args, _ext in COMPRESSORS:
+        if executable in names and shutil.which(executable):
+            return [executable] + decomp_args
+
+    raise IntegrityError(f'Please install {names[0]} to decompress {label}.')
+
+
+def decompress_command(path: str) -> list:
+    """
+    Returns the command that decompresses a file to stdout,
+    based on the file's magic number.
+
+    Args:
+        path (str): Path to the compressed file.
+
+    Raises:
+        IntegrityError: When the format is unknown or no decompressor is installed.
+
+    Returns:
+        list: The command.
+    """
+    with open(path, 'rb') as comp_file:
+        magic = comp_file.read(4)
+
+    return _decompressor(magic, f'"{path}"') + [path]
+
+
+def file_codec(path: str) -> str:
+    """
+    Args:
+        path (str): Path to the compressed file.
+
+    Returns:
+        str: The compression format of the file, by its magic number:
+            the file extension of its compressor (`zst`, `gz`), or '' when unknown.
+    """
+    with open(path, 'rb') as comp_file:
+        magic = comp_file.read(4)
+
+    if magic.startswith(ZSTD_MAGIC):
+        return 'zst'
+    if magic.startswith(GZIP_MAGIC):
+        return 'gz'
+    return ''
+
+
+class AbortOnError:
+    """
+    Context closing the stream at the end, or aborting it on error.
+    The subclasses implement `close` and `abort`.
+    """
+
+    def close(self) -> None:
+        """
+        Ends the stream.
+        """
+        raise NotImplementedError
+
+    def abort(self) -> None:
+        """
+        Stops the stream, its output is incomplete.
+        """
+        raise NotImplementedError
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        if exc_type:
+            self.abort()
+            return
+        self.close()
+
+
+class CompressedWriter(AbortOnError):
+    """
+    Compresses a stream into a file, hashing the uncompressed content on the fly,
+    so the digest doesn't depend on the compressor.
+    The data is either written with `write` or pumped from the `source` pipe
+    (e.g. the stdout of another process).
+    """
+
+    path: str
+    ext: str
+    digest: str
+
+    def __init__(self, path: str, source: Union[IO, None] = None):
+        """
+        Args:
+            path (str): Destination file, the extension is added by the writer.
+            source (file, optional): Pipe read until its end instead of `write` calls.
+        """
+        executable, comp_args, _decomp_args, self.ext = get_compressor()
+        self.path = f'{path}.{self.ext}'
+        self.digest = ''
+
+        self._hash = hashlib.sha256()
+        self._process = subprocess.Popen(  # pylint: disable=consider-using-with
+            [executable] + comp_args,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE)
+        self._pump = threading.Thread(target=self._pump_output, daemon=True)
+        self._pump.start()
+
+        self._source_pump = None
+        if source is not None:
+            self._source_pump = threading.Thread(target=self._pump_input, args=(source,),
+                                                 daemon=True)
+            self._source_pump.start()
+
+    def _pump_input(self, source: IO) -> None:
+        try:
+            for chunk in iter(lambda: source.read(CHUNK_SIZE), b''):
+                self.write(chunk)
+        except BrokenPipeError:
+            pass
+        finally:
+            try:
+                self._process.stdin.close()
+            except BrokenPipeError:
+                pass
+
+    def _pump_output(self) -> None:
+        with open(self.path, 'wb') as dest:
+            for chunk in iter(lambda: self._process.stdout.read(CHUNK_SIZE), b''):
+                dest.write(chunk)
+
+    def write(self, data: bytes) -> int:
+        """
+        Compresses data.
+
+        Args:
+            data (bytes): The data.
+
+        Returns:
+            int: Number of bytes written.
+        """
+        self._hash.update(data)
+        return self._process.stdin.write(data)
+
+    def close(self) -> str:
+        """
+        Waits for the compressor to finish.
+
+        Raises:
+            IntegrityError: When the compressor fails.
+
+        Returns:
+            str: The sha256 of the uncompressed content.
+        """
+        if self._source_pump:
+            self._source_pump.join()
+        else:
+            self._process.stdin.close()
+        self._pump.join()
+        return_code = self._process.wait()
+
+        if return_code:
+            raise IntegrityError(f'Compression of "{self.path}" failed.')
+
+        self.digest = self._hash.hexdigest()
+        return self.digest
+
+    def abort(self) -> None:
+        """
+        Stops the compression and removes the file.
+        """
+        # The source pump stops on the broken pipe, it may be waiting for the source
+        self._process.kill()
+        self._pump.join()
+        self._process.wait()
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+class CompressedStream:
+    """
+    Compresses the written data into an open binary file, e.g. stdout.
+    The compressor writes directly to the file descriptor,
+    nothing is buffered in memory nor in temporary files.
+    """
+
+    ext: str
+
+    def __init__(self, dest: IO):
+        """
+        Args:
+            dest (file): Binary file with a file descriptor.
+        """
+        executable, comp_args, _decomp_args, self.ext = get_compressor()
+        dest.flush()
+        self._process = subprocess.Popen(  # pylint: disable=consider-using-with
+            [executable] + comp_args,
+            stdin=subprocess.PIPE,
+            stdout=dest)
+
+    def write(self, data: bytes) -> int:
+        """
+        Compresses data.
+
+        Args:
+            data (bytes): The data.
+
+        Returns:
+            int: Number of bytes written.
+        """
+        return self._process.stdin.write(data)
+
+    def close(self) -> None:
+        """
+        Waits for the compressor to finish.
+
+        Raises:
+            IntegrityError: When the compressor fails.
+        """
+        self._process.stdin.close()
+        if self._process.wait():
+            raise IntegrityError('Compression of the stream failed.')
+
+    def abort(self) -> None:
+        """
+        Stops the compression.
+        """
+        self._process.kill()
+        self._process.wait()
+
+
+class DecompressedStream:
+    """
+    Decompresses a file or a pipe (e.g. stdin), the format being detected
+    from its magic number. The data is read from `stdout`.
+    """
+
+    stdout: IO
+
+    def __init__(self, source: IO, label: str = 'the stream'):
+        """
+        Args:
+            source (file): Binary file or pipe.
+            label (str, optional): Name of the source in the error messages.
+
+        Raises:
+            IntegrityError: When the format is unknown or no decompressor is installed.
+        """
+        # A regular file is read directly by the decompressor, a pipe can't be
+        # rewound: its magic number is pumped with the rest of it by a thread.
+        seekable = source.seekable()
+        magic = os.pread(source.fileno(), 4, source.tell()) if seekable else source.read(4)
+        command = _decompressor(magic, label)
+
+        self._process = subprocess.Popen(  # pylint: disable=consider-using-with
+            command,
+            stdin=source if seekable else subprocess.PIPE,
+            stdout=subprocess.PIPE)
+        self.stdout = self._process.stdout
+
+        self._pump = None
+        if not seekable:
+            self._pump = threading.Thread(target=self._pump_input, args=(magic, source),
+                                          daemon=True)
+            self._pump.start()
+
+    def _pump_input(self, magic: bytes, source: IO) -> None:
+        try:
+            self._process.stdin.write(magic)
+            for chunk in iter(lambda: source.read(CHUNK_SIZE), b''):
+                self._process.stdin.write(chunk)
+        except BrokenPipeError:
+            pass
+        finally:
+            try:
+                self._process.stdin.close()
+            except BrokenPipeError:
+                pass
+
+    def close(self) -> None:
+        """
+        Waits for the decompressor to finish.
+
+        Raises:
+            IntegrityError: When the decompressor fails, e.g. truncated data.
+        """
+        # The padding after the end of a tar archive isn't read by tarfile
+        for _chunk in iter(lambda: self.stdout.read(CHUNK_SIZE), b''):
+            pass
+        self.stdout.close()
+        return_code = self._process.wait()
+        if self._pump:
+            self._pump.join()
+        if return_code:
+            raise IntegrityError('Decompression of the stream failed.')
+
+    def abort(self) -> None:
+        """
+        Stops the decompression.
+        """
+        self._process.kill()
+        self._process.wait()
+        self.stdout.close()
@@ -0,0 +1,291 @@
+"""
+Import of a production backup into a project (`ogen db import`).
+
+The backups are the ones of the Odoo database manager:
+- zip: `dump.sql` (plain format), `filestore/...` and `manifest.json`
+- dump: a single pg_dump custom format file, without filestore
+
+The zip is read in place, its members are decompressed as they are copied:
+the dump goes to psql or pg_restore and the filestore files are written
+by several threads. The completed phases are recorded, so that an interrupted
+import resumes with the remaining ones.
+"""
+
+import os
+import json
+import time
+import shutil
+import zipfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import IO, Iterable, Union
+
+from ..exceptions import IntegrityError
+from .compression import CHUNK_SIZE
+from .fileio import load_json
+from .fileio import save_json
+
+# Phases of an import, in order. `database` and `filestore` run concurrently.
+IMPORT_PHASES = ['database', 'filestore', 'neutralize']
+
+SQL_DUMP = 'dump.sql'
+MANIFEST_NAME = 'manifest.json'
+FILESTORE_PREFIX = 'filestore/'
+CUSTOM_DUMP_MAGIC = b'PGDMP'
+# Statements of the plain format dumps left out of the restore: the dumps are made
+# without owner, commenting an extension fails unless its owner restores it
+SKIPPED_STATEMENTS = (b'COMMENT ON EXTENSION ',)
+
+# Keeps the imported database from acting as the production one: no scheduled
+# actions (but the autovacuum), no outgoing or incoming mails and the password
+# of every user reset to its login. Run in a single transaction.
+NEUTRALIZE_SQL = """
+UPDATE ir_cron SET active = false
+ WHERE id NOT IN (SELECT res_id FROM ir_model_data
+                   WHERE model = 'ir.cron' AND module = 'base' AND name = 'autovacuum_job');
+UPDATE ir_mail_server SET active = false;
+DO $$
+BEGIN
+    IF to_regclass('fetchmail_server') IS NOT NULL THEN
+        UPDATE fetchmail_server SET active = false;
+    END IF;
+    IF EXISTS (SELECT 1 FROM information_schema.columns
+                WHERE table_name = 'res_users' AND column_name = 'totp_secret') THEN
+        UPDATE res_users SET totp_secret = NULL;
+    END IF;
+END $$;
+UPDATE res_users SET password = login;
+INSERT INTO ir_config_parameter (key, value) VALUES ('database.is_neutralized', 'true')
+    ON CONFLICT (key) DO UPDATE SET value = 'true';
+"""
+
+
+class OdooBackup:
+    """
+    A backup of the Odoo database manager, opened for reading.
+
+    Usage:
+        with OdooBackup(path) as backup:
+            backup.copy_dump(process.stdin)
+            backup.extract_filestore(dest, jobs=4)
+    """
+
+    path: str
+    # `sql` (plain format, restored by psql) or `custom` (restored by pg_restore)
+    dump_format: str
+    manifest: dict
+
+    def __init__(self, path: str):
+        """
+        Args:
+            path (str): The backup file.
+
+        Raises:
+            IntegrityError: When the file isn't an Odoo backup.
+        """
+        self.path = path
+        self.manifest = {}
+        self._zip = None
+        self._dump_name = ''
+
+        if not zipfile.is_zipfile(path):
+            self.dump_format = self._detect_format(path)
+            return
+
+        try:
+            self._zip = zipfile.ZipFile(path)  # pylint: disable=consider-using-with
+            names = set(self._zip.namelist())
+            if MANIFEST_NAME in names:
+                self.manifest = json.loads(self._zip.read(MANIFEST_NAME))
+        except (zipfile.BadZipFile, ValueError) as err:
+            self.close()
+            raise IntegrityError(f'Unable to read the backup "{path}": {err}') from err
+
+        dumps = [name for name in names if name == SQL_DUMP or name.endswith('.dump')]
+        if not dumps:
+            self.close()
+            raise IntegrityError(f'No `{SQL_DUMP}` found in the backup "{path}".')
+        self._dump_name = dumps[0]
+        with self._zip.open(self._dump_name) as dump:
+            self.dump_format = 'custom' if dump.read(len(CUSTOM_DUMP_MAGIC)) \
+                == CUSTOM_DUMP_MAGIC else 'sql'
+
+    @staticmethod
+    def _detect_format(path: str) -> str:
+        with open(path, 'rb') as dump:
+            head = dump.read(1024)
+        if head.startswith(CUSTOM_DUMP_MAGIC):
+            return 'custom'
+        if b'PostgreSQL database dump' in head:
+            return 'sql'
+        raise IntegrityError(f'"{path}" is neither an Odoo backup zip nor a pg_dump file.')
+
+    @property
+    def odoo_version(self) -> str:
+        """
+        Returns:
+            str: The Odoo version of the backup, e.g. `16.0`, empty when unknown.
+        """
+        return str(self.manifest.get('major_version') or '')
+
+    def fingerprint(self) -> dict:
+        """
+        Returns:
+            dict: What identifies the backup in the resume state.
+        """
+        stat = os.stat(self.path)
+        return {'path': os.path.abspath(self.path), 'size': stat.st_size,
+                'mtime': stat.st_mtime}
+
+    def copy_dump(self, dest: IO, skip: Iterable[bytes] = ()) -> int:
+        """
+        Copies the dump, decompressed on the fly.
+
+        Args:
+            dest (file): Binary file or pipe, e.g. the stdin of psql.
+            skip (Iterable[bytes], optional): Prefixes of the statements left out
+                of a plain format dump. They are searched in its schema part only,
+                up to the data of the first table.
+
+        Returns:
+            int: The number of bytes copied.
+        """
+        if self._zip is None:
+            source = open(self.path, 'rb')  # pylint: disable=consider-using-with
+        else:
+            source = self._zip.open(self._dump_name)
+        skip = tuple(skip)
+        size = 0
+        with source:
+            for line in source if skip else ():
+                if not line.startswith(skip):
+                    dest.write(line)
+                    size += len(line)
+                if line.startswith(b'COPY '):
+                    break
+            while True:
+                chunk = source.read(CHUNK_SIZE)
+                if not chunk:
+                    return size
+                dest.write(chunk)
+                size += len(chunk)
+
+    def filestore_members(self) -> list:
+        """
+        Returns:
+            list: The ZipInfo of the filestore files.
+        """
+        if self._zip is None:
+            return []
+        return [info for info in self._zip.infolist()
+                if info.filename.startswith(FILESTORE_PREFIX) and not info.is_dir()]
+
+    def extract_filestore(self, dest: str, jobs: int,
+                          cancel: Union[threading.Event, None] = None) -> int:
+        """
+        Extracts the filestore files, spread over several threads
+        each one reading the zip with its own handle.
+
+        Args:
+            dest (str): Destination folder, the filestore of the database.
+            jobs (int): Number of threads.
+            cancel (threading.Event, optional): Stops the extraction when set.
+
+        Raises:
+            IntegrityError: When a member would be written outside the destination.
+
+        Returns:
+            int: The number of files extracted.
+        """
+        members = self.filestore_members()
+        if not members:
+            return 0
+        dest = os.path.realpath(dest)
+        os.makedirs(dest, exist_ok=True)
+        targets = []
+        for info in members:
+            target = os.path.realpath(os.path.join(dest, info.filename[len(FILESTORE_PREFIX):]))
+            if os.path.commonpath([dest, target]) != dest:
+                raise IntegrityError(f'Unsafe archive member: "{info.filename}"')
+            targets.append((info, target))
+
+        # Interleaved, so that every thread gets files of all sizes
+        jobs = max(min(jobs, len(targets)), 1)
+        shares = [targets[index::jobs] for index in range(jobs)]
+        with ThreadPoolExecutor(max_workers=jobs) as executor:
+            # Consumed, so that the error of a thread is raised here
+            list(executor.map(lambda share: self._extract_share(share, cancel), shares))
+        return len(targets)
+
+    def _extract_share(self, share: Iterable[tuple],
+                       cancel: Union[threading.Event, None] = None) -> None:
+        with zipfile.ZipFile(self.path) as archive:
+            for info, target in share:
+                if cancel is not None and cancel.is_set():
+                    return
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                with archive.open(info) as source, open(target, 'wb') as target_file:
+                    shutil.copyfileobj(source, target_file, CHUNK_SIZE)
+
+    def close(self) -> None:
+        """
+        Closes the backup.
+        """
+        if self._zip is not None:
+            self._zip.close()
+            self._zip = None
+
+    def __enter__(self) -> 'OdooBackup':
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+class ImportState:
+    """
+    The phases completed by the import of a backup, with their duration.
+    The state of another backup is discarded.
+    """
+
+    path: str
+    backup: dict
+    done: dict
+
+    def __init__(self, path: str, backup: dict, restart: bool = False):
+        """
+        Args:
+            path (str): The state file.
+            backup (dict): The fingerprint of the backup being imported.
+            restart (bool, optional): Discard the completed phases. Defaults to False.
+        """
+        self.path = path
+        self.backup = backup
+        content = load_json(path)
+        self.done = {} if restart or content.get('backup') != backup \
+            else dict(content.get('done') or {})
+
+    def pending(self, phase: str) -> bool:
+        """
+        Returns:
+            bool: True if the phase still has to run.
+        """
+        return phase not in self.done
+
+    def complete(self, phase: str, duration: float) -> None:
+        """
+        Records a completed phase.
+
+        Args:
+            phase (str): One of IMPORT_PHASES.
+            duration (float): Its duration in seconds.
+        """
+        self.done[phase] = duration
+        save_json(self.path, {'backup': self.backup, 'done': self.done, 'date': time.time()})
+
+    def clear(self) -> None:
+        """
+        Removes the state, once the import is complete.
+        """
+        if os.path.exists(self.path):
+            os.unlink(self.path)
@@ -0,0 +1,341 @@
+"""
+Content addressed storage of database and filestore snapshots.
+
+Every snapshot is a small json ref pointing to objects named by the sha256
+of their content, so the content unchanged between snapshots is stored once:
+- dump: the files of a directory format pg_dump, one gzip file per table,
+  whose compression is deterministic
+- fs: a reflink copy of the data folder (a tree, sharing its blocks with the
+  database), or a compressed tar object when the file system has no reflink
+- filestore: a compressed tar object
+
+The compressed objects are named by the sha256 of their uncompressed content,
+whichever compressor is installed, and the ref records their codec.
+The snapshots in progress hold a shared lock of the store, `prune` an exclusive one.
+"""
+
+import os
+import re
+import json
+import uuid
+import shutil
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+from typing import IO, Union
+
+from ..exceptions import InputError
+from .compression import CompressedWriter
+from .compression import CHUNK_SIZE
+from .compression import file_codec
+from .fileio import FileLock
+from .fileio import atomic_write
+
+# gzip level of the pg_dump files, which are stored as they are
+DUMP_COMPRESSION = 1
+
+
+def validate_snapshot_name(name: str) -> None:
+    """
+    Validates the snapshot name to contain only
+    alphanumeric characters, dots, dashes or underscores.
+
+    Raises:
+        InputError
+    """
+    if not re.match(r'^[A-Za-z0-9_.-]+$', name) or name.startswith('.'):
+        raise InputError(f'Invalid snapshot name: "{name}"{os.linesep}'
+                         'Snapshot name may only contain '
+                         'alphanumeric characters a-z, A-Z, 0-9, '
+                         'dots ., dashes - and underscores _')
+
+
+def ref_objects(ref: dict) -> set:
+    """
+    Args:
+        ref (dict): Snapshot data.
+
+    Returns:
+        set: The keys of the objects of the snapshot.
+    """
+    return set(ref.get('objects', {}).values()) | set(ref.get('dump', {}).values())
+
+
+def _file_digest(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as source:
+        for chunk in iter(lambda: source.read(CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class SnapshotStore:
+    """
+    Storage of the snapshots of a project.
+    """
+
+    path: str
+
+    def __init__(self, path: str):
+        self.path = path
+        os.makedirs(self.objects_dir, exist_ok=True)
+        os.makedirs(self.refs_dir, exist_ok=True)
+        os.makedirs(self.trees_dir, exist_ok=True)
+
+    @property
+    def objects_dir(self) -> str:
+        """
+        Returns:
+            str: Folder of the compressed objects.
+        """
+        return os.path.join(self.path, 'objects')
+
+    @property
+    def refs_dir(self) -> str:
+        """
+        Returns:
+            str: Folder of the snapshot refs.
+        """
+        return os.path.join(self.path, 'refs')
+
+    @property
+    def trees_dir(self) -> str:
+        """
+        Returns:
+            str: Folder of the reflink copies of the data folder.
+        """
+        return os.path.join(self.path, 'trees')
+
+    def lock(self, shared: bool = False) -> FileLock:
+        """
+        Args:
+            shared (bool, optional): Shared lock, held while writing or reading
+                a snapshot. Defaults to False, the exclusive lock held to prune.
+
+        Returns:
+            FileLock: The lock of the store, to be used as a context.
+        """
+        return FileLock(os.path.join(self.path, 'store'), shared=shared)
+
+# region Objects
+
+    def new_object(self, source: Union[IO, None] = None) -> CompressedWriter:
+        """
+        Starts writing a new object.
+
+        Args:
+            source (file, optional): Pipe to be compressed, see CompressedWriter.
+
+        Returns:
+            CompressedWriter: The writer, to be passed to `commit_object` once done.
+        """
+        tmp_path = os.path.join(self.objects_dir, f'tmp-{uuid.uuid4().hex}')
+        return CompressedWriter(tmp_path, source=source)
+
+    def commit_object(self, writer: CompressedWriter) -> str:
+        """
+        Finishes writing an object and moves it to its content address.
+
+        Args:
+            writer (CompressedWriter): The writer returned by `new_object`.
+
+        Returns:
+            str: The object key, the sha256 of the uncompressed content.
+        """
+        key = writer.close()
+        obj_path = self.object_path(key)
+
+        if os.path.exists(obj_path):
+            # Same content already stored, possibly by another compressor
+            os.remove(writer.path)
+        else:
+            os.replace(writer.path, obj_path)
+        return key
+
+    def object_path(self, key: str) -> str:
+        """
+        Args:
+            key (str): The object key.
+
+        Returns:
+            str: Path to the object file.
+        """
+        return os.path.join(self.objects_dir, key)
+
+    def object_codec(self, key: str) -> str:
+        """
+        Args:
+            key (str): The object key.
+
+        Returns:
+            str: The compression format of the object (`zst`, `gz`).
+        """
+        return file_codec(self.object_path(key))
+
+    def new_staging(self) -> str:
+        """
+        Creates an empty staging folder on the file system of the objects,
+        e.g. to receive a dump whose files are then moved by `add_files`.
+
+        Returns:
+            str: Path to the folder, to be removed by the caller.
+        """
+        path = os.path.join(self.path, f'tmp-{uuid.uuid4().hex}')
+        os.makedirs(path)
+        return path
+
+    def add_files(self, folder: str, jobs: int = 1) -> dict:
+        """
+        Moves the files of a folder to the objects. The files already stored,
+        e.g. the tables unchanged since the previous dump, are removed instead.
+
+        Args:
+            folder (str): The folder, its sub-folders are ignored.
+            jobs (int, optional): Number of files hashed in parallel. Defaults to 1.
+
+        Returns:
+            dict: {file name: object key}
+        """
+        names = sorted(entry.name for entry in os.scandir(folder) if entry.is_file())
+        with ThreadPoolExecutor(max_workers=max(jobs, 1)) as executor:
+            digests = list(executor.map(
+                lambda name: _file_digest(os.path.join(folder, name)), names))
+
+        files = {}
+        for name, digest in zip(names, digests):
+            key = f'{digest}.gz' if name.endswith('.gz') else digest
+            if os.path.exists(self.object_path(key)):
+                os.remove(os.path.join(folder, name))
+            else:
+                os.replace(os.path.join(folder, name), self.object_path(key))
+            files[name] = key
+        return files
+
+    def link_files(self, files: dict, folder: str) -> None:
+        """
+        Puts the objects back in a folder under their file names,
+        as hard links (copies when linking fails).
+
+        Args:
+            files (dict): {file name: object key}, as returned by `add_files`.
+            folder (str): The destination folder, created.
+        """
+        os.makedirs(folder)
+        for name, key in files.items():
+            try:
+                os.link(self.object_path(key), os.path.join(folder, name))
+            except OSError:
+                shutil.copyfile(self.object_path(key), os.path.join(folder, name))
+
+    def new_tree(self) -> str:
+        """
+        Returns:
+            str: The key of a new tree, its path relative to the store.
+        """
+        return f'trees/{uuid.uuid4().hex}'
+
+    def unused_trees(self) -> list:
+        """
+        Returns:
+            list: The keys of the trees not referenced by any snapshot, e.g. of the
+                replaced snapshots. They belong to the database user,
+                the caller removes them through the `db` service.
+        """
+        used = {ref['tree'] for ref in self.list_refs() if ref.get('tree')}
+        return sorted(f'trees/{entry.name}' for entry in os.scandir(self.trees_dir)
+                      if f'trees/{entry.name}' not in used)
+
+    def prune(self) -> int:
+        """
+        Removes the objects not referenced by any snapshot and the leftovers
+        of interrupted snapshots. The caller holds the exclusive `lock`,
+        so the objects and staging folders of the snapshots in progress are kept.
+
+        Returns:
+            int: Number of freed bytes.
+        """
+        used = set()
+        for ref in self.list_refs():
+            used.update(ref_objects(ref))
+
+        freed = 0
+        for entry in os.scandir(self.objects_dir):
+            if entry.name not in used:
+                freed += entry.stat().st_size
+                os.remove(entry.path)
+        for entry in os.scandir(self.path):
+            if entry.name.startswith('tmp-') and entry.is_dir():
+                shutil.rmtree(entry.path, ignore_errors=True)
+        return freed
+
+# endregion
+
+# region Refs
+
+    def _ref_path(self, name: str) -> str:
+        validate_snapshot_name(name)
+        return os.path.join(self.refs_dir, f'{name}.json')
+
+    def save_ref(self, name: str, ref: dict) -> None:
+        """
+        Saves (or replaces) a snapshot ref.
+
+        Args:
+            name (str): Snapshot name.
+            ref (dict): Snapshot data. `objects` maps the parts to the object keys,
+                `codecs` to their compression formats, `dump` the dump files
+                to their object keys and `tree` is the copy of the data folder.
+        """
+        ref_path = self._ref_path(name)
+        atomic_write(ref_path, json.dumps(dict(ref, name=name), indent=2))
+
+    def load_ref(self, name: str) -> dict:
+        """
+        Loads a snapshot ref.
+
+        Args:
+            name (str): Snapshot name.
+
+        Raises:
+            InputError: When the snapshot doesn't exist.
+
+        Returns:
+            dict: The snapshot data.
+        """
+        ref_path = self._ref_path(name)
+        if not os.path.exists(ref_path):
+            names = ', '.join(ref['name'] for ref in self.list_refs()) or '-'
+            raise InputError(f'The snapshot "{name}" doesn\'t exist. '
+                             f'Available snapshots: {names}')
+
+        with open(ref_path, 'r', encoding='utf8') as ref_file:
+            return json.load(ref_file)
+
+    def list_refs(self) -> list:
+        """
+        Returns:
+            list: All snapshot refs, oldest first.
+        """
+        refs = []
+        for entry in os.scandir(self.refs_dir):
+            if not entry.name.endswith('.json'):
+                continue
+            with open(entry.path, 'r', encoding='utf8') as ref_file:
+                refs.append(json.load(ref_file))
+        return sorted(refs, key=lambda ref: ref.get('created', 0))
+
+    def ref_size(self, ref: dict) -> int:
+        """
+        Args:
+            ref (dict): Snapshot data.
+
+        Returns:
+            int: Size in bytes of the snapshot's objects, the trees aren't counted
+                as their blocks are shared.
+        """
+        size = 0
+        for key in ref_objects(ref):
+            if os.path.exists(self.object_path(key)):
+                size += os.path.getsize(self.object_path(key))
+        return size
+
+# endregion
@@ -0,0 +1,396 @@
+"""
+Deduplication of the Odoo filestores of the workspace.
+
+Odoo never modifies an attachment file in place (a new content is a new file),
+so the identical files of the projects' filestores can share their storage:
+every distinct content is kept once in the workspace blob store
+(`<sha1[:2]>/<sha1>`, as in the filestore) and the filestore files
+are replaced by hard links or reflinks to it.
+
+An incremental index keeps the sha1 of every file, folder by folder:
+the folders whose mtime didn't change since the last run aren't listed again
+and only the new files of the other folders are hashed.
+"""
+
+import os
+import hashlib
+import dataclasses
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable, Union
+
+from ..constants import DEF_JOBS
+from .fileio import FileLock
+from .fileio import load_json
+from .fileio import save_json
+
+INDEX_FILE = 'index.json'
+INDEX_VERSION = 1
+HASH_CHUNK_SIZE = 1024 * 1024
+DEDUPE_MODES = ['hardlink', 'reflink']
+TMP_SUFFIX = '.ogen-dedupe'
+
+
+def file_sha1(path: str) -> str:
+    """
+    Computes the sha1 of a file, the hash used by Odoo to name the attachments.
+
+    Args:
+        path (str): The file.
+
+    Returns:
+        str: The hex digest.
+    """
+    digest = hashlib.sha1()
+    with open(path, 'rb') as blob:
+        for chunk in iter(lambda: blob.read(HASH_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _clone_file(src: str, dest: str, mode: str) -> None:
+    """
+    Creates `dest` sharing the storage of `src`.
+
+    Raises:
+        OSError: When the file system doesn't support it,
+                 e.g. different devices or no reflinks.
+    """
+    if mode == 'hardlink':
+        os.link(src, dest)
+        return
+
+    try:
+        subprocess.run(['cp', '--reflink=always', src, dest],
+                       check=True, stderr=subprocess.PIPE, encoding='utf8')
+    except subprocess.CalledProcessError as err:
+        raise OSError(err.stderr.strip() or f'Unable to reflink "{src}"') from err
+
+
+@dataclasses.dataclass
+class DedupeReport:  # pylint: disable=too-many-instance-attributes
+    """
+    Outcome of a deduplication run.
+    """
+    filestores: int = 0
+    files: int = 0
+    size: int = 0
+    hashed: int = 0
+    hashed_size: int = 0
+    duplicates: int = 0
+    reclaimable: int = 0
+    linked: int = 0
+    pruned: int = 0
+    errors: list = dataclasses.field(default_factory=list)
+
+
+class FilestoreDeduper:
+    """
+    Replaces the duplicated files of filestores by links to a content addressed store.
+
+    Usage:
+        deduper = FilestoreDeduper(store_path, mode='hardlink')
+        report = deduper.run(filestore_paths, dry_run=True)
+    """
+
+    path: str
+    mode: str
+    jobs: int
+
+    def __init__(self, path: str, mode: str = 'hardlink', jobs: int = DEF_JOBS):
+        """
+        Args:
+            path (str): The blob store, on the file system of the filestores.
+            mode (str, optional): `hardlink` or `reflink`. Defaults to 'hardlink'.
+            jobs (int, optional): Folders listed and files hashed in parallel.
+        """
+        self.path = path
+        self.mode = mode
+        self.jobs = max(jobs, 1)
+
+    @property
+    def index_path(self) -> str:
+        """
+        Returns:
+            str: Path of the index file.
+        """
+        return os.path.join(self.path, INDEX_FILE)
+
+    def blob_path(self, sha1: str) -> str:
+        """
+        Returns:
+            str: Path of a blob in the store.
+        """
+        return os.path.join(self.path, sha1[:2], sha1)
+
+# region Scan
+
+    def _list_tree(self, root: str, index: dict) -> tuple:
+        """
+        Lists the files of a filestore, reusing the index entries of the unchanged folders.
+
+        Returns:
+            tuple: ({folder: index entry}, [(folder, name, size, inode) of the files to hash])
+        """
+        folders = {}
+        to_hash = []
+        stack = [root]
+        while stack:
+            folder = stack.pop()
+            try:
+                mtime = os.stat(folder).st_mtime_ns
+            except OSError:
+                continue
+
+            previous = index.get(folder)
+            if previous and previous['mtime'] == mtime:
+                folders[folder] = previous
+                stack += [os.path.join(folder, name) for name in previous['dirs']]
+                continue
+
+            entry = {'mtime': mtime, 'dirs': [], 'files': {}}
+            old_files = previous['files'] if previous else {}
+            try:
+                with os.scandir(folder) as entries:
+                    for item in entries:
+                        if item.is_dir(follow_symlinks=False):
+                            entry['dirs'].append(item.name)
+                            stack.append(item.path)
+                            continue
+                        if not item.is_file(follow_symlinks=False) \
+                                or item.name.endswith(TMP_SUFFIX):
+                            continue
+                        stat = item.stat(follow_symlinks=False)
+                        old = old_files.get(item.name)
+                        if old and old[0] == stat.st_size and old[1] == stat.st_ino:
+                            entry['files'][item.name] = old
+                        else:
+                            to_hash.append((folder, item.name, stat.st_size, stat.st_ino))
+            except OSError:
+                continue
+            folders[folder] = entry
+
+        return folders, to_hash
+
+    # pylint: disable-next=too-many-locals
+    def scan(self, roots: Iterable[str], index: dict, report: DedupeReport) -> dict:
+        """
+        Brings the index in line with the filestores, hashing the new files.
+
+        Args:
+            roots (Iterable[str]): The filestore folders.
+            index (dict): The folders of the current index.
+            report (DedupeReport): Receives the numbers of the scan.
+
+        Returns:
+            dict: The folders of the new index {folder: {mtime, dirs, files}},
+                  the files being {name: [size, inode, sha1]}.
+        """
+        folders = {}
+        to_hash = []
+        roots = [root for root in roots if os.path.isdir(root)]
+        report.filestores = len(roots)
+        with ThreadPoolExecutor(max_workers=self.jobs) as executor:
+            for root_folders, root_to_hash in executor.map(
+                    lambda root: self._list_tree(root, index), roots):
+                folders.update(root_folders)
+                to_hash += root_to_hash
+
+            paths = [os.path.join(folder, name) for folder, name, _size, _ino in to_hash]
+            for (folder, name, size, ino), sha1 in zip(
+                    to_hash, executor.map(self._safe_sha1, paths)):
+                if sha1:
+                    folders[folder]['files'][name] = [size, ino, sha1]
+                    report.hashed += 1
+                    report.hashed_size += size
+
+        for entry in folders.values():
+            report.files += len(entry['files'])
+            report.size += sum(values[0] for values in entry['files'].values())
+        return folders
+
+    @staticmethod
+    def _safe_sha1(path: str) -> Union[str, None]:
+        try:
+            return file_sha1(path)
+        except OSError:
+            # Removed or unreadable since it was listed
+            return None
+
+# endregion
+
+# region Deduplication
+
+    @staticmethod
+    def _groups(folders: dict) -> dict:
+        """
+        Returns:
+            dict: {sha1: [(folder, name, size, inode)]} of the indexed files.
+        """
+        groups = {}
+        for folder, entry in folders.items():
+            for name, (size, ino, sha1) in entry['files'].items():
+                groups.setdefault(sha1, []).append((folder, name, size, ino))
+        return groups
+
+    def _link(self, folder: str, name: str, ino: int, blob: str) -> Union[int, None]:
+        """
+        Replaces a file by a link to the blob, atomically.
+
+        Returns:
+            int: The inode of the new file, None if the file was removed
+                 or replaced since the scan.
+        """
+        path = os.path.join(folder, name)
+        try:
+            if os.stat(path).st_ino != ino:
+                return None
+        except FileNotFoundError:
+            return None
+
+        tmp_path = path + TMP_SUFFIX
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        _clone_file(blob, tmp_path, self.mode)
+        try:
+            os.replace(tmp_path, path)
+        except OSError:
+            os.unlink(tmp_path)
+            raise
+        return os.stat(path).st_ino
+
+    def _store_blob(self, sha1: str, folder: str, name: str) -> int:
+        """
+        Adds a content to the store from one of its files.
+
+        Returns:
+            int: The inode of the blob.
+        """
+        blob = self.blob_path(sha1)
+        os.makedirs(os.path.dirname(blob), exist_ok=True)
+        tmp_path = blob + TMP_SUFFIX
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        _clone_file(os.path.join(folder, name), tmp_path, self.mode)
+        os.replace(tmp_path, blob)
+        return os.stat(blob).st_ino
+
+    # pylint: disable-next=too-many-locals,too-many-branches
+    def dedupe(self, folders: dict, report: DedupeReport, dry_run: bool = False) -> set:
+        """
+        Links the duplicated files to the store.
+        With hard links a file is a duplicate when its inode isn't the blob's one,
+        the reflinked files are flagged in the index.
+
+        Args:
+            folders (dict): The folders of the index, as returned by `scan`. Updated in place.
+            report (DedupeReport): Receives the duplicates and the reclaimable bytes.
+            dry_run (bool, optional): Only report. Defaults to False.
+
+        Returns:
+            set: The sha1 of the contents referenced by the filestores.
+        """
+        groups = self._groups(folders)
+        for sha1, files in groups.items():
+            blob = self.blob_path(sha1)
+            try:
+                blob_ino = os.stat(blob).st_ino
+            except OSError:
+                blob_ino = None
+            if blob_ino is None and len(files) < 2:
+                continue
+
+            # Without a blob yet, the first file is stored and isn't a duplicate
+            first_ino = files[0][3] if blob_ino is None else blob_ino
+            seen_inodes = {first_ino}
+            for folder, name, size, ino in files:
+                linked = len(folders[folder]['files'][name]) > 3
+                if ino in seen_inodes or linked:
+                    continue
+                seen_inodes.add(ino)
+                report.duplicates += 1
+                report.reclaimable += size
+
+            if dry_run or len(seen_inodes) < 2:
+                continue
+
+            try:
+                if blob_ino is None:
+                    folder, name, _size, _ino = files[0]
+                    blob_ino = self._store_blob(sha1, folder, name)
+                    if self.mode == 'hardlink':
+                        folders[folder]['files'][name][1] = blob_ino
+                for folder, name, _size, ino in files:
+                    values = folders[folder]['files'][name]
+                    if ino == blob_ino or len(values) > 3:
+                        continue
+                    new_ino = self._link(folder, name, ino, blob)
+                    if new_ino is None:
+                        continue
+                    values[1] = new_ino
+                    if self.mode == 'reflink':
+                        values.append('reflink')
+                    report.linked += 1
+            except OSError as err:
+                report.errors.append(f'{sha1}: {err}')
+
+        if not dry_run:
+            # The folders were changed by the links
+            for folder, entry in folders.items():
+                try:
+                    entry['mtime'] = os.stat(folder).st_mtime_ns
+                except OSError:
+                    pass
+        return set(groups)
+
+    def prune(self, referenced: set, report: DedupeReport, dry_run: bool = False) -> None:
+        """
+        Removes the blobs no filestore references anymore.
+
+        Args:
+            referenced (set): The sha1 of the filestore files.
+            report (DedupeReport): Receives the number of removed blobs.
+            dry_run (bool, optional): Only count them. Defaults to False.
+        """
+        if not os.path.isdir(self.path):
+            return
+        for prefix in os.listdir(self.path):
+            prefix_path = os.path.join(self.path, prefix)
+            if not os.path.isdir(prefix_path):
+                continue
+            for name in os.listdir(prefix_path):
+                if name in referenced:
+                    continue
+                report.pruned += 1
+                if not dry_run:
+                    os.unlink(os.path.join(prefix_path, name))
+
+# endregion
+
+    def run(self, roots: Iterable[str], dry_run: bool = False) -> DedupeReport:
+        """
+        Scans the filestores, links their duplicated files to the store
+        and removes the unused blobs. The index is locked during the run,
+        so two runs don't work on the same files.
+
+        Args:
+            roots (Iterable[str]): The filestore folders.
+            dry_run (bool, optional): Only report the reclaimable bytes. Defaults to False.
+
+        Returns:
+            DedupeReport: The report.
+        """
+        report = DedupeReport()
+        os.makedirs(self.path, exist_ok=True)
+        with FileLock(self.index_path):
+            index = load_json(self.index_path)
+            if index.get('version') != INDEX_VERSION:
+                index = {}
+
+            folders = self.scan(roots, index.get('folders', {}), report)
+            referenced = self.dedupe(folders, report, dry_run=dry_run)
+            self.prune(referenced, report, dry_run=dry_run)
+
+            # The hashes are kept even in dry-run, the next run doesn't compute them again
+            save_json(self.index_path, {'version': INDEX_VERSION, 'folders': folders})
+        return report
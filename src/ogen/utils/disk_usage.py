@@ -0,0 +1,266 @@
+"""
+Disk usage of the workspace (`ogen du`) and its reclamation (`ogen gc`).
+
+The folders are measured in parallel, the docker side (images, build cache,
+networks) is read with a few concurrent docker calls.
+"""
+
+import os
+import json
+import time
+import shutil
+import dataclasses
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable
+
+from ..constants import DEF_JOBS
+from .docker_compose import DockerCompose as DC
+from .docker_stats import parse_size
+from .helper import execute_command
+from .registry import dir_size
+
+# Parts of a project measured by `ogen du`, in display order
+USAGE_PARTS = ['odoo', 'git', 'addons', 'db_data', 'filestore', 'other']
+
+GC_POLICIES = ['stale', 'images', 'networks', 'build-cache']
+
+# Labels naming the project of an image: set by `DockerCompose.build` (project name)
+# and by docker compose (compose project name)
+IMAGE_PROJECT_LABELS = ['ogen.project', 'com.docker.compose.project']
+NETWORK_PREFIX = 'net_'
+
+
+def project_parts(project) -> dict:
+    """
+    Returns the folders measured for a project, each one with the sub-folders left out.
+
+    Args:
+        project (Project): The project.
+
+    Returns:
+        dict: {part: (path, [excluded paths])}
+    """
+    odoo = project.get_key_path('odoo')
+    addons = project.get_key_path('custom_addons')
+    db_data = project.get_key_path('db_data')
+    filestore = os.path.join(project.get_key_path('odoo_data'), 'filestore')
+    git = os.path.join(odoo, '.git')
+    return {
+        'odoo': (odoo, [git]),
+        'git': (git, []),
+        'addons': (addons, []),
+        'db_data': (db_data, []),
+        'filestore': (filestore, []),
+        'other': (project.data.project_path, [odoo, addons, db_data, filestore]),
+    }
+
+
+def measure_projects(projects: dict, jobs: int = DEF_JOBS) -> dict:
+    """
+    Measures the parts of the projects, all the folders in parallel.
+
+    Args:
+        projects (dict): {name: Project}
+        jobs (int, optional): Folders measured at the same time.
+
+    Returns:
+        dict: {name: {part: size}}
+    """
+    tasks = [(name, part, path, exclude)
+             for name, project in projects.items()
+             for part, (path, exclude) in project_parts(project).items()]
+
+    res = {name: {} for name in projects}
+    with ThreadPoolExecutor(max_workers=max(jobs, 1)) as executor:
+        sizes = executor.map(lambda task: dir_size(task[2], exclude=task[3]), tasks)
+        for (name, part, _path, _exclude), size in zip(tasks, sizes):
+            res[name][part] = size
+    return res
+
+
+@dataclasses.dataclass
+class DockerInventory:
+    """
+    The docker resources of the workspace projects.
+    """
+    # {project: size of its current image}
+    images: dict = dataclasses.field(default_factory=dict)
+    # [(image id, project, size)] of the untagged images replaced by a newer build
+    superseded: list = dataclasses.field(default_factory=list)
+    # Names of the networks created by oGen for the workspace projects
+    networks: list = dataclasses.field(default_factory=list)
+    build_cache: int = 0
+    build_cache_reclaimable: int = 0
+
+    def project_images(self, project: str) -> int:
+        """
+        Returns:
+            int: Size of the superseded images of a project.
+        """
+        return sum(size for _id, name, size in self.superseded if name == project)
+
+
+def _parse_image_sizes(output: str) -> dict:
+    images = {}
+    for line in output.splitlines():
+        tags, _sep, size = line.partition('\t')
+        try:
+            for tag in json.loads(tags) or []:
+                images[tag.rsplit(':', 1)[0]] = int(size)
+        except ValueError:
+            continue
+    return images
+
+
+def _parse_build_cache(output: str) -> tuple:
+    for line in output.splitlines():
+        try:
+            usage = json.loads(line)
+        except ValueError:
+            continue
+        if usage.get('Type') == 'Build Cache':
+            # E.g. {"Size": "1.2GB", "Reclaimable": "800MB (66%)"}
+            return (parse_size(usage.get('Size', '')),
+                    parse_size(usage.get('Reclaimable', '').split(' ')[0]))
+    return 0, 0
+
+
+def docker_inventory(contexts: dict,  # pylint: disable=too-many-locals
+                     workspace_path: str) -> DockerInventory:
+    """
+    Reads the sizes of the project images, the superseded images,
+    the build cache and the networks, with concurrent docker calls.
+
+    Args:
+        contexts (dict): The compose contexts of the workspace projects {name: ComposeContext},
+                         only their superseded images are listed.
+        workspace_path (str): The workspace folder, only the networks labelled
+                              with it are listed (see DockerCompose.create_network).
+
+    Returns:
+        DockerInventory: The inventory, empty when docker isn't available.
+    """
+    # pylint: disable=import-outside-toplevel
+    from .command_engine import CommandEngine
+    from .command_engine import CommandSpec
+
+    image_names = {DC.image_name(ctx): name for name, ctx in contexts.items()}
+    specs = [
+        CommandSpec(['docker', 'system', 'df', '--format', '{{json .}}'], capture=True),
+        CommandSpec(['docker', 'network', 'ls',
+                     '--filter', f'label={DC.workspace_label(workspace_path)}',
+                     '--format', '{{.Name}}'], capture=True),
+    ] + [
+        # Several label filters would have to match all together
+        CommandSpec(['docker', 'image', 'ls', '--quiet', '--no-trunc',
+                     '--filter', 'dangling=true', '--filter', f'label={label}'], capture=True)
+        for label in IMAGE_PROJECT_LABELS
+    ]
+    if image_names:
+        # The missing images fail the call, the others are still printed
+        specs.append(CommandSpec(['docker', 'image', 'inspect', '--format',
+                                  '{{json .RepoTags}}\t{{.Size}}'] + list(image_names),
+                                 capture=True))
+
+    inventory = DockerInventory()
+    engine = CommandEngine()
+    try:
+        results = engine.run_many_sync(specs)
+    except OSError:
+        return inventory
+
+    system_df, networks = results[:2]
+    dangling = results[2:2 + len(IMAGE_PROJECT_LABELS)]
+    inventory.build_cache, inventory.build_cache_reclaimable = \
+        _parse_build_cache(system_df.stdout)
+    inventory.networks = networks.stdout.split()
+    if image_names:
+        inventory.images = {image_names[image]: size for image, size
+                            in _parse_image_sizes(results[-1].stdout).items()
+                            if image in image_names}
+
+    image_ids = sorted({image_id for result in dangling for image_id in result.stdout.split()})
+    if image_ids:
+        projects = {ctx.project_name: name for name, ctx in contexts.items()}
+        projects.update({name: name for name in contexts})
+        labels = '\t'.join(f'{{{{index .Config.Labels "{label}"}}}}'
+                           for label in IMAGE_PROJECT_LABELS)
+        inspect = engine.run_sync(
+            ['docker', 'image', 'inspect', '--format', f'{{{{.Id}}}}\t{{{{.Size}}}}\t{labels}']
+            + image_ids, capture=True)
+        for line in inspect.stdout.splitlines():
+            image_id, size, *names = line.split('\t')
+            project = next((name for name in names if name in projects), '')
+            if project and size.isdigit():
+                inventory.superseded.append((image_id, projects[project], int(size)))
+    return inventory
+
+
+def last_use(entry: dict) -> float:
+    """
+    Returns:
+        float: When a project was last started, built or created, from its registry entry.
+    """
+    return max(entry.get('last_start') or 0, entry.get('build_date') or 0,
+               entry.get('created') or 0, entry.get('conf_mtime') or 0)
+
+
+@dataclasses.dataclass
+class GcAction:
+    """
+    A step of the garbage collection plan.
+    """
+    policy: str
+    target: str
+    reason: str
+    size: int = 0
+    # The size is an upper bound, e.g. the build cache
+    estimate: bool = False
+    # [(command, allow_error)] run in order
+    commands: list = dataclasses.field(default_factory=list)
+    # Folders removed after the commands
+    paths: list = dataclasses.field(default_factory=list)
+
+    def apply(self) -> None:
+        """
+        Runs the commands and removes the folders.
+
+        Raises:
+            OCLIError: When a command fails.
+            OSError: When a folder can't be removed.
+        """
+        for command, allow_error in self.commands:
+            execute_command(command, allow_error=allow_error)
+        for path in self.paths:
+            if os.path.isdir(path):
+                shutil.rmtree(path)
+
+
+def stale_projects(entries: dict, unused_days: int, now: float = 0.0) -> dict:
+    """
+    Selects the stopped projects not used for a while.
+
+    Args:
+        entries (dict): The registry entries {name: entry}.
+        unused_days (int): Days without start, build or change of the config.
+        now (float, optional): Reference time. Defaults to the current time.
+
+    Returns:
+        dict: {name: idle days}
+    """
+    now = now or time.time()
+    res = {}
+    for name, entry in entries.items():
+        idle_days = int((now - last_use(entry)) // 86400)
+        if not entry.get('running') and idle_days >= unused_days:
+            res[name] = idle_days
+    return res
+
+
+def orphan_networks(inventory: DockerInventory, projects: Iterable[str]) -> list:
+    """
+    Returns:
+        list: The networks created for the workspace, whose project isn't in it anymore.
+    """
+    names = {f'{NETWORK_PREFIX}{project}' for project in projects}
+    return [network for network in inventory.networks if network not in names]
@@ -4,13 +4,49 @@ DockerCompose file generator class
 
 import os
 import json
-import yaml
+import tempfile
+import subprocess
+import dataclasses
+from typing import Union
 import click
 
 from ..constants import DEF_DOCKER_COMPOSE_VERSION
 from ..constants import DEF_PSQL_VERSION
+from ..constants import DEF_SLOWLOG_MIN_DURATION
 from .helper import generate_password
 from .helper import execute_command
+from .fileio import atomic_write
+
+# Label of the networks created by oGen, its value is the workspace folder
+WORKSPACE_LABEL = 'ogen.workspace'
+
+
+@dataclasses.dataclass(frozen=True)
+class ComposeContext:
+    """
+    Execution context of the docker compose commands of a project.
+    The commands name the project, its directory and compose file explicitly
+    instead of relying on the current working directory, so several projects
+    can be handled at the same time from threads.
+    """
+    project_dir: str
+    project_name: str
+    compose_file: str
+
+    def command(self, *args: str) -> list:
+        """
+        Prepares a `docker compose` command of the project.
+
+        Args:
+            *args (str): The compose subcommand and its args.
+
+        Returns:
+            list: The full command ready to be passed to subprocess.Popen
+        """
+        return ['docker', 'compose',
+                '--project-directory', self.project_dir,
+                '--project-name', self.project_name,
+                '--file', self.compose_file] + list(args)
 
 
 class DockerCompose:  # pylint: disable=too-few-public-methods
@@ -76,7 +112,7 @@ class DockerCompose:  # pylint: disable=too-few-public-methods
         odoo_config = {
             'build': {
                 'context': '.',
-                'dockerfile': dockerfile_path
+                'dockerfile': dockerfile_path,
             },
             'volumes': [
                 f'{custom_addons_path}:/mnt/addons',
@@ -119,6 +155,7 @@ class DockerCompose:  # pylint: disable=too-few-public-methods
         self._set_odoo()
         self._set_network()
 
+        import yaml  # pylint: disable=import-outside-toplevel
         return yaml.dump(self.compose)
 
 # endregion
@@ -126,27 +163,79 @@ class DockerCompose:  # pylint: disable=too-few-public-methods
 # region Static functions
 
     @staticmethod
-    def build(no_cache: bool = False) -> None:
+    def build(ctx: ComposeContext, no_cache: bool = False,
+              labels: Union[dict, None] = None, service: str = 'odoo') -> None:
         """
         Runs the command to build the docker compose
 
         Args:
+            ctx (ComposeContext): The project's compose context.
             no_cache (bool, optional): Use --no-cache argument. Defaults to False.
+            labels (dict, optional): Labels of the built image, e.g. {'ogen.fingerprint': '...'}.
+            service (str, optional): The service whose image is labelled. Defaults to 'odoo'.
         """
+        import yaml  # pylint: disable=import-outside-toplevel
+        from . import trace  # pylint: disable=import-outside-toplevel
         click.echo("Building the docker image...")
 
-        command = ['docker', 'compose', 'build']
-        if no_cache:
-            command.append('--no-cache')
-        execute_command(command)
+        # The labels are added by an override file, the project's compose file is left as is
+        with tempfile.TemporaryDirectory(prefix='ogen-build-') as tmp_dir:
+            command = ctx.command()
+            if labels:
+                override_path = os.path.join(tmp_dir, 'labels.yml')
+                with open(override_path, 'w', encoding='utf8') as override_file:
+                    yaml.dump({'services': {service: {'build': {'labels': labels}}}},
+                              override_file)
+                command += ['--file', override_path]
+            command.append('build')
+            if no_cache:
+                command.append('--no-cache')
+            with trace.span('docker.build', project=ctx.project_name, no_cache=no_cache):
+                execute_command(command, cwd=ctx.project_dir)
+
+    @staticmethod
+    def tag_image(image: str, tag: str) -> None:
+        """
+        Gives an additional name to an image.
+
+        Args:
+            image (str): Image name or id.
+            tag (str): The new name, e.g. `ogen/myproject:3`.
+        """
+        execute_command(['docker', 'image', 'tag', image, tag])
+
+    @staticmethod
+    def remove_images(images: list) -> None:
+        """
+        Removes images or image names. An image still named otherwise,
+        or used by a container, is kept.
+
+        Args:
+            images (list): Image names or ids.
+        """
+        if images:
+            execute_command(['docker', 'image', 'rm'] + images, allow_error=True)
 
     @staticmethod
-    def create_network(name: str):
+    def workspace_label(workspace_path: str) -> str:
+        """
+        Args:
+            workspace_path (str): The workspace folder.
+
+        Returns:
+            str: The label of the networks of the workspace projects, as `key=value`.
+        """
+        return f'{WORKSPACE_LABEL}={os.path.abspath(workspace_path)}'
+
+    @staticmethod
+    def create_network(name: str, workspace_path: str = ''):
         """
         Creates a docker network with the specified name.
 
         Args:
             name (str): Network's name
+            workspace_path (str, optional): The workspace folder, recorded in a label
+                so `ogen gc` only removes the networks of its projects.
         """
         # Check if docker network already exists
         networks = execute_command(
@@ -161,59 +250,242 @@ class DockerCompose:  # pylint: disable=too-few-public-methods
                 return
 
         click.echo(f'Creating the `{name}` docker network...')
-        execute_command(['docker', 'network', 'create', name],
-                        allow_error=True)
+        command = ['docker', 'network', 'create']
+        if workspace_path:
+            command += ['--label', DockerCompose.workspace_label(workspace_path)]
+        execute_command(command + [name], allow_error=True)
 
     @staticmethod
-    def up(detached: bool = True):  # pylint: disable=invalid-name
+    def up(ctx: ComposeContext,  # pylint: disable=invalid-name
+           detached: bool = True,
+           services: Union[list, None] = None):
         """
         Create and start the docker containers.
 
         Args:
+            ctx (ComposeContext): The project's compose context.
             detached (bool): Detached mode: Run containers in the background
+            services (list, optional): Only these services (and their dependencies).
         """
-        command = ['docker', 'compose', 'up']
+        command = ctx.command('up')
         if detached:
             command.append('--detach')
 
-        execute_command(command)
+        execute_command(command + (services or []), cwd=ctx.project_dir)
+
+    @staticmethod
+    def recreate(ctx: ComposeContext, service: str):
+        """
+        Recreates and starts the container of a service, e.g. after its config changed.
+
+        Args:
+            ctx (ComposeContext): The project's compose context.
+            service (str): Service name.
+        """
+        command = ctx.command('up', '--detach', '--no-deps', service)
+        execute_command(command, cwd=ctx.project_dir)
 
     @staticmethod
-    def down():
+    def down(ctx: ComposeContext):
         """
         Stop and remove the docker containers.
+
+        Args:
+            ctx (ComposeContext): The project's compose context.
         """
-        command = ['docker', 'compose', 'down']
-        execute_command(command)
+        command = ctx.command('down')
+        execute_command(command, cwd=ctx.project_dir)
 
     @staticmethod
-    def start():
+    def start(ctx: ComposeContext, services: Union[list, None] = None):
         """
         Start the docker containers.
+
+        Args:
+            ctx (ComposeContext): The project's compose context.
+            services (list, optional): Only these services. Defaults to all.
         """
-        command = ['docker', 'compose', 'start']
-        execute_command(command)
+        command = ctx.command('start')
+        execute_command(command + (services or []), cwd=ctx.project_dir)
 
     @staticmethod
-    def stop():
+    def restart(ctx: ComposeContext, services: Union[list, None] = None):
+        """
+        Restart the docker containers.
+
+        Args:
+            ctx (ComposeContext): The project's compose context.
+            services (list, optional): Only these services. Defaults to all.
+        """
+        command = ctx.command('restart')
+        execute_command(command + (services or []), cwd=ctx.project_dir)
+
+    @staticmethod
+    def stop(ctx: ComposeContext, services: Union[list, None] = None):
         """
         Stop the docker containers.
+
+        Args:
+            ctx (ComposeContext): The project's compose context.
+            services (list, optional): Only these services. Defaults to all.
+        """
+        command = ctx.command('stop')
+        execute_command(command + (services or []), cwd=ctx.project_dir)
+
+    @staticmethod
+    def exec_command(ctx: ComposeContext, service: str, command: list) -> list:
+        """
+        Prepares a command to be executed inside the running container of a service.
+
+        Args:
+            ctx (ComposeContext): The project's compose context.
+            service (str): Service name.
+            command (list): The command and its args.
+
+        Returns:
+            list: The full command ready to be passed to subprocess.Popen
+        """
+        return ctx.command('exec', '-T', service) + command
+
+    @staticmethod
+    def run_command(ctx: ComposeContext, service: str, args: list) -> list:
+        """
+        Prepares a command to be executed in a one-off container of a service,
+        using the service's image, volumes and network, but none of its ports.
+
+        Args:
+            ctx (ComposeContext): The project's compose context.
+            service (str): Service name.
+            args (list): Arguments passed to the image's entrypoint.
+
+        Returns:
+            list: The full command ready to be passed to subprocess.Popen
+        """
+        return ctx.command('run', '--rm', '--no-deps', '-T', service) + args
+
+    @staticmethod
+    def image_name(ctx: ComposeContext, service: str = 'odoo') -> str:
+        """
+        Returns the name of the image built for a service.
+
+        Args:
+            ctx (ComposeContext): The project's compose context.
+            service (str, optional): Service name. Defaults to 'odoo'.
+
+        Returns:
+            str: The image name.
+        """
+        # Images built by compose are named `<project>-<service>`
+        return f'{ctx.project_name}-{service}'
+
+    @staticmethod
+    def image_id(ctx: ComposeContext, service: str = 'odoo') -> str:
         """
-        command = ['docker', 'compose', 'stop']
-        execute_command(command)
+        Retrieves the id of the image built for a service.
+
+        Args:
+            ctx (ComposeContext): The project's compose context.
+            service (str, optional): Service name. Defaults to 'odoo'.
+
+        Returns:
+            str: The image id, empty if the image doesn't exist.
+        """
+        image = DockerCompose.image_name(ctx, service)
+        try:
+            proc = subprocess.run(['docker', 'image', 'inspect', '--format', '{{.Id}}', image],
+                                  capture_output=True, encoding='utf8', check=False)
+        except OSError:
+            return ''
+        return proc.stdout.strip() if proc.returncode == 0 else ''
 
     @staticmethod
-    def status(running: bool = False) -> dict:
+    def get_db_command(slowlog: bool = False,
+                       min_duration: int = DEF_SLOWLOG_MIN_DURATION) -> list:
         """
-        Retrieves the status of comtainers part of the current compose.
+        Returns the command of the `db` service.
+
+        Args:
+            slowlog (bool, optional): Enable the slow queries capture:
+                `log_min_duration_statement`, `pg_stat_statements` and `auto_explain`.
+                Defaults to False.
+            min_duration (int, optional): Threshold of the slow queries in ms.
+
+        Returns:
+            list: The command or an empty list for the image's default.
+        """
+        if not slowlog:
+            return []
+
+        settings = {
+            'shared_preload_libraries': 'pg_stat_statements,auto_explain',
+            'pg_stat_statements.track': 'all',
+            'log_min_duration_statement': min_duration,
+            'log_line_prefix': '%m [%p] %q%u@%d ',
+            'auto_explain.log_min_duration': min_duration,
+            'auto_explain.log_nested_statements': 'on',
+        }
+        command = ['postgres']
+        for key, val in settings.items():
+            command += ['-c', f'{key}={val}']
+        return command
+
+    @staticmethod
+    def set_service_command(ctx: ComposeContext, service: str, command: list) -> None:
+        """
+        Updates the command of a service in the compose file.
+
+        Args:
+            ctx (ComposeContext): The project's compose context.
+            service (str): Service name.
+            command (list): The new command. An empty list restores the image's default.
+        """
+        import yaml  # pylint: disable=import-outside-toplevel
+        with open(ctx.compose_file, 'r', encoding='utf8') as yml_file:
+            compose = yaml.load(yml_file, Loader=yaml.SafeLoader)
+
+        serv_config = compose['services'][service]
+        if command:
+            serv_config['command'] = command
+        else:
+            serv_config.pop('command', None)
+
+        atomic_write(ctx.compose_file, yaml.dump(compose))
+
+    @staticmethod
+    def services(ctx: ComposeContext) -> list:
+        """
+        Reads the names of the services defined in the compose file.
+        This avoids spawning docker only to validate a service name.
+
+        Args:
+            ctx (ComposeContext): The project's compose context.
+
+        Returns:
+            list: Service names.
+        """
+        if not os.path.exists(ctx.compose_file):
+            return []
+
+        import yaml  # pylint: disable=import-outside-toplevel
+        with open(ctx.compose_file, 'r', encoding='utf8') as yml_file:
+            compose = yaml.load(yml_file, Loader=yaml.SafeLoader) or {}
+
+        return list(compose.get('services', {}))
+
+    @staticmethod
+    def status(ctx: ComposeContext, running: bool = False) -> dict:
+        """
+        Retrieves the status of comtainers part of the project's compose.
+
+        Args:
+            ctx (ComposeContext): The project's compose context.
+            running (bool, optional): Only the running containers. Defaults to False.
         """
-        command = [
-            'docker', 'compose', 'ps',
-            '--format', 'json'
-        ]
+        command = ctx.command('ps', '--format', 'json')
         command += ['--status', 'running'] if running else ['--all']
 
-        status_str = execute_command(command=command, return_output=True)
+        status_str = execute_command(command=command, return_output=True,
+                                     cwd=ctx.project_dir)
 
         status = json.loads(status_str)
 
@@ -6,6 +6,8 @@ import os
 import platform
 
 from ..constants import TAB_SIZE
+from ..constants import DEF_PYTHON_IMAGE
+from ..constants import REQUIREMENTS_MERGED
 
 
 class DockerFile:
@@ -59,7 +61,7 @@ class DockerFile:
         self._al('', 0)
 
     def _add_header_part(self) -> None:
-        self._al('FROM python:3.11.5-bookworm')
+        self._al(f'FROM {DEF_PYTHON_IMAGE}')
         self._al('SHELL ["/bin/bash", "-xo", "pipefail", "-c"]')
 
         self._add_spacer()
@@ -178,35 +180,27 @@ class DockerFile:
         """
         Populates the docker file with instructions
         to install specific pip libraries.
-        """
 
-        # Determine the path to odoo and custom_addons folders
-        # and check if they contain a requirements.txt file.
+        The requirements of Odoo and of all the addons are aggregated beforehand
+        in `requirements.merged.txt`, next to the dockerfile, and installed by a single pip call.
+        The pip cache is a BuildKit cache mount: it outlives the image builds,
+        `--no-cache` included, so the packages are downloaded and built once.
+        """
         project_path = self.key_paths.get('project', '')
-        odoo_path = self.key_paths.get('odoo', '').replace(project_path, '.')
-        addons_path = self.key_paths.get('custom_addons', '')
-        addons_req_exists = os.path.exists(
-            os.path.join(addons_path, 'requirements.txt'))
+        docker_file_path = self.key_paths.get('docker_file', '')
+        merged_path = os.path.join(os.path.dirname(docker_file_path), REQUIREMENTS_MERGED)
 
-        if not odoo_path:
+        if not os.path.exists(merged_path):
             return
 
-        self._al(
-            f'COPY {odoo_path}/requirements.txt /tmp/odoo_requirements.txt', 0)
-
-        if addons_req_exists:
-            addons_path = addons_path.replace(project_path, '.')
-            self._al(
-                f'COPY {addons_path}/requirements.txt /tmp/addons_requirements.txt', 0)
+        merged_path = merged_path.replace(project_path, '.')
+        self._al(f'COPY {merged_path} /tmp/{REQUIREMENTS_MERGED}', 0)
 
         self._add_spacer()
-        self._al('RUN pip3 install --upgrade pip \\', 0)
-        self._al('&& pip3 install wheel \\', 1)
-        self._al('&& pip3 install setuptools_rust \\')
-        self._al('&& pip3 install -r /tmp/odoo_requirements.txt \\')
-        if addons_req_exists:
-            self._al('&& pip3 install -r /tmp/addons_requirements.txt \\')
-        self._al('&& rm -rf /tmp/*requirements*.txt')
+        self._al('RUN --mount=type=cache,target=/root/.cache/pip \\', 0)
+        self._al('pip3 install --upgrade pip wheel setuptools_rust \\', 1)
+        self._al(f'&& pip3 install -r /tmp/{REQUIREMENTS_MERGED} \\')
+        self._al(f'&& rm -rf /tmp/{REQUIREMENTS_MERGED}')
 
         self._add_spacer()
 
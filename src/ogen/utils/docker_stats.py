@@ -0,0 +1,201 @@
+"""
+Resource usage sampling of the project's containers, based on `docker stats`
+"""
+
+import os
+import re
+import csv
+import json
+import time
+from typing import Union
+
+from .helper import execute_command
+from .helper import format_size
+
+SIZE_UNITS = {
+    'b': 1,
+    'kb': 1000, 'mb': 1000 ** 2, 'gb': 1000 ** 3, 'tb': 1000 ** 4,
+    'kib': 1024, 'mib': 1024 ** 2, 'gib': 1024 ** 3, 'tib': 1024 ** 4,
+}
+SIZE_RE = re.compile(r'^\s*([\d.]+)\s*([a-zA-Z]*)\s*$')
+
+CSV_COLUMNS = [
+    'time', 'service',
+    'cpu_pct', 'mem_bytes', 'mem_limit', 'mem_pct',
+    'net_rx', 'net_tx', 'block_read', 'block_write', 'pids',
+]
+
+
+def parse_size(value: str) -> int:
+    """
+    Converts a size printed by docker (e.g. `28.4MiB`, `1.2kB`) into bytes.
+
+    Args:
+        value (str): The size.
+
+    Returns:
+        int: Number of bytes, 0 when the value can't be parsed.
+    """
+    match = SIZE_RE.match(value or '')
+    if not match:
+        return 0
+    unit = SIZE_UNITS.get(match.group(2).lower() or 'b', 1)
+    return int(float(match.group(1)) * unit)
+
+
+def _parse_pair(value: str) -> tuple:
+    first, _sep, second = (value or '').partition('/')
+    return parse_size(first), parse_size(second)
+
+
+def parse_stats_line(line: str) -> Union[dict, None]:
+    """
+    Parses a line printed by `docker stats --format '{{json .}}'`.
+
+    Args:
+        line (str): The json line.
+
+    Returns:
+        dict: The container's resource usage, None for invalid lines.
+    """
+    try:
+        raw = json.loads(line)
+    except ValueError:
+        return None
+
+    mem_bytes, mem_limit = _parse_pair(raw.get('MemUsage'))
+    net_rx, net_tx = _parse_pair(raw.get('NetIO'))
+    block_read, block_write = _parse_pair(raw.get('BlockIO'))
+    return {
+        'id': raw.get('ID', ''),
+        'name': raw.get('Name', ''),
+        'cpu_pct': float((raw.get('CPUPerc') or '0').rstrip('%') or 0),
+        'mem_bytes': mem_bytes,
+        'mem_limit': mem_limit,
+        'mem_pct': float((raw.get('MemPerc') or '0').rstrip('%') or 0),
+        'net_rx': net_rx,
+        'net_tx': net_tx,
+        'block_read': block_read,
+        'block_write': block_write,
+        'pids': int(raw.get('PIDs') or 0),
+    }
+
+
+class StatsSampler:
+    """
+    Samples the resource usage of a set of containers
+    and keeps the aggregates needed for the final summary.
+    """
+
+    containers: dict
+    summary: dict
+    record_path: Union[str, None]
+
+    def __init__(self, containers: dict, record_path: Union[str, None] = None):
+        """
+        Args:
+            containers (dict): {service: container id}, e.g. from DockerCompose.status
+            record_path (str, optional): CSV file where the samples are appended.
+        """
+        self.containers = containers
+        self.record_path = record_path
+        self.summary = {}
+
+    def sample(self) -> dict:
+        """
+        Takes one sample of all containers.
+
+        Returns:
+            dict: {service: usage}
+        """
+        services = {cont_id: service for service, cont_id in self.containers.items()}
+        output = execute_command(
+            ['docker', 'stats', '--no-stream', '--format', '{{json .}}']
+            + list(services),
+            return_output=True)
+
+        stamp = time.time()
+        res = {}
+        for line in output.splitlines():
+            usage = parse_stats_line(line)
+            if not usage:
+                continue
+            service = services.get(usage['id']) \
+                or next((serv for cont_id, serv in services.items()
+                         if cont_id.startswith(usage['id'])), usage['name'])
+            usage['time'] = stamp
+            res[service] = usage
+            self._aggregate(service, usage)
+
+        if self.record_path:
+            self._record(res)
+        return res
+
+    def _aggregate(self, service: str, usage: dict) -> None:
+        summary = self.summary.setdefault(service, {
+            'samples': 0,
+            'cpu_total': 0.0,
+            'cpu_peak': 0.0,
+            'mem_peak': 0,
+        })
+        summary['samples'] += 1
+        summary['cpu_total'] += usage['cpu_pct']
+        summary['cpu_peak'] = max(summary['cpu_peak'], usage['cpu_pct'])
+        summary['mem_peak'] = max(summary['mem_peak'], usage['mem_bytes'])
+        for key in ['net_rx', 'net_tx', 'block_read', 'block_write']:
+            summary[key] = usage[key]
+
+    def _record(self, usages: dict) -> None:
+        new_file = not os.path.exists(self.record_path)
+        with open(self.record_path, 'a', encoding='utf8', newline='') as csv_file:
+            writer = csv.writer(csv_file)
+            if new_file:
+                writer.writerow(CSV_COLUMNS)
+            for service, usage in usages.items():
+                writer.writerow([
+                    f"{usage['time']:.3f}", service,
+                    usage['cpu_pct'], usage['mem_bytes'], usage['mem_limit'], usage['mem_pct'],
+                    usage['net_rx'], usage['net_tx'],
+                    usage['block_read'], usage['block_write'], usage['pids'],
+                ])
+
+    @staticmethod
+    def format_table(usages: dict) -> list:
+        """
+        Formats a sample as table lines.
+
+        Args:
+            usages (dict): A sample, as returned by `sample`
+
+        Returns:
+            list: The table lines.
+        """
+        lines = [f"{'SERVICE':<10} {'CPU%':>7} {'MEM':>10} {'MEM%':>6} "
+                 f"{'NET RX/TX':>21} {'BLOCK R/W':>21} {'PIDS':>5}"]
+        for service, usage in sorted(usages.items()):
+            net = f"{format_size(usage['net_rx'])}/{format_size(usage['net_tx'])}"
+            block = f"{format_size(usage['block_read'])}/{format_size(usage['block_write'])}"
+            lines.append(
+                f"{service:<10} {usage['cpu_pct']:>7.2f} {format_size(usage['mem_bytes']):>10} "
+                f"{usage['mem_pct']:>6.2f} {net:>21} {block:>21} {usage['pids']:>5}")
+        return lines
+
+    def format_summary(self) -> list:
+        """
+        Formats the summary of all samples (mean and peak CPU, peak RSS, total I/O).
+
+        Returns:
+            list: The summary lines.
+        """
+        lines = [f"{'SERVICE':<10} {'SAMPLES':>7} {'MEAN CPU%':>9} {'PEAK CPU%':>9} "
+                 f"{'PEAK MEM':>10} {'NET RX/TX':>21} {'BLOCK R/W':>21}"]
+        for service, summary in sorted(self.summary.items()):
+            mean_cpu = summary['cpu_total'] / summary['samples']
+            net = f"{format_size(summary['net_rx'])}/{format_size(summary['net_tx'])}"
+            block = f"{format_size(summary['block_read'])}/" \
+                f"{format_size(summary['block_write'])}"
+            lines.append(
+                f"{service:<10} {summary['samples']:>7} {mean_cpu:>9.2f} "
+                f"{summary['cpu_peak']:>9.2f} {format_size(summary['mem_peak']):>10} "
+                f"{net:>21} {block:>21}")
+        return lines
@@ -0,0 +1,227 @@
+"""
+Recursive file watcher, based on Linux inotify (through ctypes)
+with a polling fallback on the other systems.
+"""
+
+import os
+import time
+import errno
+import ctypes
+import ctypes.util
+import select
+import struct
+from typing import Iterator, Union
+
+# inotify event masks, see inotify(7)
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE \
+    | IN_DELETE_SELF
+EVENT_HEADER = struct.Struct('iIII')
+
+# Folders whose changes are never relevant
+IGNORED_DIRS = ('.git', '__pycache__', 'node_modules', '.idea', '.vscode')
+# Temporary files of the editors
+IGNORED_SUFFIXES = ('~', '.swp', '.swx', '.tmp', '.pyc')
+
+
+def _ignored(path: str) -> bool:
+    name = os.path.basename(path)
+    return name.endswith(IGNORED_SUFFIXES) or name.startswith('.#')
+
+
+def _walk_dirs(root: str) -> Iterator[str]:
+    for dir_path, dir_names, _file_names in os.walk(root):
+        dir_names[:] = [name for name in dir_names if name not in IGNORED_DIRS]
+        yield dir_path
+
+
+class FileWatcher:
+    """
+    Watches a folder tree and yields the changed files in batches,
+    once no change happened during the debounce delay.
+    """
+
+    root: str
+    debounce: float
+
+    def __init__(self, root: str, debounce: float = 0.5):
+        """
+        Args:
+            root (str): Folder to watch, recursively.
+            debounce (float, optional): Seconds without changes closing a batch.
+                                        Defaults to 0.5.
+        """
+        self.root = os.path.abspath(root)
+        self.debounce = debounce
+        self._libc = self._load_inotify()
+
+    @staticmethod
+    def _load_inotify() -> Union[ctypes.CDLL, None]:
+        if not hasattr(os, 'uname') or os.uname().sysname != 'Linux':
+            return None
+        libc_name = ctypes.util.find_library('c')
+        if not libc_name:
+            return None
+        try:
+            libc = ctypes.CDLL(libc_name, use_errno=True)
+            libc.inotify_init1  # pylint: disable=pointless-statement
+        except (OSError, AttributeError):
+            return None
+        return libc
+
+    @property
+    def backend(self) -> str:
+        """
+        Returns:
+            str: `inotify` or `polling`
+        """
+        return 'inotify' if self._libc else 'polling'
+
+    def watch(self) -> Iterator[set]:
+        """
+        Watches until interrupted.
+
+        Yields:
+            set: Paths of the changed files.
+        """
+        if self._libc:
+            yield from self._watch_inotify()
+        else:
+            yield from self._watch_polling()
+
+# region inotify
+
+    def _add_watch(self, fd: int, path: str, watches: dict) -> None:
+        wd = self._libc.inotify_add_watch(fd, os.fsencode(path), WATCH_MASK)
+        if wd < 0:
+            err = ctypes.get_errno()
+            if err == errno.ENOSPC:
+                raise OSError(err, 'inotify watch limit reached, '
+                                   'increase fs.inotify.max_user_watches')
+            return
+        watches[wd] = path
+
+    def _read_events(self, fd: int, watches: dict) -> set:
+        changed = set()
+        try:
+            data = os.read(fd, 64 * 1024)
+        except BlockingIOError:
+            return changed
+
+        offset = 0
+        while offset < len(data):
+            wd, mask, _cookie, length = EVENT_HEADER.unpack_from(data, offset)
+            offset += EVENT_HEADER.size
+            name = data[offset:offset + length].rstrip(b'\0').decode('utf8', 'replace')
+            offset += length
+
+            if mask & IN_DELETE_SELF:
+                watches.pop(wd, None)
+                continue
+            if wd not in watches or not name:
+                continue
+
+            path = os.path.join(watches[wd], name)
+            if mask & IN_ISDIR:
+                if mask & (IN_CREATE | IN_MOVED_TO) and name not in IGNORED_DIRS:
+                    # Watch the new folder and report the files it already contains
+                    for dir_path in _walk_dirs(path):
+                        self._add_watch(fd, dir_path, watches)
+                        with os.scandir(dir_path) as entries:
+                            changed.update(entry.path for entry in entries
+                                           if entry.is_file())
+                continue
+            if mask & IN_CREATE:
+                # The content is reported by IN_CLOSE_WRITE
+                continue
+            if not _ignored(path):
+                changed.add(path)
+        return changed
+
+    def _watch_inotify(self) -> Iterator[set]:
+        fd = self._libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if fd < 0:
+            raise OSError(ctypes.get_errno(), 'inotify_init1 failed')
+
+        try:
+            watches = {}
+            for dir_path in _walk_dirs(self.root):
+                self._add_watch(fd, dir_path, watches)
+
+            pending = set()
+            while True:
+                timeout = self.debounce if pending else None
+                ready, _w, _x = select.select([fd], [], [], timeout)
+                if ready:
+                    pending |= self._read_events(fd, watches)
+                elif pending:
+                    yield pending
+                    pending = set()
+        finally:
+            os.close(fd)
+
+# endregion
+
+# region Polling
+
+    def _snapshot(self) -> dict:
+        snapshot = {}
+        for dir_path, dir_names, file_names in os.walk(self.root):
+            dir_names[:] = [name for name in dir_names if name not in IGNORED_DIRS]
+            for name in file_names:
+                path = os.path.join(dir_path, name)
+                try:
+                    snapshot[path] = os.stat(path).st_mtime_ns
+                except OSError:
+                    continue
+        return snapshot
+
+    def _watch_polling(self, interval: float = 1.0) -> Iterator[set]:
+        previous = self._snapshot()
+        pending = set()
+        last_change = 0.0
+        while True:
+            time.sleep(min(interval, self.debounce) if pending else interval)
+            current = self._snapshot()
+            changed = {path for path in current.keys() | previous.keys()
+                       if current.get(path) != previous.get(path) and not _ignored(path)}
+            previous = current
+
+            if changed:
+                pending |= changed
+                last_change = time.time()
+            elif pending and time.time() - last_change >= self.debounce:
+                yield pending
+                pending = set()
+
+# endregion
+
+
+def classify_change(path: str) -> str:
+    """
+    Classifies a changed file of an Odoo module by the action it requires.
+
+    Args:
+        path (str): Path of the changed file.
+
+    Returns:
+        str: `static` (nothing to do), `python` (restart), `data` (module upgrade)
+             or an empty string when the file is irrelevant.
+    """
+    parts = path.split(os.sep)
+    if 'static' in parts:
+        return 'static'
+    ext = os.path.splitext(path)[1].lower()
+    if parts[-1] in ('__manifest__.py', '__openerp__.py') or ext in ('.xml', '.csv'):
+        return 'data'
+    if ext == '.py':
+        return 'python'
+    return ''
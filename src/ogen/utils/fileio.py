@@ -0,0 +1,157 @@
+"""
+Safe file storage: advisory locks and atomic writes.
+Several oGen processes may run at the same time (CI, batch scripts),
+the files they share (configs, registry, caches) are never left half written.
+"""
+
+import os
+import json
+import time
+import tempfile
+from typing import Union
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None
+
+from ..exceptions import ConfigError
+
+DEF_LOCK_TIMEOUT = 30  # seconds
+
+
+class FileLock:
+    """
+    Advisory lock of a file, held through a `<file>.lock` sibling,
+    as the file itself is replaced by the atomic writes.
+    Without `fcntl` (Windows) the lock does nothing.
+
+    Usage:
+        with FileLock(path):
+            ... read, modify and write the file
+    """
+
+    path: str
+    shared: bool
+    timeout: float
+
+    def __init__(self, path: str, shared: bool = False, timeout: float = DEF_LOCK_TIMEOUT):
+        """
+        Args:
+            path (str): The locked file.
+            shared (bool, optional): Shared (read) lock instead of an exclusive one.
+                                     Defaults to False.
+            timeout (float, optional): Seconds to wait for the lock.
+        """
+        self.path = f'{path}.lock'
+        self.shared = shared
+        self.timeout = timeout
+        self._fd = None
+
+    def acquire(self) -> None:
+        """
+        Waits for the lock.
+
+        Raises:
+            ConfigError: When the lock isn't released by another process in time.
+        """
+        if fcntl is None:
+            return
+
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        operation = (fcntl.LOCK_SH if self.shared else fcntl.LOCK_EX) | fcntl.LOCK_NB
+        deadline = time.monotonic() + self.timeout
+        delay = 0.005
+        while True:
+            try:
+                fcntl.flock(self._fd, operation)
+                return
+            except BlockingIOError:
+                if time.monotonic() >= deadline:
+                    self.release()
+                    raise ConfigError(  # pylint: disable=raise-missing-from
+                        f'Timeout waiting for the lock {self.path}, '
+                        'another oGen command is using it.')
+                time.sleep(delay)
+                delay = min(delay * 2, 0.2)
+
+    def release(self) -> None:
+        """
+        Releases the lock.
+        """
+        if self._fd is None:
+            return
+        try:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+        finally:
+            os.close(self._fd)
+            self._fd = None
+
+    def __enter__(self) -> 'FileLock':
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.release()
+
+
+def atomic_write(path: str, content: Union[str, bytes]) -> None:
+    """
+    Writes a file through a temporary file renamed over it,
+    the readers see either the old or the new content.
+
+    Args:
+        path (str): The file path.
+        content (str|bytes): The new content.
+    """
+    dir_path = os.path.dirname(os.path.abspath(path))
+    os.makedirs(dir_path, exist_ok=True)
+    mode = 'wb' if isinstance(content, bytes) else 'w'
+    encoding = None if isinstance(content, bytes) else 'utf8'
+
+    fd, tmp_path = tempfile.mkstemp(prefix=f'.{os.path.basename(path)}.', dir=dir_path)
+    try:
+        with os.fdopen(fd, mode, encoding=encoding) as tmp_file:
+            tmp_file.write(content)
+            tmp_file.flush()
+            os.fsync(tmp_file.fileno())
+        if os.path.exists(path):
+            os.chmod(tmp_path, os.stat(path).st_mode & 0o777)
+        else:
+            os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+
+def load_json(path: str) -> dict:
+    """
+    Loads a json file.
+
+    Args:
+        path (str): The file path.
+
+    Returns:
+        dict: The content, empty if the file is missing or corrupted.
+    """
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, 'r', encoding='utf8') as json_file:
+            return json.load(json_file)
+    except ValueError:
+        return {}
+
+
+def save_json(path: str, content: dict) -> None:
+    """
+    Saves a json file, replacing it atomically.
+
+    Args:
+        path (str): The file path.
+        content (dict): The content.
+    """
+    atomic_write(path, json.dumps(content))
@@ -2,6 +2,7 @@
 Git specific functionality
 """
 
+import os
 import subprocess
 from typing import Union
 import click
@@ -43,15 +44,28 @@ class GitUtils:  # pylint: disable=too-few-public-methods
                 raise ConfigError(
                     "Git is not installed. Please install Git and try again.")
 
-    def clone(self, path: str) -> None:
+    def clone(self, path: str, cache: str = '') -> None:
         """
         Clones Odoo repository
 
         Args:
             path (str): Destination path
+            cache (str, optional): Local copy of the repository made by `ogen prefetch`.
+                                   Used for a shallow clone of a branch it holds.
         """
+        from . import trace  # pylint: disable=import-outside-toplevel
         self.check_git_available()
 
+        if cache and self.shallow and self.branch and self.has_branch(cache, self.branch):
+            click.echo(f"Cloning branch {self.branch} from the local cache...")
+            with trace.span('git.clone', repo=cache, branch=self.branch, path=path):
+                execute_command(['git', 'clone', '--quiet', '--branch', self.branch,
+                                 '--single-branch', '--depth', '1', '--',
+                                 f'file://{os.path.abspath(cache)}', path])
+                execute_command(['git', '-C', path, 'remote', 'set-url', 'origin', self.repo])
+            click.echo("Repository cloned successfully!")
+            return
+
         click.echo("Cloning repository...")
 
         command = ['git', 'clone', '--verbose']
@@ -61,6 +75,107 @@ class GitUtils:  # pylint: disable=too-few-public-methods
             command += ['--single-branch', '--depth', '1']
         command += ['--', self.repo, path]
 
-        execute_command(command=command)
+        with trace.span('git.clone', repo=self.repo, branch=self.branch, path=path):
+            execute_command(command=command)
 
         click.echo("Repository cloned successfully!")
+
+    def checkout_commit(self, path: str, commit: str) -> None:
+        """
+        Fetches a single commit of the repository, without its history.
+
+        Args:
+            path (str): Destination path
+            commit (str): The commit sha
+        """
+        from . import trace  # pylint: disable=import-outside-toplevel
+        self.check_git_available()
+
+        click.echo(f"Fetching commit {commit[:12]} of {self.repo}...")
+
+        with trace.span('git.checkout_commit', repo=self.repo, commit=commit, path=path):
+            execute_command(['git', 'init', '--quiet', path])
+            execute_command(['git', '-C', path, 'remote', 'add', 'origin', self.repo])
+            execute_command(['git', '-C', path, 'fetch', '--depth', '1', 'origin', commit])
+            execute_command(['git', '-C', path, 'checkout', '--quiet', 'FETCH_HEAD'])
+
+    @staticmethod
+    def has_branch(path: str, branch: str) -> bool:
+        """
+        Checks if a repository holds a branch.
+
+        Args:
+            path (str): Path of the repository, bare or not.
+            branch (str): The branch name.
+
+        Returns:
+            bool: True if the branch exists.
+        """
+        if not os.path.isdir(path):
+            return False
+        proc = subprocess.run(['git', '-C', path, 'rev-parse', '--verify', '--quiet',
+                               f'refs/heads/{branch}'],
+                              capture_output=True, check=False)
+        return proc.returncode == 0
+
+    @staticmethod
+    def head(path: str) -> dict:
+        """
+        Reads the checked out commit of a working tree and the url of its origin.
+
+        Args:
+            path (str): Path of the working tree.
+
+        Returns:
+            dict: {'repo': url, 'commit': sha}, empty if the path isn't a git working tree.
+        """
+        from .command_engine import CommandEngine  # pylint: disable=import-outside-toplevel
+        from .command_engine import CommandSpec  # pylint: disable=import-outside-toplevel
+
+        try:
+            commit, repo = CommandEngine().run_many_sync([
+                CommandSpec(['git', '-C', path, 'rev-parse', 'HEAD'], capture=True),
+                CommandSpec(['git', '-C', path, 'remote', 'get-url', 'origin'], capture=True),
+            ])
+        except OSError:
+            return {}
+        if not (commit.ok and repo.ok):
+            return {}
+        return {'repo': repo.stdout.strip(), 'commit': commit.stdout.strip()}
+
+    @staticmethod
+    def changed_files(path: str, rev: str) -> list:
+        """
+        Lists the files of a working tree changed since a revision,
+        including the uncommitted and the untracked ones.
+
+        Args:
+            path (str): Path inside the working tree.
+            rev (str): The revision, e.g. `ORIG_HEAD` after a pull.
+
+        Raises:
+            ConfigError: When the path isn't a git working tree or the revision is unknown.
+
+        Returns:
+            list: Absolute paths of the changed files.
+        """
+        from .command_engine import CommandEngine  # pylint: disable=import-outside-toplevel
+        from .command_engine import CommandSpec  # pylint: disable=import-outside-toplevel
+
+        # Both listings run at the same time
+        results = CommandEngine().run_many_sync([
+            CommandSpec(['git', '-C', path, 'diff', '--name-only', '--relative', rev, '--'],
+                        capture=True),
+            CommandSpec(['git', '-C', path, 'ls-files', '--others', '--exclude-standard'],
+                        capture=True),
+        ])
+        files = []
+        for result in results:
+            try:
+                result.check()
+            except subprocess.CalledProcessError as err:
+                reason = (err.stderr.strip().splitlines() or [''])[0]
+                raise ConfigError(
+                    f'Unable to list the changes of "{path}" since `{rev}`: {reason}') from err
+            files += [os.path.join(path, name) for name in result.stdout.splitlines() if name]
+        return files
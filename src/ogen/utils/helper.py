@@ -6,10 +6,15 @@ import os
 import re
 import subprocess
 import random
+import shutil
 import string
+import tarfile
+from datetime import datetime, timedelta
+from typing import Iterator, Union
+import click
 
 from ..constants import SUPPORTED_ODOO_VERSIONS
-from ..exceptions import InputError, OCLIError
+from ..exceptions import InputError, IntegrityError, OCLIError
 
 
 def validate_yml_file(file_name: str):
@@ -65,26 +70,254 @@ def validate_odoo_version(version: str):
         raise InputError(msg)
 
 
+def _print_stderr(line: str, stream: str) -> None:
+    if stream == 'stderr':
+        click.echo(line, err=True)
+
+
+# pylint: disable-next=too-many-arguments,too-many-positional-arguments
 def execute_command(command: list,
                     allow_error: bool = False,
-                    return_output: bool = False) -> str:
+                    return_output: bool = False,
+                    cwd: Union[str, None] = None,
+                    timeout: Union[float, None] = None,
+                    env: Union[dict, None] = None) -> str:
     """
     Executes a command and outputs its stdout and stderr to the console.
+    Synchronous facade of the CommandEngine, which has to be used directly
+    to run commands concurrently or to process their output while they run.
 
     Args:
         command (list): List of the command and args ready to be passed to subprocess.Popen
+        allow_error (bool, optional): Ignore a failure of the command. Defaults to False.
+        return_output (bool, optional): Return the stdout instead of displaying it.
+        cwd (str, optional): Working directory of the command.
+        timeout (float, optional): Seconds after which the command is stopped.
+        env (dict, optional): Extra environment variables.
+
+    Raises:
+        subprocess.CalledProcessError: In `return_output` mode, when the command fails.
+        subprocess.TimeoutExpired: In `return_output` mode, when the command times out.
+        OCLIError: When the command fails or times out.
+
+    Returns:
+        str: The stripped stdout in `return_output` mode, empty otherwise.
     """
+    # asyncio is imported only when a command is executed,
+    # keeping the commands that don't execute any fast to start
+    from .command_engine import CommandEngine  # pylint: disable=import-outside-toplevel
+
+    engine = CommandEngine(max_concurrency=1)
     if return_output:
-        return subprocess.check_output(command, encoding="utf8").strip()
+        # stdout is returned, stderr still goes to the console
+        result = engine.run_sync(command, cwd=cwd, timeout=timeout, env=env,
+                                 capture=True, on_line=_print_stderr)
+        return result.check().stdout.strip()
+
+    result = engine.run_sync(command, cwd=cwd, timeout=timeout, env=env)
     try:
-        subprocess.check_call(command)
-    except subprocess.CalledProcessError as err:
+        result.check()
+    except (subprocess.CalledProcessError, subprocess.TimeoutExpired) as err:
         if allow_error:
             return ""
         raise OCLIError(f'Error executing the command.{os.linesep}{err}') \
             from err
     return ""
 
+
+def pipe_commands(producer: list, consumer: list, cwd: Union[str, None] = None) -> None:
+    """
+    Executes `producer | consumer`, the data flowing directly
+    between the two processes.
+
+    Args:
+        producer (list): Command writing to its stdout.
+        consumer (list): Command reading from its stdin.
+        cwd (str, optional): Working directory of the commands.
+
+    Raises:
+        OCLIError: When any of the commands fails.
+    """
+    from . import trace  # pylint: disable=import-outside-toplevel
+    with trace.command_span(producer, cwd=cwd) as span, \
+            subprocess.Popen(producer, cwd=cwd, stdout=subprocess.PIPE) as prod_proc:
+        with subprocess.Popen(consumer, cwd=cwd, stdin=prod_proc.stdout) as cons_proc:
+            # Allow the producer to receive SIGPIPE if the consumer exits
+            prod_proc.stdout.close()
+            cons_code = cons_proc.wait()
+        prod_code = prod_proc.wait()
+        span.set(consumer=consumer, exit_code=prod_code, consumer_exit_code=cons_code)
+
+    for command, code in [(producer, prod_code), (consumer, cons_code)]:
+        if code:
+            raise OCLIError(f'Error executing the command.{os.linesep}'
+                            f'{" ".join(command)} exited with code {code}')
+
+
+def stream_command(command: list, cwd: Union[str, None] = None) -> Iterator[str]:
+    """
+    Executes a command and yields its stdout line by line,
+    without keeping the whole output in memory.
+
+    Args:
+        command (list): List of the command and args ready to be passed to subprocess.Popen
+        cwd (str, optional): Working directory of the command.
+
+    Yields:
+        str: Output lines, without the trailing line separator.
+    """
+    from . import trace  # pylint: disable=import-outside-toplevel
+    with trace.command_span(command, cwd=cwd) as span, \
+            subprocess.Popen(command,
+                             cwd=cwd,
+                             stdout=subprocess.PIPE,
+                             encoding='utf8',
+                             errors='replace') as process:
+        try:
+            for line in process.stdout:
+                yield line.rstrip('\r\n')
+        finally:
+            if process.poll() is None:
+                process.terminate()
+            span.set(exit_code=process.wait())
+
+
+def call_command(command: list, cwd: Union[str, None] = None) -> int:
+    """
+    Executes a command, its output going to the console, and returns its exit code.
+
+    Args:
+        command (list): List of the command and args ready to be passed to subprocess.Popen
+        cwd (str, optional): Working directory of the command.
+
+    Returns:
+        int: The exit code.
+    """
+    from . import trace  # pylint: disable=import-outside-toplevel
+    with trace.command_span(command, cwd=cwd) as span:
+        return_code = subprocess.call(command, cwd=cwd)
+        span.set(exit_code=return_code)
+    return return_code
+
+
+def parse_time_arg(value: Union[str, None]) -> Union[float, None]:
+    """
+    Converts a user provided time into a unix timestamp.
+    Accepts relative durations (e.g. `30s`, `15m`, `2h`, `1d`, `1w`)
+    counted back from now, or ISO 8601 dates and datetimes in local time.
+
+    Args:
+        value (str): The value received from the command line.
+
+    Raises:
+        InputError: When the value can't be interpreted.
+
+    Returns:
+        float: The unix timestamp or None if no value was passed.
+    """
+    if not value:
+        return None
+
+    units = {'s': 'seconds', 'm': 'minutes', 'h': 'hours', 'd': 'days', 'w': 'weeks'}
+    match = re.match(r'^(\d+)([smhdw])$', value.strip())
+    if match:
+        delta = timedelta(**{units[match.group(2)]: int(match.group(1))})
+        return (datetime.now() - delta).timestamp()
+
+    try:
+        return datetime.fromisoformat(value.strip()).timestamp()
+    except ValueError as err:
+        raise InputError(f'Invalid time value: "{value}"{os.linesep}'
+                         'Use a duration like 30m, 2h, 1d '
+                         'or a date like 2023-05-01T10:00:00') from err
+
+
+def format_size(value: float) -> str:
+    """
+    Formats a number of bytes for humans.
+
+    Args:
+        value (float): Number of bytes.
+
+    Returns:
+        str: E.g. `28.4MiB`
+    """
+    for unit in ['B', 'KiB', 'MiB', 'GiB']:
+        if abs(value) < 1024:
+            return f'{value:.1f}{unit}' if unit != 'B' else f'{int(value)}B'
+        value /= 1024
+    return f'{value:.1f}TiB'
+
+
+def safe_extract(tar: tarfile.TarFile, path: str) -> None:
+    """
+    Extracts all members of a tar archive (also in stream mode),
+    refusing the members that would be written outside the destination.
+
+    Args:
+        tar (tarfile.TarFile): The opened archive.
+        path (str): Destination folder.
+
+    Raises:
+        IntegrityError: When a member points outside the destination.
+    """
+    if hasattr(tarfile, 'data_filter'):
+        tar.extractall(path, filter='data')
+        return
+
+    for member in tar:
+        safe_extract_member(tar, member, path)
+
+
+def safe_extract_member(tar: tarfile.TarFile, member: tarfile.TarInfo, path: str) -> None:
+    """
+    Extracts a member of a tar archive, refusing it if it would be written
+    outside the destination. In stream mode, the member must be the current one.
+
+    Args:
+        tar (tarfile.TarFile): The opened archive.
+        member (tarfile.TarInfo): The member.
+        path (str): Destination folder.
+
+    Raises:
+        IntegrityError: When the member points outside the destination.
+    """
+    if hasattr(tarfile, 'data_filter'):
+        tar.extract(member, path, filter='data')
+        return
+
+    dest = os.path.realpath(path)
+    targets = [member.name] + ([member.linkname] if member.islnk() else [])
+    for target in targets:
+        target = os.path.realpath(os.path.join(dest, target))
+        if member.issym() or os.path.commonpath([dest, target]) != dest:
+            raise IntegrityError(f'Unsafe archive member: "{member.name}"')
+    tar.extract(member, dest)
+
+
+def copy_tree(src: str, dest: str) -> None:
+    """
+    Copies a folder, using copy-on-write clones (reflinks)
+    when the file system supports them.
+
+    Args:
+        src (str): Source folder.
+        dest (str): Destination folder, must not exist.
+    """
+    from . import trace  # pylint: disable=import-outside-toplevel
+    try:
+        with trace.span('copy_tree', src=src, dest=dest):
+            subprocess.check_call(['cp', '-a', '--reflink=auto', src, dest],
+                                  stderr=subprocess.DEVNULL)
+        return
+    except (OSError, subprocess.CalledProcessError):
+        # Not GNU cp, fall back on a regular copy
+        if os.path.exists(dest):
+            shutil.rmtree(dest)
+
+    shutil.copytree(src, dest, symlinks=True)
+
+
 def generate_password(length=20) -> str:
     """
     Generates a random password of specified length
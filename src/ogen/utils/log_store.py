@@ -0,0 +1,319 @@
+"""
+Persistent storage for the containers logs of a project.
+
+The logs are appended to gzip compressed segment files,
+one segment for each hour of activity, and a small json index keeps
+the time range and the number of lines per level for every segment.
+Searching reads only the segments that can contain matching lines.
+"""
+
+import os
+import re
+import gzip
+import json
+import heapq
+import time
+from datetime import datetime, timezone
+from typing import Iterator, Union
+
+import click
+
+from ..constants import LOG_SEGMENT_FORMAT
+from .helper import stream_command
+from .fileio import atomic_write
+from .fileio import FileLock
+from .docker_compose import ComposeContext
+
+LOG_LEVELS = ['DEBUG', 'INFO', 'WARNING', 'ERROR', 'CRITICAL']
+
+# Odoo: `2023-05-01 10:00:00,123 7 INFO dbname odoo.modules.loading: ...`
+ODOO_LEVEL_RE = re.compile(
+    r'^\d{4}-\d\d-\d\d \d\d:\d\d:\d\d,\d+ \d+ (DEBUG|INFO|WARNING|ERROR|CRITICAL) ')
+# Postgres: `2023-05-01 10:00:00.123 UTC [1] LOG:  checkpoint starting`
+PSQL_LEVEL_RE = re.compile(
+    r'\b(DEBUG\d?|LOG|INFO|NOTICE|WARNING|ERROR|FATAL|PANIC):\s')
+PSQL_LEVELS_MAP = {
+    'LOG': 'INFO',
+    'NOTICE': 'INFO',
+    'FATAL': 'CRITICAL',
+    'PANIC': 'CRITICAL',
+}
+
+
+def parse_docker_timestamp(value: str) -> int:
+    """
+    Converts a RFC3339Nano timestamp, as printed by `docker logs --timestamps`,
+    into nanoseconds since epoch.
+
+    Args:
+        value (str): The timestamp. E.g. 2023-05-01T10:00:00.123456789Z
+
+    Returns:
+        int: Nanoseconds since epoch.
+    """
+    value = value.replace('Z', '+00:00')
+    nanos = 0
+    match = re.match(r'^([^.+]+)(?:\.(\d+))?(.*)$', value)
+    if match and match.group(2):
+        nanos = int(match.group(2)[:9].ljust(9, '0'))
+        value = match.group(1) + match.group(3)
+
+    stamp = datetime.fromisoformat(value)
+    if not stamp.tzinfo:
+        stamp = stamp.replace(tzinfo=timezone.utc)
+    return int(stamp.timestamp()) * 1_000_000_000 + nanos
+
+
+def detect_level(message: str) -> Union[str, None]:
+    """
+    Determines the log level of an Odoo or Postgres log line.
+
+    Args:
+        message (str): The log line.
+
+    Returns:
+        str: One of LOG_LEVELS or None if the line doesn't state a level.
+    """
+    match = ODOO_LEVEL_RE.match(message)
+    if match:
+        return match.group(1)
+
+    match = PSQL_LEVEL_RE.search(message)
+    if match:
+        level = match.group(1)
+        if level.startswith('DEBUG'):
+            return 'DEBUG'
+        return PSQL_LEVELS_MAP.get(level, level)
+
+    return None
+
+
+class LogStore:
+    """
+    Time partitioned and indexed store of the containers logs.
+    """
+
+    path: str
+    index: dict
+
+    def __init__(self, path: str):
+        self.path = path
+        self.index = {
+            'segments': {},
+            'cursors': {},
+        }
+        self._load_index()
+
+# region Index
+
+    @property
+    def _index_path(self) -> str:
+        return os.path.join(self.path, 'index.json')
+
+    def _segment_path(self, segment: str) -> str:
+        return os.path.join(self.path, f'{segment}.log.gz')
+
+    def _load_index(self) -> None:
+        """
+        Reads the index, e.g. again once locked, as another run may have collected since.
+        """
+        if not os.path.exists(self._index_path):
+            return
+
+        with open(self._index_path, 'r', encoding='utf8') as index_file:
+            self.index.update(json.load(index_file))
+
+    def _save_index(self) -> None:
+        atomic_write(self._index_path, json.dumps(self.index))
+
+# endregion
+
+# region Collect
+
+    def collect(self, ctx: ComposeContext, service: str) -> int:
+        """
+        Appends to the store the log lines produced by the service
+        since the last collection. The store is locked, so that concurrent runs
+        don't collect the same lines from the same cursor.
+
+        Args:
+            ctx (ComposeContext): The project's compose context.
+            service (str): Docker compose service name.
+
+        Returns:
+            int: Number of collected lines.
+        """
+        os.makedirs(self.path, exist_ok=True)
+        with FileLock(self._index_path):
+            self._load_index()
+            return self._collect(ctx, service)
+
+    def _collect(self, ctx: ComposeContext, service: str) -> int:  # pylint: disable=too-many-locals
+        cursor = self.index['cursors'].get(service, {})
+        command = ctx.command('logs', '--no-color', '--no-log-prefix', '--timestamps')
+        if cursor.get('since'):
+            command += ['--since', cursor['since']]
+        command.append(service)
+
+        last_ns = cursor.get('ns', 0)
+        last_level = cursor.get('level', 'INFO')
+        count = 0
+        segment = None
+        seg_file = None
+
+        try:
+            for line in stream_command(command, cwd=ctx.project_dir):
+                raw_ts, _sep, message = line.partition(' ')
+                try:
+                    nanos = parse_docker_timestamp(raw_ts)
+                except ValueError:
+                    continue
+
+                # `--since` is inclusive, skip what is already stored
+                if nanos <= last_ns:
+                    continue
+
+                stamp = nanos // 1000 / 1_000_000
+                line_segment = time.strftime(LOG_SEGMENT_FORMAT,
+                                             time.gmtime(nanos // 1_000_000_000))
+                if line_segment != segment:
+                    if seg_file:
+                        seg_file.close()
+                    segment = line_segment
+                    # Appending creates a new gzip member, readable as one stream
+                    seg_file = gzip.open(self._segment_path(segment), 'at', encoding='utf8')
+
+                # Lines without level (e.g. tracebacks) inherit the previous one
+                level = detect_level(message) or last_level
+                message = message.replace('\t', '    ')
+                seg_file.write(f'{stamp:.6f}\t{service}\t{level}\t{message}\n')
+
+                self._update_segment(segment, stamp, level)
+                last_ns, last_level = nanos, level
+                cursor = {'since': raw_ts, 'ns': nanos, 'level': level}
+                count += 1
+        finally:
+            if seg_file:
+                seg_file.close()
+            if count:
+                self.index['cursors'][service] = cursor
+                self._save_index()
+
+        return count
+
+    def _update_segment(self, segment: str, stamp: float, level: str) -> None:
+        seg_info = self.index['segments'].setdefault(segment, {
+            'start': stamp,
+            'end': stamp,
+            'lines': 0,
+            'levels': {},
+        })
+        seg_info['start'] = min(seg_info['start'], stamp)
+        seg_info['end'] = max(seg_info['end'], stamp)
+        seg_info['lines'] += 1
+        seg_info['levels'][level] = seg_info['levels'].get(level, 0) + 1
+
+# endregion
+
+# region Search
+
+    def _select_segments(self, since: Union[float, None],
+                         until: Union[float, None],
+                         levels: set) -> list:
+        """
+        Uses the index to determine the segments that may contain matching lines.
+        """
+        res = []
+        for segment, seg_info in sorted(self.index['segments'].items()):
+            if since and seg_info['end'] < since:
+                continue
+            if until and seg_info['start'] > until:
+                continue
+            if not levels.intersection(seg_info['levels']):
+                continue
+            res.append(segment)
+        return res
+
+    def search(self,
+               since: Union[float, None] = None,
+               until: Union[float, None] = None,
+               level: str = '',
+               grep: str = '',
+               service: str = '') -> Iterator[str]:
+        """
+        Yields the stored log lines matching all the filters.
+
+        Args:
+            since (float, optional): Unix timestamp of the oldest line.
+            until (float, optional): Unix timestamp of the newest line.
+            level (str, optional): Minimum log level.
+            grep (str, optional): Regular expression the message has to match.
+            service (str, optional): Service name.
+
+        Yields:
+            str: Formatted log lines.
+        """
+        min_level = LOG_LEVELS.index(level) if level else 0
+        levels = set(LOG_LEVELS[min_level:])
+        pattern = re.compile(grep) if grep else None
+        segments = self._select_segments(since, until, levels)
+
+        services = [service] if service else sorted(self.index['cursors'])
+        for segment in segments:
+            for stamp, l_service, message in self._search_segment(
+                    segment, services, since, until, levels, pattern):
+                yield self.format_line(stamp, l_service, message)
+
+    # pylint: disable-next=too-many-arguments,too-many-positional-arguments
+    def _search_segment(self, segment: str, services: list,
+                        since: Union[float, None],
+                        until: Union[float, None],
+                        levels: set,
+                        pattern: Union[re.Pattern, None]) -> Iterator[tuple]:
+        """
+        Reads a segment once and yields its matching lines in time order.
+        The lines of a service are stored in time order, but the services are
+        collected one after the other: their lines are merged by timestamp.
+
+        Yields:
+            tuple: (timestamp, service, message)
+        """
+        by_service = {name: [] for name in services}
+        with gzip.open(self._segment_path(segment), 'rt', encoding='utf8') as seg_file:
+            for line in seg_file:
+                stamp, l_service, l_level, message = line.rstrip('\n').split('\t', 3)
+
+                if l_service not in by_service:
+                    continue
+                if l_level not in levels:
+                    continue
+                stamp = float(stamp)
+                if since and stamp < since:
+                    continue
+                if until and stamp > until:
+                    continue
+                if pattern and not pattern.search(message):
+                    continue
+
+                by_service[l_service].append((stamp, l_service, message))
+
+        yield from heapq.merge(*by_service.values())
+
+    @staticmethod
+    def format_line(stamp: float, service: str, message: str) -> str:
+        """
+        Formats a stored line for output.
+
+        Args:
+            stamp (float): Unix timestamp
+            service (str): Service name
+            message (str): Log message
+
+        Returns:
+            str: The formatted line.
+        """
+        prefix = click.style(f'{service} |', fg='cyan')
+        iso_time = datetime.fromtimestamp(stamp).isoformat(timespec='milliseconds')
+        return f'{prefix} {iso_time} {message}'
+
+# endregion
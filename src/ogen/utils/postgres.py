@@ -0,0 +1,219 @@
+"""
+Postgres specific functionality, executed inside the `db` service container
+"""
+
+import os
+import time
+import subprocess
+from typing import Iterable
+
+from ..exceptions import IntegrityError
+from .helper import execute_command
+from .docker_compose import ComposeContext
+
+PG_USER = 'odoo'  # POSTGRES_USER written in the project's .env file
+PG_DATA = '/var/lib/postgresql/data'
+
+
+class Postgres:
+    """
+    Postgres specific functions, executed through the `docker compose` of a project.
+    """
+
+    ctx: ComposeContext
+
+    def __init__(self, ctx: ComposeContext):
+        """
+        Args:
+            ctx (ComposeContext): The project's compose context.
+        """
+        self.ctx = ctx
+
+    def exec_command(self, command: list, interactive: bool = False) -> list:
+        """
+        Prepares a command to be executed inside the `db` service container.
+
+        Args:
+            command (list): The command and its args.
+            interactive (bool, optional): Keep the stdin attached. Defaults to False.
+
+        Returns:
+            list: The full command ready to be passed to subprocess.Popen
+        """
+        res = self.ctx.command('exec')
+        if not interactive:
+            res.append('-T')
+        return res + ['db'] + command
+
+    def run_command(self, command: list, volumes: Iterable[str] = (),
+                    host_user: bool = False) -> list:
+        """
+        Prepares a command to be executed in a one-off container of the `db` service,
+        e.g. to access the data folder while the database server is stopped.
+
+        Args:
+            command (list): The command and its args.
+            volumes (Iterable[str], optional): Extra volumes, as `host_path:path[:ro]`.
+            host_user (bool, optional): Run as the host user, so that the files written
+                to the volumes belong to it. Defaults to False.
+
+        Returns:
+            list: The full command ready to be passed to subprocess.Popen
+        """
+        options = ['run', '--rm', '--no-deps', '-T']
+        for volume in volumes:
+            options += ['--volume', volume]
+        if host_user:
+            options += ['--user', f'{os.getuid()}:{os.getgid()}']
+        return self.ctx.command(*options, '--entrypoint', command[0], 'db') + command[1:]
+
+    def client_command(self, command: list, volumes: Iterable[str] = ()) -> list:
+        """
+        Prepares a client command (pg_dump, pg_restore) executed as the host user
+        in a one-off container, connected to the running database server.
+        The dump files are read from or written to the volumes, not to the container.
+
+        Args:
+            command (list): The command and its args.
+            volumes (Iterable[str], optional): Extra volumes, as `host_path:path[:ro]`.
+
+        Returns:
+            list: The full command ready to be passed to subprocess.Popen
+        """
+        # The password is in the environment of the service (the project's .env file)
+        script = 'PGPASSWORD="$POSTGRES_PASSWORD" exec "$@"'
+        return self.run_command(
+            ['sh', '-c', script, 'sh', command[0], '-h', 'db', '-U', PG_USER] + command[1:],
+            volumes=volumes, host_user=True)
+
+    def psql_command(self, sql: str, dbname: str = 'postgres', csv: bool = False) -> list:
+        """
+        Prepares the psql command executing an SQL statement.
+
+        Args:
+            sql (str): The SQL statement(s).
+            dbname (str, optional): Database name. Defaults to 'postgres'.
+            csv (bool, optional): Output in csv format. Defaults to False.
+
+        Returns:
+            list: The command.
+        """
+        command = ['psql', '-X', '-q', '-U', PG_USER, '-d', dbname,
+                   '-v', 'ON_ERROR_STOP=1']
+        command += ['--csv'] if csv else ['-t', '-A']
+        return self.exec_command(command + ['-c', sql])
+
+    def query(self, sql: str, dbname: str = 'postgres', csv: bool = False) -> str:
+        """
+        Executes an SQL statement and returns its output.
+
+        Args:
+            sql (str): The SQL statement.
+            dbname (str, optional): Database name. Defaults to 'postgres'.
+            csv (bool, optional): Output in csv format, with header. Defaults to False.
+
+        Raises:
+            IntegrityError: When the statement fails.
+
+        Returns:
+            str: The output of psql.
+        """
+        try:
+            return execute_command(
+                self.psql_command(sql, dbname=dbname, csv=csv),
+                return_output=True)
+        except subprocess.CalledProcessError as err:
+            raise IntegrityError(
+                f'Error executing the SQL statement on database "{dbname}".{os.linesep}'
+                f'{sql}') from err
+
+    def execute(self, sql: str, dbname: str = 'postgres') -> None:
+        """
+        Executes an SQL statement, displaying its output.
+
+        Args:
+            sql (str): The SQL statement.
+            dbname (str, optional): Database name. Defaults to 'postgres'.
+        """
+        execute_command(self.psql_command(sql, dbname=dbname))
+
+    def wait_ready(self, timeout: int = 60) -> None:
+        """
+        Waits until the database server accepts connections.
+
+        Args:
+            timeout (int, optional): Seconds to wait. Defaults to 60.
+
+        Raises:
+            IntegrityError: When the server isn't ready in time.
+        """
+        command = self.exec_command(['pg_isready', '-q', '-U', PG_USER])
+        start = time.time()
+        while time.time() - start < timeout:
+            if subprocess.call(command,
+                               stdout=subprocess.DEVNULL,
+                               stderr=subprocess.DEVNULL) == 0:
+                return
+            time.sleep(1)
+
+        raise IntegrityError(
+            f'The database server is not ready after {timeout} seconds.')
+
+    def terminate_connections(self, dbname: str) -> None:
+        """
+        Terminates the open connections to a database, e.g. of the Odoo workers.
+
+        Args:
+            dbname (str): Database name.
+        """
+        self.query(
+            'SELECT pg_terminate_backend(pid) FROM pg_stat_activity '
+            f"WHERE datname = '{dbname}' AND pid <> pg_backend_pid()")
+
+    def drop_database(self, dbname: str) -> None:
+        """
+        Drops a database, terminating its open connections.
+
+        Args:
+            dbname (str): Database name.
+        """
+        self.query(f'DROP DATABASE IF EXISTS "{dbname}" WITH (FORCE)')
+
+    def create_database(self, dbname: str, template: str = '') -> None:
+        """
+        Creates an empty database owned by the Odoo user,
+        or a file level copy of a template database.
+
+        Args:
+            dbname (str): Database name.
+            template (str, optional): Template database name.
+        """
+        sql = f'CREATE DATABASE "{dbname}" OWNER "{PG_USER}"'
+        if template:
+            sql += f' TEMPLATE "{template}"'
+        self.query(sql)
+
+    def database_exists(self, dbname: str) -> bool:
+        """
+        Args:
+            dbname (str): Database name.
+
+        Returns:
+            bool: True if the database exists.
+        """
+        return self.query(
+            f"SELECT 1 FROM pg_database WHERE datname = '{dbname}'") == '1'
+
+    def table_models(self, dbname: str) -> dict:
+        """
+        Reads the Odoo models of a database and maps their table names to them.
+
+        Args:
+            dbname (str): Database name.
+
+        Returns:
+            dict: {table_name: model_name}
+        """
+        output = self.query('SELECT model FROM ir_model', dbname=dbname)
+        return {model.replace('.', '_'): model
+                for model in output.splitlines() if model}
@@ -0,0 +1,184 @@
+"""
+Prefetch of the downloads of a new project (`ogen prefetch`), so that
+`ogen create` finds everything local and is only CPU-bound:
+- the Odoo sources of the supported versions, in a shallow bare repository
+  of the workspace which the projects are cloned from
+- the postgres and python base images
+- the layers of the odoo image (system packages) and the pip downloads of
+  the Odoo requirements, kept in the BuildKit cache
+"""
+
+import os
+import re
+import shutil
+import tempfile
+import dataclasses
+from typing import Iterable
+
+from ..constants import DEF_PSQL_VERSION
+from ..constants import DEF_PYTHON_IMAGE
+from ..constants import PROJECT_DATA_DIR
+from ..constants import REQUIREMENTS_MERGED
+from .docker_file import DockerFile
+from .helper import execute_command
+from .git import GitUtils
+
+SOURCES_DIR = 'sources'
+PREFETCH_LOG = 'prefetch.log'
+# Tag of the images built to warm the build cache, one per Odoo version
+PREFETCH_IMAGE = 'ogen/prefetch'
+
+
+def sources_cache_path(workspace_dir: str, repo: str) -> str:
+    """
+    Returns the local copy of a repository kept in the workspace.
+
+    Args:
+        workspace_dir (str): The workspace folder.
+        repo (str): The repository url.
+
+    Returns:
+        str: E.g. `<workspace>/.ogen/sources/github.com_odoo_odoo.git`
+    """
+    slug = re.sub(r'[^\w.-]+', '_', repo.split('://')[-1]).strip('_')
+    if not slug.endswith('.git'):
+        slug += '.git'
+    return os.path.join(workspace_dir, PROJECT_DATA_DIR, SOURCES_DIR, slug)
+
+
+@dataclasses.dataclass
+class PrefetchStep:
+    """
+    Outcome of a prefetch step.
+    """
+    name: str
+    ok: bool  # pylint: disable=invalid-name
+    duration: float
+    error: str = ''
+
+
+class Prefetcher:  # pylint: disable=too-few-public-methods
+    """
+    Runs the downloads concurrently: the sources fetch and the image pulls first,
+    then one warm-up build per Odoo version.
+
+    Usage:
+        steps = Prefetcher(cache_path, repo, ['15.0', '16.0']).run()
+    """
+
+    cache_path: str
+    repo: str
+    versions: list
+    build: bool
+
+    def __init__(self, cache_path: str, repo: str, versions: Iterable[str], build: bool = True):
+        """
+        Args:
+            cache_path (str): The local copy of the Odoo repository.
+            repo (str): The Odoo repository url.
+            versions (Iterable[str]): The Odoo versions (branches).
+            build (bool, optional): Warm the build cache. Defaults to True.
+        """
+        self.cache_path = cache_path
+        self.repo = repo
+        self.versions = list(versions)
+        self.build = build
+
+    def _init_cache(self) -> None:
+        if os.path.isdir(self.cache_path):
+            return
+        tmp_path = f'{self.cache_path}.tmp'
+        if os.path.isdir(tmp_path):
+            shutil.rmtree(tmp_path)
+        execute_command(['git', 'init', '--quiet', '--bare', tmp_path])
+        execute_command(['git', '-C', tmp_path, 'remote', 'add', 'origin', self.repo])
+        os.replace(tmp_path, self.cache_path)
+
+    def _fetch_specs(self) -> dict:
+        """
+        Returns:
+            dict: {step name: CommandSpec} of the downloads not depending on each other.
+        """
+        from .command_engine import CommandSpec  # pylint: disable=import-outside-toplevel
+
+        # A single fetch updates all the branches, one depth-1 commit each
+        refspecs = [f'+refs/heads/{version}:refs/heads/{version}' for version in self.versions]
+        return {
+            f'odoo sources {", ".join(self.versions)}': CommandSpec(
+                ['git', '-C', self.cache_path, 'fetch', '--quiet', '--depth', '1', '--prune',
+                 'origin'] + refspecs, capture=True),
+            f'postgres:{DEF_PSQL_VERSION}': CommandSpec(
+                ['docker', 'pull', '--quiet', f'postgres:{DEF_PSQL_VERSION}'], capture=True),
+            DEF_PYTHON_IMAGE: CommandSpec(
+                ['docker', 'pull', '--quiet', DEF_PYTHON_IMAGE], capture=True),
+        }
+
+    def _build_context(self, tmp_dir: str, version: str, requirements: str) -> list:
+        """
+        Writes the build context of a project without addons.
+
+        Returns:
+            list: The build command.
+        """
+        context = os.path.join(tmp_dir, version)
+        docker_dir = os.path.join(context, 'docker')
+        os.makedirs(docker_dir)
+        docker_file_path = os.path.join(docker_dir, 'DOCKERFILE')
+        with open(os.path.join(docker_dir, REQUIREMENTS_MERGED), 'w', encoding='utf8') as merged:
+            merged.write(requirements)
+
+        docker_file = DockerFile(version, {'project': context, 'docker_file': docker_file_path})
+        for name, content in [('DOCKERFILE', docker_file.get_content()),
+                              ('entrypoint.sh', docker_file.get_entrypoint_content()),
+                              ('wait-for-psql.py', docker_file.get_wait_sql_content())]:
+            with open(os.path.join(docker_dir, name), 'w', encoding='utf8') as file_handle:
+                file_handle.write(content)
+
+        return ['docker', 'build', '--quiet', '--file', docker_file_path,
+                '--tag', f'{PREFETCH_IMAGE}:{version}', context]
+
+    @staticmethod
+    def _step(name: str, result) -> PrefetchStep:
+        error = ''
+        if not result.ok:
+            lines = (result.stderr or result.stdout).strip().splitlines()
+            error = lines[-1] if lines else f'exit code {result.returncode}'
+        return PrefetchStep(name, result.ok, result.duration, error)
+
+    def run(self) -> list:
+        """
+        Runs the prefetch.
+
+        Returns:
+            list: The PrefetchStep of every download, failed ones included.
+        """
+        # pylint: disable=import-outside-toplevel
+        from .command_engine import CommandEngine
+        from .command_engine import CommandSpec
+
+        self._init_cache()
+        engine = CommandEngine()
+        specs = self._fetch_specs()
+        steps = [self._step(name, result) for name, result
+                 in zip(specs, engine.run_many_sync(specs.values()))]
+        if not self.build:
+            return steps
+
+        # The Odoo requirements of every version, read from the local copy
+        versions = [version for version in self.versions
+                    if GitUtils.has_branch(self.cache_path, version)]
+        requirements = engine.run_many_sync([
+            CommandSpec(['git', '-C', self.cache_path, 'show',
+                         f'refs/heads/{version}:requirements.txt'], capture=True)
+            for version in versions])
+
+        with tempfile.TemporaryDirectory(prefix='ogen-prefetch-') as tmp_dir:
+            builds = {
+                f'build cache {version}': CommandSpec(
+                    self._build_context(tmp_dir, version, result.stdout),
+                    env={'DOCKER_BUILDKIT': '1'}, capture=True)
+                for version, result in zip(versions, requirements) if result.ok
+            }
+            steps += [self._step(name, result) for name, result
+                      in zip(builds, engine.run_many_sync(builds.values()))]
+        return steps
@@ -0,0 +1,252 @@
+"""
+Registry of the projects of the workspace, kept in oGen's config folder.
+Listing the projects doesn't have to scan the workspace and parse every `.ogen.conf`.
+"""
+
+import os
+import time
+import configparser
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable, Union
+
+from ..constants import DEF_JOBS
+from .fileio import FileLock
+from .fileio import load_json
+from .fileio import save_json
+
+PROJECT_CONFIG_FILE = '.ogen.conf'
+
+
+def dir_size(path: str, exclude: Iterable[str] = ()) -> int:
+    """
+    Computes the disk usage of a folder, counting the hard linked files once.
+    The entries that can't be read (e.g. database files owned by another user) are skipped.
+
+    Args:
+        path (str): The folder.
+        exclude (Iterable[str], optional): Absolute paths of the sub-folders left out.
+
+    Returns:
+        int: Size in bytes.
+    """
+    total = 0
+    seen = set()
+    excluded = {os.path.normpath(item) for item in exclude}
+    stack = [os.path.normpath(path)]
+    while stack:
+        try:
+            with os.scandir(stack.pop()) as entries:
+                for entry in entries:
+                    try:
+                        stat = entry.stat(follow_symlinks=False)
+                    except OSError:
+                        continue
+                    if entry.is_dir(follow_symlinks=False):
+                        if entry.path in excluded:
+                            continue
+                        stack.append(entry.path)
+                    if (stat.st_dev, stat.st_ino) in seen:
+                        continue
+                    seen.add((stat.st_dev, stat.st_ino))
+                    total += getattr(stat, 'st_blocks', 0) * 512 or stat.st_size
+        except OSError:
+            continue
+    return total
+
+
+def _mtime(path: str) -> float:
+    try:
+        return os.stat(path).st_mtime
+    except OSError:
+        return 0.0
+
+
+def _read_ports(compose_file: str) -> list:
+    """
+    Reads the published ports of the services of a compose file.
+    """
+    import yaml  # pylint: disable=import-outside-toplevel
+    try:
+        with open(compose_file, 'r', encoding='utf8') as yml_file:
+            compose = yaml.load(yml_file, Loader=yaml.SafeLoader) or {}
+    except (OSError, yaml.YAMLError):
+        return []
+
+    ports = []
+    for service in compose.get('services', {}).values():
+        for port in service.get('ports', []):
+            # `HOST:CONTAINER`, `IP:HOST:CONTAINER` or the long syntax
+            host_port = port.get('published') if isinstance(port, dict) \
+                else str(port).rsplit(':', 1)[0].rsplit(':', 1)[-1]
+            if host_port:
+                ports.append(str(host_port))
+    return ports
+
+
+def read_project_entry(project_path: str, previous: Union[dict, None] = None) -> dict:
+    """
+    Reads the registry values of a project from its files.
+    The files unchanged since the previous entry (same mtime) aren't parsed again.
+
+    Args:
+        project_path (str): The project folder.
+        previous (dict, optional): The current entry of the project.
+
+    Returns:
+        dict: The entry or an empty dict when the folder isn't an oGen project.
+    """
+    entry = dict(previous or {})
+    entry['path'] = project_path
+
+    conf_path = os.path.join(project_path, PROJECT_CONFIG_FILE)
+    conf_mtime = _mtime(conf_path)
+    if not conf_mtime:
+        return {}
+
+    compose_file = 'docker-compose.yml'
+    if conf_mtime != entry.get('conf_mtime'):
+        config = configparser.ConfigParser(default_section='__no_default__')
+        try:
+            config.read(conf_path)
+        except configparser.Error:
+            return {}
+        entry['odoo_version'] = config.get('DEFAULT', 'odoo_version', fallback='')
+        compose_file = config.get('key_paths', 'docker_compose', fallback=compose_file)
+        entry['compose_file'] = compose_file
+        entry['conf_mtime'] = conf_mtime
+
+    compose_path = os.path.join(project_path, entry.get('compose_file', compose_file))
+    compose_mtime = _mtime(compose_path)
+    if compose_mtime != entry.get('compose_mtime'):
+        entry['ports'] = _read_ports(compose_path) if compose_mtime else []
+        entry['compose_mtime'] = compose_mtime
+
+    return entry
+
+
+class ProjectRegistry:
+    """
+    Index of the projects of the workspace: name, path, Odoo version, ports,
+    image id, last start and disk size.
+    Every update locks the file, re-reads it and replaces it atomically,
+    so the changes of another oGen process aren't overwritten.
+    """
+
+    path: str
+
+    def __init__(self, path: str):
+        """
+        Args:
+            path (str): The registry file.
+        """
+        self.path = path
+
+    def load(self) -> dict:
+        """
+        Returns:
+            dict: The content of the registry.
+        """
+        content = load_json(self.path)
+        content.setdefault('projects', {})
+        return content
+
+    def _merge(self, updates: dict, removed: Iterable[str] = (),
+               values: Union[dict, None] = None) -> dict:
+        """
+        Applies changes to the current content of the registry, under lock.
+
+        Args:
+            updates (dict): {project name: values to update}
+            removed (Iterable[str], optional): Names of the projects to remove.
+            values (dict, optional): Top level values to update.
+
+        Returns:
+            dict: The new content.
+        """
+        with FileLock(self.path):
+            content = self.load()
+            projects = content['projects']
+            for name in removed:
+                projects.pop(name, None)
+            for name, entry in updates.items():
+                projects.setdefault(name, {}).update(entry)
+            content.update(values or {})
+            save_json(self.path, content)
+        return content
+
+    def update(self, name: str, values: dict) -> dict:
+        """
+        Updates the entry of a project.
+
+        Args:
+            name (str): Project name.
+            values (dict): The values to update.
+
+        Returns:
+            dict: The new entry.
+        """
+        content = self._merge({name: dict(values, updated=time.time())})
+        return content['projects'][name]
+
+    def remove(self, name: str) -> None:
+        """
+        Removes the entry of a project.
+
+        Args:
+            name (str): Project name.
+        """
+        self._merge({}, removed=[name])
+
+    # pylint: disable-next=too-many-locals
+    def reconcile(self, workspace_dir: str, refresh: bool = False,
+                  jobs: int = DEF_JOBS) -> dict:
+        """
+        Brings the registry in line with the workspace.
+        The workspace is listed again only when its mtime changed (a project
+        was created, renamed or removed) and a project is re-read only when its files changed.
+
+        Args:
+            workspace_dir (str): The workspace folder.
+            refresh (bool, optional): Rescan everything and compute the disk sizes.
+                                      Defaults to False.
+            jobs (int, optional): Parallel size computations.
+
+        Returns:
+            dict: The projects {name: entry}.
+        """
+        content = self.load()
+        projects = content['projects']
+        workspace_mtime = _mtime(workspace_dir)
+
+        names = set(projects)
+        values = {}
+        if refresh or workspace_mtime != content.get('workspace_mtime'):
+            names = set()
+            with os.scandir(workspace_dir) as entries:
+                for entry in entries:
+                    if entry.is_dir() and \
+                            os.path.exists(os.path.join(entry.path, PROJECT_CONFIG_FILE)):
+                        names.add(entry.name)
+            values['workspace_mtime'] = workspace_mtime
+
+        removed = set(projects) - names
+        updates = {}
+        for name in sorted(names):
+            previous = projects.get(name, {})
+            entry = read_project_entry(os.path.join(workspace_dir, name),
+                                       {} if refresh else previous)
+            if not entry:
+                removed.add(name)
+            elif entry != previous:
+                updates[name] = entry
+
+        if refresh and names - removed:
+            paths = {name: os.path.join(workspace_dir, name) for name in names - removed}
+            with ThreadPoolExecutor(max_workers=jobs) as executor:
+                sizes = executor.map(dir_size, paths.values())
+                for name, size in zip(paths, sizes):
+                    updates.setdefault(name, {}).update(size=size, size_date=time.time())
+
+        if not (updates or removed or values):
+            return projects
+        return self._merge(updates, removed, values)['projects']
@@ -0,0 +1,260 @@
+"""
+Odoo request latency statistics computed from the werkzeug log lines.
+
+Odoo appends the performance info to every request log line:
+the number of SQL queries, the time spent in SQL and the remaining (python) time.
+E.g.
+`2023-05-01 10:00:00,123 7 INFO db werkzeug: 172.18.0.1 - - [01/May/2023 10:00:00]
+"POST /web/dataset/call_kw/res.partner/web_search_read HTTP/1.1" 200 - 12 0.015 0.123`
+"""
+
+import re
+import math
+import time
+import random
+import threading
+from collections import deque
+from typing import Iterable, Union
+
+REQUEST_LINE_RE = re.compile(
+    r'\d{4}-\d\d-\d\d \d\d:\d\d:\d\d,\d+ \d+ \w+ \S+ werkzeug: '
+    r'.*?"(?P<method>[A-Z]+) (?P<path>\S+) [^"]*" (?P<status>\d{3}) \S+ '
+    r'(?P<queries>\d+) (?P<sql>\d+\.\d+) (?P<python>\d+\.\d+)')
+
+# Odoo colors the perf info when the output is a tty
+ANSI_RE = re.compile(r'\x1b\[[0-9;]*m')
+
+ID_SEGMENT_RE = re.compile(r'^\d+([-_][0-9a-f]+)*$')
+HASH_SEGMENT_RE = re.compile(r'^[0-9a-f]{7,}$')
+
+# Number of samples kept per route for computing the percentiles
+MAX_SAMPLES = 10000
+
+SORT_KEYS = ['total', 'count', 'p95', 'queries']
+
+
+def normalize_route(path: str) -> str:
+    """
+    Removes the query string and replaces record ids and hashes,
+    so that requests to the same route are aggregated together.
+
+    Args:
+        path (str): The requested path.
+
+    Returns:
+        str: The route. E.g. `/web/image/res.partner/<id>/avatar_128`
+    """
+    path = path.split('?', 1)[0]
+    segments = []
+    for segment in path.split('/'):
+        if ID_SEGMENT_RE.match(segment):
+            segment = '<id>'
+        elif HASH_SEGMENT_RE.match(segment):
+            segment = '<hash>'
+        segments.append(segment)
+    return '/'.join(segments)
+
+
+def parse_request_line(line: str) -> Union[dict, None]:
+    """
+    Extracts the request and performance info from a werkzeug log line.
+
+    Args:
+        line (str): An Odoo log line.
+
+    Returns:
+        dict: The request info or None if the line is not a request with perf info.
+    """
+    if 'werkzeug' not in line:
+        return None
+
+    # Search, the line may be prefixed by docker (service name, timestamp)
+    match = REQUEST_LINE_RE.search(ANSI_RE.sub('', line))
+    if not match:
+        return None
+
+    sql_time = float(match.group('sql'))
+    python_time = float(match.group('python'))
+    return {
+        'method': match.group('method'),
+        'route': normalize_route(match.group('path')),
+        'status': int(match.group('status')),
+        'queries': int(match.group('queries')),
+        'sql_time': sql_time,
+        'duration': sql_time + python_time,
+    }
+
+
+def percentile(samples: list, pct: float) -> float:
+    """
+    Nearest-rank percentile of a sorted list.
+
+    Args:
+        samples (list): Sorted values.
+        pct (float): The percentile (0 - 100).
+
+    Returns:
+        float: The value.
+    """
+    if not samples:
+        return 0.0
+    rank = max(math.ceil(pct / 100 * len(samples)) - 1, 0)
+    return samples[min(rank, len(samples) - 1)]
+
+
+class RouteStats:
+    """
+    Aggregated stats of the requests to a route.
+    Keeps a bounded reservoir sample of the durations for the percentiles.
+    """
+
+    count: int
+    total_time: float
+    sql_time: float
+    queries: int
+    samples: list
+
+    def __init__(self):
+        self.count = 0
+        self.total_time = 0.0
+        self.sql_time = 0.0
+        self.queries = 0
+        self.samples = []
+
+    def add(self, request: dict) -> None:
+        """
+        Adds a request to the stats.
+
+        Args:
+            request (dict): Request info as returned by parse_request_line
+        """
+        self.count += 1
+        self.total_time += request['duration']
+        self.sql_time += request['sql_time']
+        self.queries += request['queries']
+
+        if len(self.samples) < MAX_SAMPLES:
+            self.samples.append(request['duration'])
+            return
+
+        # Reservoir sampling keeps the memory bounded for huge logs
+        pos = random.randrange(self.count)
+        if pos < MAX_SAMPLES:
+            self.samples[pos] = request['duration']
+
+    def summary(self) -> dict:
+        """
+        Returns:
+            dict: The computed stats of the route.
+        """
+        samples = sorted(self.samples)
+        return {
+            'count': self.count,
+            'total': self.total_time,
+            'p50': percentile(samples, 50),
+            'p95': percentile(samples, 95),
+            'p99': percentile(samples, 99),
+            'sql_share': self.sql_time / self.total_time if self.total_time else 0.0,
+            'queries': self.queries / self.count if self.count else 0.0,
+        }
+
+
+class RequestStats:
+    """
+    Per route aggregation of Odoo requests.
+    When a window is set, only the requests received in the last `window` seconds are kept.
+    """
+
+    routes: dict
+    window: int
+    requests: deque
+    lock: threading.Lock
+
+    def __init__(self, window: int = 0):
+        self.routes = {}
+        self.window = window
+        self.requests = deque()
+        self.lock = threading.Lock()
+
+    def add(self, request: dict) -> None:
+        """
+        Adds a request to the aggregation.
+
+        Args:
+            request (dict): Request info as returned by parse_request_line
+        """
+        with self.lock:
+            if self.window:
+                self.requests.append((time.time(), request))
+                return
+
+            route = f"{request['method']} {request['route']}"
+            self.routes.setdefault(route, RouteStats()).add(request)
+
+    def feed(self, lines: Iterable[str]) -> int:
+        """
+        Parses and aggregates the request lines from a stream of log lines.
+
+        Args:
+            lines (Iterable[str]): Log lines.
+
+        Returns:
+            int: Number of requests found.
+        """
+        count = 0
+        for line in lines:
+            request = parse_request_line(line)
+            if request:
+                self.add(request)
+                count += 1
+        return count
+
+    def _window_routes(self) -> dict:
+        limit = time.time() - self.window
+        while self.requests and self.requests[0][0] < limit:
+            self.requests.popleft()
+
+        routes = {}
+        for _received, request in self.requests:
+            route = f"{request['method']} {request['route']}"
+            routes.setdefault(route, RouteStats()).add(request)
+        return routes
+
+    def top(self, sort_by: str = 'total', limit: int = 20) -> list:
+        """
+        Returns the stats of the top offending routes.
+
+        Args:
+            sort_by (str, optional): One of SORT_KEYS. Defaults to 'total'.
+            limit (int, optional): Number of routes. Defaults to 20.
+
+        Returns:
+            list: List of (route, summary) tuples.
+        """
+        with self.lock:
+            routes = self._window_routes() if self.window else self.routes
+            rows = [(route, stats.summary()) for route, stats in routes.items()]
+        rows.sort(key=lambda row: row[1][sort_by], reverse=True)
+        return rows[:limit] if limit else rows
+
+    def format_table(self, sort_by: str = 'total', limit: int = 20) -> list:
+        """
+        Formats the top routes as table lines ready to be printed.
+
+        Args:
+            sort_by (str, optional): One of SORT_KEYS. Defaults to 'total'.
+            limit (int, optional): Number of routes. Defaults to 20.
+
+        Returns:
+            list: The table lines.
+        """
+        lines = [
+            f"{'COUNT':>7} {'TOTAL(s)':>9} {'P50(ms)':>8} {'P95(ms)':>8} "
+            f"{'P99(ms)':>8} {'SQL%':>5} {'Q/REQ':>6}  ROUTE"
+        ]
+        for route, row in self.top(sort_by=sort_by, limit=limit):
+            lines.append(
+                f"{row['count']:>7} {row['total']:>9.2f} {row['p50'] * 1000:>8.0f} "
+                f"{row['p95'] * 1000:>8.0f} {row['p99'] * 1000:>8.0f} "
+                f"{row['sql_share'] * 100:>5.1f} {row['queries']:>6.1f}  {route}")
+        return lines
@@ -0,0 +1,332 @@
+"""
+Aggregation of the python requirements of Odoo and of the addons
+into a single requirements file, installed by the Dockerfile with one pip call.
+The file merges the specifiers, it isn't a lock: the versions are resolved by pip
+at build time and no `--hash` is checked, pinning every dependency would need
+resolving them against the package index.
+
+The requirements are parsed by `packaging` and their markers are evaluated
+for the image's environment (see target_env), so they are resolved before the build.
+The version conflicts that can be detected without the package index
+are reported as warnings, pip resolves the rest.
+"""
+
+import os
+import re
+import platform
+from typing import Iterable, Optional, Union
+
+from packaging.markers import UndefinedComparison
+from packaging.markers import UndefinedEnvironmentName
+from packaging.requirements import InvalidRequirement
+from packaging.requirements import Requirement
+from packaging.specifiers import Specifier
+from packaging.specifiers import SpecifierSet
+from packaging.utils import canonicalize_name
+from packaging.version import InvalidVersion
+from packaging.version import Version
+
+from ..constants import DEF_PYTHON_IMAGE
+from ..exceptions import IntegrityError
+from .addons import read_manifest
+
+# `platform.machine()` values of the hosts whose docker engine reports another machine
+MACHINES = {'arm64': 'aarch64', 'AMD64': 'x86_64'}
+
+MERGED_HEADER = '# Generated by oGen, do not edit. Run `ogen addons requirements` to refresh.'
+
+
+def target_env(image: str = DEF_PYTHON_IMAGE) -> dict:
+    """
+    Environment of the odoo image, used to evaluate the requirements markers.
+    The python version is the one of the base image tag (e.g. `python:3.11.5-bookworm`),
+    the machine is the host's one, the images being built for it.
+
+    Args:
+        image (str, optional): The base image. Defaults to DEF_PYTHON_IMAGE.
+
+    Returns:
+        dict: The marker values, the missing ones are taken from the host.
+    """
+    env = {
+        'sys_platform': 'linux',
+        'platform_system': 'Linux',
+        'os_name': 'posix',
+        'platform_python_implementation': 'CPython',
+        'implementation_name': 'cpython',
+        'platform_machine': MACHINES.get(platform.machine(), platform.machine()),
+    }
+    match = re.match(r'^python:(?P<version>\d+\.\d+)(?P<patch>\.\d+)?', image.split('/')[-1])
+    if match:
+        env['python_version'] = match.group('version')
+        env['python_full_version'] = match.group('version') + (match.group('patch') or '.0')
+    return env
+
+
+def _bounds(spec: Specifier) -> list:
+    """
+    Args:
+        spec (Specifier): A version specifier.
+
+    Returns:
+        list: Its bounds as (`lower` or `upper`, version, inclusive), none for `!=` and `===`.
+    """
+    operator, version = spec.operator, spec.version
+    try:
+        if operator == '==' and version.endswith('.*'):
+            # ==2.2.* means >=2.2,<2.3
+            release = Version(version[:-2]).release
+            return [('lower', Version(version[:-2]), True),
+                    ('upper', Version('.'.join(map(str, release[:-1] + (release[-1] + 1,)))),
+                     False)]
+        if operator == '~=':
+            # ~=2.2.1 means >=2.2.1,<2.3
+            release = Version(version).release[:-1]
+            return [('lower', Version(version), True),
+                    ('upper', Version('.'.join(map(str, release[:-1] + (release[-1] + 1,)))),
+                     False)]
+        return {
+            '==': [('lower', Version(version), True), ('upper', Version(version), True)],
+            '>=': [('lower', Version(version), True)],
+            '>': [('lower', Version(version), False)],
+            '<=': [('upper', Version(version), True)],
+            '<': [('upper', Version(version), False)],
+        }.get(operator, [])
+    except InvalidVersion:
+        return []
+
+
+class RequirementsAggregator:
+    """
+    Merges the requirements of several sources and detects the version conflicts.
+    """
+
+    env: dict
+    packages: dict
+    options: list
+    imports: dict
+
+    def __init__(self, env: Union[dict, None] = None):
+        """
+        Args:
+            env (dict, optional): Marker values. Defaults to the odoo image's, see target_env.
+        """
+        self.env = env or target_env()
+        # {canonical name: {'name', 'extras', 'specs': [(Specifier, source)]}}
+        self.packages = {}
+        # Lines pip understands but oGen doesn't merge (urls, editable installs, etc)
+        self.options = []
+        # {import name: [sources]} of the manifests `external_dependencies`
+        self.imports = {}
+
+    def add(self, line: str, source: str) -> None:
+        """
+        Adds a requirement line.
+
+        Args:
+            line (str): The requirement, e.g. `requests>=2.25 ; python_version > '3.8'`
+            source (str): Origin of the requirement, reported on conflicts.
+
+        Raises:
+            IntegrityError: When the requirement can't be parsed.
+        """
+        line = re.sub(r'(^|\s)#.*$', '', line).strip()
+        if not line:
+            return
+        if line.startswith('-') or '://' in line or line.startswith('git+'):
+            if line not in self.options:
+                self.options.append(line)
+            return
+
+        try:
+            requirement = Requirement(line)
+            if requirement.marker and not requirement.marker.evaluate(self.env):
+                return
+        except (InvalidRequirement, UndefinedComparison, UndefinedEnvironmentName) as err:
+            raise IntegrityError(f'Invalid requirement "{line}" in {source}: {err}') from err
+
+        package = self.packages.setdefault(canonicalize_name(requirement.name), {
+            'name': requirement.name,
+            'extras': set(),
+            'specs': [],
+        })
+        package['extras'].update(requirement.extras)
+        package['specs'] += [(spec, source) for spec in requirement.specifier]
+
+    def add_file(self, path: str, source: str = '') -> None:
+        """
+        Adds the requirements of a requirements.txt file, following its `-r` includes.
+
+        Args:
+            path (str): Path to the file.
+            source (str, optional): Name reported on conflicts. Defaults to the path.
+        """
+        source = source or path
+        with open(path, 'r', encoding='utf8') as req_file:
+            for line in req_file:
+                include = re.match(r'^\s*(?:-r|--requirement)\s*(\S+)', line)
+                if include:
+                    included = os.path.join(os.path.dirname(path), include.group(1))
+                    self.add_file(included, os.path.join(os.path.dirname(source),
+                                                         include.group(1)))
+                    continue
+                self.add(line, source)
+
+    def add_import(self, name: str, source: str) -> None:
+        """
+        Adds a python module the addons import (manifest `external_dependencies`).
+        It is an import name (e.g. `ldap`, installed by `python-ldap`),
+        not a requirement: it is only checked against the requirements.
+
+        Args:
+            name (str): The module name.
+            source (str): The manifest declaring it.
+        """
+        self.imports.setdefault(name, []).append(source)
+
+    def missing_imports(self) -> list:
+        """
+        Returns:
+            list: Descriptions of the imported modules without a requirement of the same name.
+        """
+        return [f"{name} ({', '.join(sources)})"
+                for name, sources in sorted(self.imports.items())
+                if canonicalize_name(name.split('.')[0]) not in self.packages]
+
+    def conflicts(self) -> list:
+        """
+        Detects the packages whose specifiers can't be satisfied together, as far
+        as it can be told without the package index: the pinned versions are checked
+        against all the specifiers and the lower bounds against the upper ones.
+
+        Returns:
+            list: Descriptions of the conflicting packages.
+        """
+        res = []
+        for package in self.packages.values():
+            if not self._satisfiable(package['specs']):
+                details = ', '.join(f'{spec} ({src})' for spec, src in package['specs'])
+                res.append(f"{package['name']}: {details}")
+        return res
+
+    @staticmethod
+    def _satisfiable(specs: list) -> bool:
+        combined = SpecifierSet(','.join(str(spec) for spec, _src in specs))
+        pins = [spec.version for spec, _src in specs
+                if spec.operator in ('==', '===') and not spec.version.endswith('.*')]
+        if pins:
+            return any(combined.contains(pin, prereleases=True) for pin in pins)
+
+        # Highest lower bound and lowest upper bound, an exclusive bound being tighter
+        lower: Optional[Version] = None
+        lower_inclusive = True
+        upper: Optional[Version] = None
+        upper_inclusive = True
+        for spec, _src in specs:
+            for kind, version, inclusive in _bounds(spec):
+                if kind == 'lower' and (lower is None or version > lower
+                                        or (version == lower and not inclusive)):
+                    lower, lower_inclusive = version, inclusive
+                if kind == 'upper' and (upper is None or version < upper
+                                        or (version == upper and not inclusive)):
+                    upper, upper_inclusive = version, inclusive
+
+        if lower is None or upper is None or lower < upper:
+            return True
+        if lower > upper or not (lower_inclusive and upper_inclusive):
+            return False
+        # A single version left, unless excluded by a `!=`
+        return combined.contains(lower, prereleases=True)
+
+    def merged_lines(self) -> list:
+        """
+        Returns:
+            list: One line per package, sorted by name, with all its specifiers:
+                pip resolves them together and fails on the ones it can't satisfy.
+        """
+        lines = []
+        for key in sorted(self.packages):
+            package = self.packages[key]
+            extras = f"[{','.join(sorted(package['extras']))}]" if package['extras'] else ''
+            specs = SpecifierSet(','.join(str(spec) for spec, _src in package['specs']))
+            lines.append(f"{package['name']}{extras}{specs}")
+        return self.options + lines
+
+
+def find_requirements_files(root: str) -> Iterable[str]:
+    """
+    Searches an addons tree for requirements.txt files,
+    the hidden folders and the node_modules are skipped.
+
+    Args:
+        root (str): The addons tree.
+
+    Yields:
+        str: Path to a requirements.txt file, in a stable order.
+    """
+    for dir_path, dir_names, file_names in os.walk(root):
+        dir_names[:] = sorted(name for name in dir_names
+                              if not name.startswith('.') and name != 'node_modules')
+        if 'requirements.txt' in file_names:
+            yield os.path.join(dir_path, 'requirements.txt')
+
+
+def collect_requirements(odoo_path: str, addons_roots: Iterable[str],
+                         modules: list, project_path: str) -> RequirementsAggregator:
+    """
+    Collects the requirements of Odoo and of the requirements.txt files of the addons trees.
+    The python `external_dependencies` of the modules manifests are import names,
+    they are collected to be checked against the requirements, not installed.
+
+    Args:
+        odoo_path (str): Path to the Odoo sources.
+        addons_roots (Iterable[str]): Addons trees searched for requirements.txt files.
+        modules (list): Modules as returned by AddonsIndex.scan
+        project_path (str): Project path, the sources are reported relative to it.
+
+    Returns:
+        RequirementsAggregator: The aggregated requirements.
+    """
+    aggregator = RequirementsAggregator()
+
+    def rel(path: str) -> str:
+        return os.path.relpath(path, project_path)
+
+    odoo_req = os.path.join(odoo_path, 'requirements.txt')
+    if os.path.exists(odoo_req):
+        aggregator.add_file(odoo_req, rel(odoo_req))
+
+    for root in addons_roots:
+        for req_path in find_requirements_files(root):
+            aggregator.add_file(req_path, rel(req_path))
+
+    for _name, _path, manifest_path in modules:
+        manifest = read_manifest(manifest_path)
+        for name in manifest.get('external_dependencies', {}).get('python', []):
+            aggregator.add_import(name, rel(manifest_path))
+
+    return aggregator
+
+
+def write_merged_file(path: str, lines: list) -> bool:
+    """
+    Writes the merged requirements file. The file is not touched when its content
+    didn't change, so the docker layer cache stays valid.
+
+    Args:
+        path (str): The merged requirements file path.
+        lines (list): The requirement lines.
+
+    Returns:
+        bool: True if the file changed.
+    """
+    content = os.linesep.join([MERGED_HEADER] + lines) + os.linesep
+
+    if os.path.exists(path):
+        with open(path, 'r', encoding='utf8') as merged_file:
+            if merged_file.read() == content:
+                return False
+
+    with open(path, 'w', encoding='utf8') as merged_file:
+        merged_file.write(content)
+    return True
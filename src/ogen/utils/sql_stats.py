@@ -0,0 +1,265 @@
+"""
+SQL statements statistics, computed offline from a Postgres log
+(`log_min_duration_statement`) or from a `pg_stat_statements` csv export.
+"""
+
+import re
+import csv
+from typing import Iterable, Union
+
+# `2023-05-01 10:00:00.123 UTC [55] odoo@db LOG:  duration: 120.512 ms  statement: SELECT ...`
+DURATION_RE = re.compile(
+    r'LOG:\s+duration: (?P<ms>\d+(?:\.\d+)?) ms\s+'
+    r'(?P<kind>statement|execute [^:]*|parse [^:]*|bind [^:]*|plan):\s?(?P<sql>.*)$')
+# Any line starting a new Postgres log entry
+ENTRY_RE = re.compile(r'^\d{4}-\d\d-\d\d \d\d:\d\d:\d\d')
+
+COMMENT_RE = re.compile(r'--[^\n]*|/\*.*?\*/', re.S)
+STRING_RE = re.compile(r"(?:E|N)?'(?:[^']|'')*'")
+NUMBER_RE = re.compile(r'(?<![\w$."])-?\b\d+(?:\.\d+)?\b')
+PARAM_RE = re.compile(r'\$\d+|%s|%\(\w+\)s')
+LIST_RE = re.compile(r'\(\s*\?(?:\s*,\s*\?)+\s*\)')
+VALUES_RE = re.compile(r'(\(\.\.\.\)|\(\?\))(?:\s*,\s*(\(\.\.\.\)|\(\?\)))+')
+SPACES_RE = re.compile(r'\s+')
+TABLE_RE = re.compile(
+    r'\b(?:from|join|update|into)\s+(?:only\s+)?"?([a-z_][a-z0-9_]*)"?', re.I)
+
+SQL_SORT_KEYS = ['total', 'calls', 'mean']
+
+# Tables that are not backed by an Odoo model with the same name
+PG_CATALOG_PREFIXES = ('pg_', 'information_schema')
+
+
+def normalize_query(sql: str) -> str:
+    """
+    Replaces literals and parameters with `?` and collapses the value lists,
+    so the same ORM query issued with different ids is aggregated together.
+
+    Args:
+        sql (str): The SQL statement.
+
+    Returns:
+        str: The normalized statement.
+    """
+    sql = COMMENT_RE.sub(' ', sql)
+    sql = STRING_RE.sub('?', sql)
+    sql = PARAM_RE.sub('?', sql)
+    sql = NUMBER_RE.sub('?', sql)
+    sql = LIST_RE.sub('(...)', sql)
+    sql = VALUES_RE.sub('(...), ...', sql)
+    return SPACES_RE.sub(' ', sql).strip().rstrip(';')
+
+
+def table_to_model(table: str, models: Union[dict, None] = None) -> str:
+    """
+    Maps a table name back to the Odoo model name.
+
+    Args:
+        table (str): Table name, e.g. `sale_order`.
+        models (dict, optional): Known mapping table -> model (e.g. read from `ir_model`).
+                                 When missing, the model is guessed from the table name.
+
+    Returns:
+        str: The model name, e.g. `sale.order`. Many2many tables are returned as they are.
+    """
+    if models and table in models:
+        return models[table]
+    if table.endswith('_rel') or table.startswith(PG_CATALOG_PREFIXES):
+        return table
+    return table.replace('_', '.')
+
+
+def query_tables(sql: str) -> list:
+    """
+    Extracts the table names used by a statement.
+
+    Args:
+        sql (str): The SQL statement.
+
+    Returns:
+        list: Table names, in order of appearance, without duplicates.
+    """
+    tables = []
+    for table in TABLE_RE.findall(sql):
+        if table.lower() in ('select', 'lateral') or table in tables:
+            continue
+        tables.append(table)
+    return tables
+
+
+def parse_pg_log(lines: Iterable[str]) -> Iterable[tuple]:
+    """
+    Extracts the logged statements and their durations from a Postgres log.
+    Multi line statements are joined. The `parse`, `bind` and auto_explain `plan`
+    entries are skipped, so every execution is counted once.
+
+    Args:
+        lines (Iterable[str]): The log lines.
+
+    Yields:
+        tuple: (statement, duration in ms)
+    """
+    # Lines of the statement being read and its duration
+    statement = []
+    duration = 0.0
+    for line in lines:
+        line = line.rstrip('\r\n')
+
+        if statement and not ENTRY_RE.match(line) and not DURATION_RE.search(line):
+            # Continuation of a multi line statement
+            statement.append(line)
+            continue
+
+        if statement:
+            yield ' '.join(statement), duration
+            statement = []
+
+        match = DURATION_RE.search(line)
+        if not match:
+            continue
+        kind = match.group('kind')
+        if kind.startswith(('parse', 'bind', 'plan')):
+            continue
+        statement = [match.group('sql')]
+        duration = float(match.group('ms'))
+
+    if statement:
+        yield ' '.join(statement), duration
+
+
+def parse_stat_statements(lines: Iterable[str]) -> Iterable[tuple]:
+    """
+    Reads a `pg_stat_statements` csv export, e.g. produced by
+    `psql --csv -c "SELECT query, calls, total_exec_time FROM pg_stat_statements"`.
+    Both the column names of Postgres >= 13 (`total_exec_time`)
+    and older (`total_time`) are supported.
+
+    Args:
+        lines (Iterable[str]): The csv lines, including the header.
+
+    Yields:
+        tuple: (statement, calls, total time in ms, max time in ms or None)
+    """
+    for row in csv.DictReader(lines):
+        total = row.get('total_exec_time', row.get('total_time'))
+        if not row.get('query') or total is None:
+            continue
+        max_time = row.get('max_exec_time', row.get('max_time'))
+        yield (row['query'],
+               int(row.get('calls') or 1),
+               float(total),
+               float(max_time) if max_time else None)
+
+
+class QueryStats:
+    """
+    Aggregation of SQL statements by normalized query.
+    """
+
+    queries: dict
+    models: dict
+
+    def __init__(self, models: Union[dict, None] = None):
+        self.queries = {}
+        self.models = models or {}
+
+    def add(self, sql: str, total_ms: float,
+            calls: int = 1, max_ms: Union[float, None] = None) -> None:
+        """
+        Adds the executions of a statement to the aggregation.
+
+        Args:
+            sql (str): The SQL statement.
+            total_ms (float): Total execution time in ms.
+            calls (int, optional): Number of executions. Defaults to 1.
+            max_ms (float, optional): Slowest execution in ms. Defaults to the mean time.
+        """
+        query = normalize_query(sql)
+        stats = self.queries.setdefault(query, {
+            'calls': 0,
+            'total': 0.0,
+            'max': 0.0,
+        })
+        stats['calls'] += calls
+        stats['total'] += total_ms
+        if max_ms is None:
+            max_ms = total_ms / calls if calls else total_ms
+        stats['max'] = max(stats['max'], max_ms)
+
+    def feed_log(self, lines: Iterable[str]) -> int:
+        """
+        Aggregates the statements of a Postgres log.
+
+        Args:
+            lines (Iterable[str]): The log lines.
+
+        Returns:
+            int: Number of statements found.
+        """
+        count = 0
+        for sql, duration in parse_pg_log(lines):
+            self.add(sql, duration)
+            count += 1
+        return count
+
+    def feed_stat_statements(self, lines: Iterable[str]) -> int:
+        """
+        Aggregates the statements of a `pg_stat_statements` csv export.
+
+        Args:
+            lines (Iterable[str]): The csv lines.
+
+        Returns:
+            int: Number of statements found.
+        """
+        count = 0
+        for sql, calls, total, max_ms in parse_stat_statements(lines):
+            self.add(sql, total, calls=calls, max_ms=max_ms)
+            count += 1
+        return count
+
+    def top(self, sort_by: str = 'total', limit: int = 20) -> list:
+        """
+        Returns the most expensive normalized queries.
+
+        Args:
+            sort_by (str, optional): One of SQL_SORT_KEYS. Defaults to 'total'.
+            limit (int, optional): Number of queries. Defaults to 20.
+
+        Returns:
+            list: List of dicts with the query stats and the Odoo models involved.
+        """
+        rows = []
+        for query, stats in self.queries.items():
+            rows.append(dict(
+                stats,
+                query=query,
+                mean=stats['total'] / stats['calls'] if stats['calls'] else 0.0,
+                models=[table_to_model(table, self.models)
+                        for table in query_tables(query)]))
+        rows.sort(key=lambda row: row[sort_by], reverse=True)
+        return rows[:limit] if limit else rows
+
+    def format_report(self, sort_by: str = 'total',
+                      limit: int = 20, width: int = 160) -> list:
+        """
+        Formats the most expensive queries as lines ready to be printed.
+
+        Args:
+            sort_by (str, optional): One of SQL_SORT_KEYS. Defaults to 'total'.
+            limit (int, optional): Number of queries. Defaults to 20.
+            width (int, optional): Max length of the printed query. Defaults to 160.
+
+        Returns:
+            list: The report lines.
+        """
+        lines = [f"{'CALLS':>8} {'TOTAL(ms)':>11} {'MEAN(ms)':>9} {'MAX(ms)':>9}  MODELS / QUERY"]
+        for row in self.top(sort_by=sort_by, limit=limit):
+            query = row['query']
+            if len(query) > width:
+                query = query[:width - 3] + '...'
+            lines.append(
+                f"{row['calls']:>8} {row['total']:>11.1f} {row['mean']:>9.2f} "
+                f"{row['max']:>9.2f}  {', '.join(row['models']) or '-'}")
+            lines.append(f"{'':>41}{query}")
+        return lines
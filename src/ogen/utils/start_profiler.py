@@ -0,0 +1,241 @@
+"""
+Startup profiling of a project.
+
+Correlates the steps executed by oGen with the docker events
+and the log markers of Postgres and Odoo, to show where the time goes
+until the Odoo instance is usable.
+"""
+
+import os
+import re
+import json
+import time
+import queue
+import threading
+import subprocess
+from typing import Union
+
+from .helper import execute_command
+from .log_store import parse_docker_timestamp
+from .docker_compose import ComposeContext
+
+# (service, marker name, regex) searched in the containers logs
+LOG_MARKERS = [
+    ('db', 'db_recovery', re.compile(r'automatic recovery in progress')),
+    ('db', 'db_ready', re.compile(r'database system is ready to accept connections')),
+    ('odoo', 'odoo_process', re.compile(r'odoo: Odoo version')),
+    ('odoo', 'http_ready', re.compile(r'HTTP service \(werkzeug\) running')),
+    ('odoo', 'modules_loading', re.compile(r'odoo\.modules\.loading: loading \d+ modules')),
+    ('odoo', 'modules_loaded', re.compile(r'odoo\.modules\.loading: Modules loaded')),
+    ('odoo', 'registry_loaded', re.compile(r'odoo\.modules\.registry: Registry loaded in')),
+]
+# The profiling stops when this marker is found
+FINAL_MARKER = 'registry_loaded'
+
+# `odoo-1  | 2023-05-01T10:00:00.123456789Z message`
+PREFIXED_LINE_RE = re.compile(r'^(?P<service>[\w.-]+?)(?:[-_]\d+)?\s+\|\s(?P<ts>\S+)\s(?P<msg>.*)$')
+
+MILESTONE_LABELS = {
+    'ogen_start': 'oGen command started',
+    'ogen_checks': 'oGen checks done (active project, status)',
+    'compose_start': 'docker compose up/start called',
+    'compose_done': 'docker compose up/start returned',
+    'db_create': 'db container created',
+    'db_start': 'db container started',
+    'db_recovery': 'Postgres recovery started',
+    'db_ready': 'Postgres ready to accept connections',
+    'odoo_create': 'odoo container created',
+    'odoo_start': 'odoo container started',
+    'odoo_process': 'Odoo process started (wait-for-psql done)',
+    'http_ready': 'Odoo HTTP service running',
+    'modules_loading': 'Odoo modules loading started',
+    'modules_loaded': 'Odoo modules loaded',
+    'registry_loaded': 'Odoo registry loaded',
+}
+
+
+class StartProfiler:
+    """
+    Collects the timeline of a project start.
+    """
+
+    ctx: ComposeContext
+    milestones: dict
+
+    def __init__(self, ctx: ComposeContext):
+        """
+        Args:
+            ctx (ComposeContext): The compose context of the started project.
+        """
+        self.ctx = ctx
+        self.milestones = {}
+        self.mark('ogen_start')
+
+    @property
+    def t_zero(self) -> float:
+        """
+        Returns:
+            float: Unix timestamp of the start of the profiling.
+        """
+        return self.milestones['ogen_start']
+
+    def mark(self, name: str, stamp: Union[float, None] = None) -> None:
+        """
+        Records a milestone. The first occurrence of a name is kept.
+
+        Args:
+            name (str): Milestone name.
+            stamp (float, optional): Unix timestamp. Defaults to now.
+        """
+        self.milestones.setdefault(name, stamp or time.time())
+
+# region Collect
+
+    def collect_events(self) -> None:
+        """
+        Reads the create/start docker events of the project's containers
+        since the profiling started.
+        """
+        output = execute_command([
+            'docker', 'events',
+            '--since', f'{self.t_zero:.3f}',
+            '--until', f'{time.time():.3f}',
+            '--filter', 'type=container',
+            '--filter', f'label=com.docker.compose.project={self.ctx.project_name}',
+            '--format', '{{json .}}',
+        ], return_output=True)
+
+        for line in output.splitlines():
+            try:
+                event = json.loads(line)
+            except ValueError:
+                continue
+            action = event.get('Action') or event.get('status')
+            if action not in ('create', 'start'):
+                continue
+            service = event.get('Actor', {}).get('Attributes', {}) \
+                .get('com.docker.compose.service')
+            if not service:
+                continue
+            self.mark(f'{service}_{action}', int(event.get('timeNano', 0)) / 1_000_000_000)
+
+    def collect_log_markers(self, timeout: int = 180) -> bool:
+        """
+        Follows the containers logs until the Odoo registry is loaded
+        and records the time of every known marker.
+
+        Args:
+            timeout (int, optional): Max seconds to wait. Defaults to 180.
+
+        Returns:
+            bool: True if the final marker was found.
+        """
+        command = self.ctx.command('logs', '--follow', '--timestamps', '--no-color',
+                                   '--since', f'{int(self.t_zero)}')
+        lines = queue.Queue()
+
+        with subprocess.Popen(command,
+                              stdout=subprocess.PIPE,
+                              stderr=subprocess.DEVNULL,
+                              encoding='utf8',
+                              errors='replace') as process:
+
+            def reader():
+                for line in process.stdout:
+                    lines.put(line)
+
+            threading.Thread(target=reader, daemon=True).start()
+
+            deadline = time.time() + timeout
+            try:
+                while FINAL_MARKER not in self.milestones:
+                    remaining = deadline - time.time()
+                    if remaining <= 0:
+                        return False
+                    try:
+                        line = lines.get(timeout=min(remaining, 1))
+                    except queue.Empty:
+                        if process.poll() is not None and lines.empty():
+                            return False
+                        continue
+                    self._match_markers(line.rstrip('\r\n'))
+            finally:
+                process.terminate()
+
+        return True
+
+    def _match_markers(self, line: str) -> None:
+        match = PREFIXED_LINE_RE.match(line)
+        if not match:
+            return
+
+        for service, name, regex in LOG_MARKERS:
+            if name in self.milestones or not match.group('service').endswith(service):
+                continue
+            if regex.search(match.group('msg')):
+                try:
+                    nanos = parse_docker_timestamp(match.group('ts'))
+                except ValueError:
+                    continue
+                self.mark(name, nanos / 1_000_000_000)
+
+# endregion
+
+# region Report
+
+    def offsets(self) -> dict:
+        """
+        Returns:
+            dict: {milestone: seconds since the profiling started}, ordered by time.
+        """
+        items = sorted(self.milestones.items(), key=lambda item: item[1])
+        return {name: stamp - self.t_zero for name, stamp in items}
+
+    def format_report(self, previous: Union[dict, None] = None) -> list:
+        """
+        Formats the timeline of the start as a phase breakdown.
+
+        Args:
+            previous (dict, optional): Offsets of a previous start, for comparison.
+
+        Returns:
+            list: The report lines.
+        """
+        previous = previous or {}
+        lines = [f"{'AT(s)':>8} {'PHASE(s)':>9} {'PREV AT(s)':>10}  MILESTONE"]
+        last = 0.0
+        for name, offset in self.offsets().items():
+            prev = previous.get(name)
+            prev = f'{prev:>10.2f}' if prev is not None else f"{'-':>10}"
+            lines.append(f'{offset:>8.2f} {offset - last:>9.2f} {prev}  '
+                         f'{MILESTONE_LABELS.get(name, name)}')
+            last = offset
+        return lines
+
+    def save_history(self, path: str, extra: Union[dict, None] = None) -> Union[dict, None]:
+        """
+        Appends the offsets of this start to the history file
+        and returns the offsets of the previous start.
+
+        Args:
+            path (str): Path to the history file (json lines).
+            extra (dict, optional): Context data stored with the entry (e.g. Odoo version).
+
+        Returns:
+            dict: The offsets of the previous start or None.
+        """
+        previous = None
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf8') as hist_file:
+                for line in hist_file:
+                    if line.strip():
+                        previous = json.loads(line).get('offsets')
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        entry = dict(extra or {}, time=self.t_zero, offsets=self.offsets())
+        with open(path, 'a', encoding='utf8') as hist_file:
+            hist_file.write(json.dumps(entry) + os.linesep)
+
+        return previous
+
+# endregion
@@ -0,0 +1,412 @@
+"""
+Parallel Odoo test runner.
+
+The modules are split in shards balanced by their historical test duration.
+Every shard runs in its own odoo container and database,
+and the results parsed from the logs are merged into a single JUnit XML report.
+"""
+
+import os
+import re
+import json
+import time
+import queue
+import threading
+import contextlib
+import subprocess
+import xml.etree.ElementTree as ET
+from datetime import datetime
+from typing import Callable, Union
+
+from .fileio import atomic_write
+from .fileio import load_json
+from . import trace
+
+# Duration assumed for the modules without history
+DEF_MODULE_DURATION = 60.0
+
+# `2023-05-01 10:00:00,123 7 INFO db odoo.addons.sale.tests.test_sale: Starting TestSale.test_x ...`
+LOG_LINE_RE = re.compile(
+    r'^(?P<date>\d{4}-\d\d-\d\d \d\d:\d\d:\d\d,\d+) \d+ (?P<level>\w+) \S+ '
+    r'(?P<logger>[\w.]+): (?P<msg>.*)$')
+ADDON_LOGGER_RE = re.compile(r'^odoo\.addons\.(?P<module>\w+)(?:\.|$)')
+START_RE = re.compile(r'^Starting (?P<test>[\w.]+) \.\.\.')
+FAILURE_RE = re.compile(r'^(?P<kind>FAIL|ERROR): (?P<test>[\w.]+)')
+# Test tag without module: `[+][tag][:class][.method]`
+TAG_RE = re.compile(r'^\+?(?P<name>[^/:.]*)(?P<rest>.*)$')
+
+
+def _tag_module(tag: str) -> str:
+    # Test tag format: [-][tag][/module][:class][.method]
+    if '/' not in tag:
+        return ''
+    return re.split(r'[:.]', tag.split('/', 1)[1])[0]
+
+
+def modules_from_tags(tags: list) -> list:
+    """
+    Extracts the modules targeted by test tags (e.g. `/sale:TestSale.test_x`).
+
+    Args:
+        tags (list): Test tags.
+
+    Returns:
+        list: Module names, excluded tags ignored.
+    """
+    modules = []
+    for tag in tags:
+        module = _tag_module(tag)
+        if module and not tag.startswith('-') and module not in modules:
+            modules.append(module)
+    return modules
+
+
+def tags_for_modules(tags: list, modules: list) -> list:
+    """
+    Restricts the test tags to the modules of a shard, so that a shard doesn't run
+    the tests of the modules it installs as dependencies (or of the other shards).
+    The tags of other modules are dropped, the include tags without a module
+    apply to each module of the shard and `/<module>` is used without include tag.
+
+    Args:
+        tags (list): Test tags.
+        modules (list): Modules of the shard.
+
+    Returns:
+        list: The test tags of the shard, empty when they select none of its tests.
+    """
+    includes = []
+    excludes = []
+    for tag in tags:
+        module = _tag_module(tag)
+        if tag.startswith('-'):
+            if module in ('', *modules):
+                excludes.append(tag)
+        elif module:
+            if module in modules:
+                includes.append(tag)
+        else:
+            match = TAG_RE.match(tag)
+            includes += [f"{match['name']}/{mod}{match['rest']}" for mod in modules]
+
+    if not any(not tag.startswith('-') for tag in tags):
+        includes = [f'/{module}' for module in modules]
+    return includes + excludes if includes else []
+
+
+def plan_shards(modules: list, durations: dict, shards: int) -> list:
+    """
+    Splits the modules in shards of similar total duration
+    (longest processing time first).
+
+    Args:
+        modules (list): Modules to be tested.
+        durations (dict): Historical duration in seconds of the modules.
+        shards (int): Number of shards.
+
+    Returns:
+        list: List of module lists, empty shards removed.
+    """
+    known = [durations[mod] for mod in modules if mod in durations]
+    default = sum(known) / len(known) if known else DEF_MODULE_DURATION
+
+    plan = [[] for _i in range(max(shards, 1))]
+    loads = [0.0] * len(plan)
+    for module in sorted(modules, key=lambda mod: durations.get(mod, default), reverse=True):
+        idx = loads.index(min(loads))
+        plan[idx].append(module)
+        loads[idx] += durations.get(module, default)
+
+    return [shard for shard in plan if shard]
+
+
+class ShardResult:  # pylint: disable=too-many-instance-attributes
+    """
+    Test results of a shard, parsed from the odoo logs.
+    """
+
+    name: str
+    modules: list
+    cases: list
+    module_times: dict
+    return_code: Union[int, None]
+    errors: list
+
+    def __init__(self, name: str, modules: list):
+        self.name = name
+        self.modules = modules
+        self.cases = []
+        self.module_times = {}
+        self.return_code = None
+        self.errors = []
+        self._current = None
+        self._failure = None
+        self._last_stamp = 0.0
+
+    def feed(self, line: str) -> Union[str, None]:
+        """
+        Parses a log line of the shard.
+
+        Args:
+            line (str): The log line.
+
+        Returns:
+            str: A progress message worth displaying, if any.
+        """
+        match = LOG_LINE_RE.match(line)
+        if not match:
+            # Traceback of the last failure
+            if self._failure is not None:
+                self._failure['details'].append(line)
+            return None
+
+        self._failure = None
+        stamp = datetime.strptime(match.group('date'), '%Y-%m-%d %H:%M:%S,%f').timestamp()
+        msg = match.group('msg')
+        self._last_stamp = stamp
+
+        addon = ADDON_LOGGER_RE.match(match.group('logger'))
+        if addon:
+            module = addon.group('module')
+            first, _last = self.module_times.get(module, (stamp, stamp))
+            self.module_times[module] = (first, stamp)
+
+            start = START_RE.match(msg)
+            if start:
+                self._close_current(stamp)
+                self._current = {
+                    'module': module,
+                    'test': start.group('test'),
+                    'start': stamp,
+                    'time': 0.0,
+                    'failures': [],
+                }
+                self.cases.append(self._current)
+                return None
+
+            failure = FAILURE_RE.match(msg)
+            if failure:
+                self._failure = {
+                    'kind': failure.group('kind'),
+                    'message': msg,
+                    'details': [],
+                }
+                case = self._find_case(module, failure.group('test'))
+                case['failures'].append(self._failure)
+                return f'{module}: {msg}'
+            return None
+
+        if match.group('level') in ('ERROR', 'CRITICAL') \
+                and match.group('logger').startswith('odoo.modules'):
+            self._failure = {'kind': 'ERROR', 'message': msg, 'details': []}
+            self.errors.append(self._failure)
+            return msg
+
+        return None
+
+    def _find_case(self, module: str, test: str) -> dict:
+        for case in reversed(self.cases):
+            if case['test'] == test or case['test'].endswith(f'.{test}'):
+                return case
+
+        # Failure in setUpClass or of a test that didn't log its start
+        case = {'module': module, 'test': test, 'start': 0, 'time': 0.0, 'failures': []}
+        self.cases.append(case)
+        return case
+
+    def _close_current(self, stamp: float) -> None:
+        if self._current:
+            self._current['time'] = max(stamp - self._current['start'], 0.0)
+            self._current = None
+
+    def finish(self, return_code: int) -> None:
+        """
+        Marks the shard as finished.
+
+        Args:
+            return_code (int): Exit code of the odoo container.
+        """
+        self._close_current(self._last_stamp or time.time())
+        self.return_code = return_code
+        if return_code and not self.errors and not self.failed_count:
+            self.errors.append({
+                'kind': 'ERROR',
+                'message': f'The odoo container exited with code {return_code}',
+                'details': [],
+            })
+
+    @property
+    def failed_count(self) -> int:
+        """
+        Returns:
+            int: Number of failed or errored tests.
+        """
+        return len([case for case in self.cases if case['failures']])
+
+    def module_durations(self) -> dict:
+        """
+        Returns:
+            dict: {module: seconds} measured from the module's log lines.
+        """
+        return {module: last - first for module, (first, last) in self.module_times.items()
+                if module in self.modules}
+
+
+class ShardedTestRunner:
+    """
+    Runs the shards in parallel and merges their results.
+    """
+
+    shards: dict
+    on_progress: Callable
+
+    def __init__(self, shards: dict, on_progress: Callable):
+        """
+        Args:
+            shards (dict): {shard name: (command, modules)}
+            on_progress (Callable): Called with (shard name, message) for progress messages.
+        """
+        self.shards = shards
+        self.on_progress = on_progress
+
+    def run(self, verbose: bool = False) -> list:  # pylint: disable=too-many-locals
+        """
+        Starts all shards and waits for them to finish.
+
+        Args:
+            verbose (bool, optional): Report every log line. Defaults to False.
+
+        Returns:
+            list: The ShardResult of every shard.
+        """
+        events = queue.Queue()
+        results = {}
+        processes = {}
+
+        def reader(name: str, process: subprocess.Popen) -> None:
+            for line in process.stdout:
+                events.put((name, line.rstrip('\r\n')))
+            events.put((name, None))
+
+        # One context per shard, closed when the shard finishes
+        spans = {}
+        contexts = {}
+        for name, (command, modules) in self.shards.items():
+            contexts[name] = contextlib.ExitStack()
+            spans[name] = contexts[name].enter_context(
+                trace.command_span(command, overlapping=True))
+            results[name] = ShardResult(name, modules)
+            processes[name] = subprocess.Popen(  # pylint: disable=consider-using-with
+                command,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.STDOUT,
+                encoding='utf8',
+                errors='replace')
+            threading.Thread(target=reader, args=(name, processes[name]), daemon=True).start()
+            self.on_progress(name, f'started: {", ".join(modules)}')
+
+        running = len(processes)
+        try:
+            while running:
+                name, line = events.get()
+                if line is None:
+                    running -= 1
+                    results[name].finish(processes[name].wait())
+                    result = results[name]
+                    spans[name].set(exit_code=result.return_code, shard=name,
+                                    tests=len(result.cases), failed=result.failed_count)
+                    contexts[name].close()
+                    self.on_progress(name, f'finished: {len(result.cases)} tests, '
+                                           f'{result.failed_count} failed')
+                    continue
+
+                message = results[name].feed(line)
+                if verbose:
+                    self.on_progress(name, line)
+                elif message:
+                    self.on_progress(name, message)
+        finally:
+            for name, process in processes.items():
+                if process.poll() is None:
+                    process.terminate()
+                contexts[name].close()
+
+        return list(results.values())
+
+    @staticmethod
+    def write_junit(results: list, path: str) -> None:  # pylint: disable=too-many-locals
+        """
+        Merges the results of all shards into a JUnit XML report.
+
+        Args:
+            results (list): ShardResult list.
+            path (str): Destination file.
+        """
+        root = ET.Element('testsuites')
+        suites = {}
+
+        def suite_for(module: str) -> ET.Element:
+            if module not in suites:
+                suites[module] = ET.SubElement(root, 'testsuite', name=module)
+            return suites[module]
+
+        for result in results:
+            for case in result.cases:
+                classname, _sep, test_name = case['test'].rpartition('.')
+                elem = ET.SubElement(
+                    suite_for(case['module']), 'testcase',
+                    classname=f"odoo.addons.{case['module']}.{classname}".rstrip('.'),
+                    name=test_name,
+                    time=f"{case['time']:.3f}")
+                for failure in case['failures']:
+                    tag = 'failure' if failure['kind'] == 'FAIL' else 'error'
+                    fail_elem = ET.SubElement(elem, tag, message=failure['message'])
+                    fail_elem.text = os.linesep.join(failure['details'])
+
+            for error in result.errors:
+                elem = ET.SubElement(suite_for(result.name), 'testcase',
+                                     classname=result.name, name='setup', time='0')
+                err_elem = ET.SubElement(elem, 'error', message=error['message'])
+                err_elem.text = os.linesep.join(error['details'])
+
+        for suite in suites.values():
+            cases = suite.findall('testcase')
+            suite.set('tests', str(len(cases)))
+            suite.set('failures', str(len([c for c in cases if c.find('failure') is not None])))
+            suite.set('errors', str(len([c for c in cases if c.find('error') is not None])))
+            suite.set('time', f"{sum(float(c.get('time')) for c in cases):.3f}")
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        ET.ElementTree(root).write(path, encoding='utf-8', xml_declaration=True)
+
+    @staticmethod
+    def update_durations(path: str, results: list) -> None:
+        """
+        Stores the measured module durations, used to balance the next runs.
+
+        Args:
+            path (str): Path to the json history file.
+            results (list): ShardResult list.
+        """
+        durations = load_durations(path)
+        for result in results:
+            for module, duration in result.module_durations().items():
+                previous = durations.get(module)
+                # Smooth the noise of a single run
+                durations[module] = duration if previous is None \
+                    else round((previous + duration) / 2, 3)
+
+        atomic_write(path, json.dumps(durations, indent=2, sort_keys=True))
+
+
+def load_durations(path: str) -> dict:
+    """
+    Loads the historical module durations.
+
+    Args:
+        path (str): Path to the json history file.
+
+    Returns:
+        dict: {module: seconds}, empty when the file is missing or corrupted.
+    """
+    return load_json(path)
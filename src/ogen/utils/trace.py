@@ -0,0 +1,252 @@
+"""
+Structured trace of an oGen run, written in the Chrome trace-event format
+(open it in https://ui.perfetto.dev or chrome://tracing).
+
+Tracing is enabled by `ogen --trace FILE` or the OGEN_TRACE environment variable.
+When it is off, `span` returns a shared no-op object: the instrumented code
+pays only for a function call.
+
+Usage:
+    with trace.span('git.clone', repo=url) as sp:
+        ...
+        sp.set(exit_code=0)
+"""
+
+import os
+import sys
+import time
+import atexit
+import threading
+from typing import Union
+
+TRACE_ENV = 'OGEN_TRACE'
+# Options of docker and git followed by a value, skipped when naming a command
+VALUE_OPTIONS = ('--project-directory', '--project-name', '--file', '--format', '--filter',
+                 '--label', '--status', '--since', '--tail', '--branch', '--depth',
+                 '-C', '-f', '-p')
+# Commands whose subcommand is part of the name, e.g. `docker network ls`
+GROUP_COMMANDS = ('compose', 'network', 'image')
+
+
+class _Tracer:
+    """
+    Collects the trace events of the current process and writes them at exit.
+    """
+
+    path: str
+    events: list
+
+    def __init__(self, path: str):
+        self.path = os.path.abspath(path)
+        self.events = []
+        self.start = _now_us()
+        self._lock = threading.Lock()
+        self._async_ids = 0
+
+    def add(self, event: dict) -> None:
+        """
+        Adds an event. Safe to call from several threads.
+        """
+        event.setdefault('pid', os.getpid())
+        event.setdefault('tid', threading.get_ident())
+        with self._lock:
+            self.events.append(event)
+
+    def next_async_id(self) -> int:
+        """
+        Returns:
+            int: A new id for a pair of async begin/end events.
+        """
+        with self._lock:
+            self._async_ids += 1
+            return self._async_ids
+
+    def save(self) -> None:
+        """
+        Writes the trace file, with a root span covering the whole run.
+        """
+        import json  # pylint: disable=import-outside-toplevel
+        from .fileio import atomic_write  # pylint: disable=import-outside-toplevel
+
+        pid = os.getpid()
+        command = ' '.join(['ogen'] + sys.argv[1:])
+        with self._lock:
+            events = [
+                {'name': 'process_name', 'ph': 'M', 'pid': pid, 'tid': 0,
+                 'args': {'name': command}},
+                {'name': command, 'cat': 'ogen', 'ph': 'X', 'pid': pid,
+                 'tid': threading.main_thread().ident,
+                 'ts': self.start, 'dur': _now_us() - self.start,
+                 'args': {'argv': sys.argv}},
+            ] + self.events
+        atomic_write(self.path, json.dumps({'traceEvents': events, 'displayTimeUnit': 'ms'}))
+
+
+_TRACER: Union[_Tracer, None] = None
+
+
+def _now_us() -> int:
+    return time.time_ns() // 1000
+
+
+class Span:
+    """
+    A traced operation, recorded as a complete event when it ends
+    or as a pair of async events for the operations overlapping in the same thread.
+    """
+
+    name: str
+    cat: str
+    args: dict
+
+    def __init__(self, name: str, cat: str, args: dict, overlapping: bool = False):
+        self.name = name
+        self.cat = cat
+        self.args = args
+        self.overlapping = overlapping
+        self._start = 0
+
+    def set(self, **args) -> None:
+        """
+        Adds arguments to the span, e.g. the exit code of a command.
+        """
+        self.args.update(args)
+
+    def __enter__(self) -> 'Span':
+        self._start = _now_us()
+        return self
+
+    def __exit__(self, exc_type, exc, _tb) -> None:
+        tracer = _TRACER
+        if tracer is None:
+            return
+        if exc_type is not None:
+            self.args['error'] = exc_type.__name__
+
+        end = _now_us()
+        args = {key: _jsonable(val) for key, val in self.args.items()}
+        if not self.overlapping:
+            tracer.add({'name': self.name, 'cat': self.cat, 'ph': 'X',
+                        'ts': self._start, 'dur': end - self._start, 'args': args})
+            return
+
+        async_id = tracer.next_async_id()
+        tracer.add({'name': self.name, 'cat': self.cat, 'ph': 'b', 'id': async_id,
+                    'ts': self._start, 'args': args})
+        tracer.add({'name': self.name, 'cat': self.cat, 'ph': 'e', 'id': async_id,
+                    'ts': end})
+
+
+class _NullSpan:
+    """
+    Span used when tracing is off.
+    """
+
+    def set(self, **args) -> None:
+        """
+        Ignores the arguments.
+        """
+
+    def __enter__(self) -> '_NullSpan':
+        return self
+
+    def __exit__(self, *exc) -> None:
+        return None
+
+
+_NULL_SPAN = _NullSpan()
+
+
+def _jsonable(value):
+    if isinstance(value, (str, int, float, bool)) or value is None:
+        return value
+    if isinstance(value, (list, tuple)):
+        return [_jsonable(val) for val in value]
+    return str(value)
+
+
+def start(path: str) -> None:
+    """
+    Enables the tracing, the file is written when the process exits.
+
+    Args:
+        path (str): The trace file.
+    """
+    global _TRACER  # pylint: disable=global-statement
+    if _TRACER is not None:
+        return
+    _TRACER = _Tracer(path)
+    atexit.register(_TRACER.save)
+
+
+def enabled() -> bool:
+    """
+    Returns:
+        bool: True if the tracing is on.
+    """
+    return _TRACER is not None
+
+
+def span(name: str, cat: str = 'ogen', overlapping: bool = False,
+         **args) -> Union[Span, _NullSpan]:
+    """
+    Creates a span, to be used as a context manager.
+
+    Args:
+        name (str): Name of the operation.
+        cat (str, optional): Category, e.g. `subprocess`. Defaults to 'ogen'.
+        overlapping (bool, optional): The span may overlap others of the same thread
+                                      (concurrent asyncio tasks). Defaults to False.
+        **args: Arguments displayed with the span.
+
+    Returns:
+        Span: The span, a no-op one when the tracing is off.
+    """
+    if _TRACER is None:
+        return _NULL_SPAN
+    return Span(name, cat, args, overlapping=overlapping)
+
+
+def command_name(command: list) -> str:
+    """
+    Short name of a command: the executable and its subcommands,
+    e.g. `git clone`, `docker compose up`, `docker network ls`.
+
+    Args:
+        command (list): The command and its args.
+
+    Returns:
+        str: The name.
+    """
+    words = [os.path.basename(command[0])]
+    args = iter(command[1:])
+    for arg in args:
+        if arg in VALUE_OPTIONS:
+            next(args, None)
+            continue
+        if arg.startswith('-'):
+            continue
+        words.append(arg)
+        if arg not in GROUP_COMMANDS:
+            break
+    return ' '.join(words)
+
+
+def command_span(command: list, cwd: Union[str, None] = None,
+                 overlapping: bool = False) -> Union[Span, _NullSpan]:
+    """
+    Creates the span of a subprocess, named after the command.
+
+    Args:
+        command (list): The command and its args.
+        cwd (str, optional): Working directory of the command.
+        overlapping (bool, optional): See `span`.
+
+    Returns:
+        Span: The span, a no-op one when the tracing is off.
+    """
+    if _TRACER is None:
+        return _NULL_SPAN
+    return Span(command_name(command), 'subprocess',
+                {'argv': list(command), 'cwd': cwd or os.getcwd()},
+                overlapping=overlapping)
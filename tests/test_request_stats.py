@@ -0,0 +1,111 @@
+"""
+Tests of the Odoo request log parser and of the latency stats (`ogen perf requests`),
+against captured log lines.
+"""
+
+import os
+
+import pytest
+
+from ogen.utils import request_stats
+from ogen.utils.request_stats import RequestStats
+from ogen.utils.request_stats import RouteStats
+from ogen.utils.request_stats import normalize_route
+from ogen.utils.request_stats import parse_request_line
+from ogen.utils.request_stats import percentile
+
+FIXTURES = os.path.join(os.path.dirname(__file__), 'fixtures')
+
+
+def read_fixture(name: str) -> list:
+    with open(os.path.join(FIXTURES, name), 'r', encoding='utf8') as fixture:
+        return fixture.readlines()
+
+
+def test_parse_werkzeug_line():
+    request = parse_request_line(read_fixture('odoo_requests.log')[0])
+    assert request == {
+        'method': 'POST',
+        'route': '/web/dataset/call_kw/res.partner/web_search_read',
+        'status': 200,
+        'queries': 12,
+        'sql_time': 0.015,
+        'duration': pytest.approx(0.1),
+    }
+
+
+def test_parse_compose_prefixed_line():
+    request = parse_request_line(read_fixture('odoo_requests.log')[3])
+    assert request['method'] == 'GET'
+    assert request['route'] == '/web/image/res.partner/<id>/avatar_128'
+    assert request['status'] == 304
+    assert request['queries'] == 2
+
+
+def test_parse_colored_line():
+    request = parse_request_line(read_fixture('odoo_requests.log')[4])
+    assert request['route'] == '/web/assets/debug/<hash>/web.assets_backend.min.js'
+    assert request['queries'] == 3
+    assert request['duration'] == pytest.approx(0.043)
+
+
+@pytest.mark.parametrize('index', [5, 6, 7, 8])
+def test_parse_ignores_other_lines(index):
+    # Not a request, no perf info, malformed request, traceback
+    assert parse_request_line(read_fixture('odoo_requests.log')[index]) is None
+
+
+def test_normalize_route():
+    assert normalize_route('/web/content/123?download=true') == '/web/content/<id>'
+    assert normalize_route('/web/image/ir.attachment/12-a1b2c3d/datas') \
+        == '/web/image/ir.attachment/<id>/datas'
+    assert normalize_route('/web/action/load') == '/web/action/load'
+
+
+def test_percentile():
+    samples = [float(value) for value in range(1, 101)]
+    assert percentile(samples, 50) == 50.0
+    assert percentile(samples, 95) == 95.0
+    assert percentile(samples, 99) == 99.0
+    assert percentile(samples, 100) == 100.0
+    assert percentile([0.3], 99) == 0.3
+    assert percentile([], 50) == 0.0
+
+
+def test_reservoir_is_bounded(monkeypatch):
+    monkeypatch.setattr(request_stats, 'MAX_SAMPLES', 10)
+    stats = RouteStats()
+    for value in range(1000):
+        stats.add({'duration': float(value), 'sql_time': 0.0, 'queries': 1})
+
+    assert len(stats.samples) == 10
+    assert set(stats.samples) <= {float(value) for value in range(1000)}
+    summary = stats.summary()
+    assert summary['count'] == 1000
+    assert summary['total'] == sum(range(1000))
+    assert summary['queries'] == 1.0
+
+
+def test_feed_and_report():
+    stats = RequestStats()
+    assert stats.feed(read_fixture('odoo_requests.log')) == 5
+
+    rows = dict(stats.top())
+    assert list(rows) == [
+        'POST /web/dataset/call_kw/res.partner/web_search_read',
+        'GET /web/assets/debug/<hash>/web.assets_backend.min.js',
+        'GET /web/image/res.partner/<id>/avatar_128',
+    ]
+    search = rows['POST /web/dataset/call_kw/res.partner/web_search_read']
+    assert search['count'] == 2
+    assert search['p50'] == pytest.approx(0.1)
+    assert search['p99'] == pytest.approx(0.2)
+    assert search['sql_share'] == pytest.approx(0.025 / 0.3)
+    assert search['queries'] == 10.0
+
+    table = stats.format_table(limit=1)
+    assert len(table) == 2
+    assert table[0].split() == ['COUNT', 'TOTAL(s)', 'P50(ms)', 'P95(ms)', 'P99(ms)',
+                                'SQL%', 'Q/REQ', 'ROUTE']
+    assert table[1].split() == ['2', '0.30', '100', '200', '200', '8.3', '10.0',
+                                'POST', '/web/dataset/call_kw/res.partner/web_search_read']
@@ -0,0 +1,106 @@
+"""
+Tests of the SQL statements statistics (`ogen perf sql`),
+against a captured Postgres log and a `pg_stat_statements` csv export.
+"""
+
+import os
+
+import pytest
+
+from ogen.utils.sql_stats import QueryStats
+from ogen.utils.sql_stats import normalize_query
+from ogen.utils.sql_stats import parse_pg_log
+from ogen.utils.sql_stats import parse_stat_statements
+from ogen.utils.sql_stats import table_to_model
+
+FIXTURES = os.path.join(os.path.dirname(__file__), 'fixtures')
+
+
+def read_fixture(name: str) -> list:
+    with open(os.path.join(FIXTURES, name), 'r', encoding='utf8') as fixture:
+        return fixture.readlines()
+
+
+@pytest.mark.parametrize('sql, expected', [
+    ("SELECT id FROM res_partner WHERE name = 'Bob' AND id IN (1, 2, 3);",
+     'SELECT id FROM res_partner WHERE name = ? AND id IN (...)'),
+    ('SELECT id FROM res_partner WHERE id IN ($1, $2) LIMIT 80',
+     'SELECT id FROM res_partner WHERE id IN (...) LIMIT ?'),
+    ('UPDATE sale_order SET amount = -12.5 WHERE id = %s',
+     'UPDATE sale_order SET amount = ? WHERE id = ?'),
+    ('INSERT INTO res_groups_users_rel (gid, uid) VALUES (1, 2), (1, 3)',
+     'INSERT INTO res_groups_users_rel (gid, uid) VALUES (...), ...'),
+    ('SELECT "account_move_line"."id" /* ORM */ FROM "account_move_line"\n  WHERE x = 1',
+     'SELECT "account_move_line"."id" FROM "account_move_line" WHERE x = ?'),
+])
+def test_normalize_query(sql, expected):
+    assert normalize_query(sql) == expected
+
+
+def test_table_to_model():
+    assert table_to_model('sale_order') == 'sale.order'
+    assert table_to_model('res_groups_users_rel') == 'res_groups_users_rel'
+    assert table_to_model('pg_class') == 'pg_class'
+    assert table_to_model('information_schema_columns') == 'information_schema_columns'
+    assert table_to_model('account_move_line', {'account_move_line': 'account.move.line'}) \
+        == 'account.move.line'
+
+
+def test_parse_pg_log():
+    statements = list(parse_pg_log(read_fixture('postgres.log')))
+
+    # The parse, bind and plan entries and the other messages are skipped
+    assert [duration for _sql, duration in statements] == [12.5, 250.0, 7.5, 3.0]
+    # Multi line statement joined
+    update = statements[1][0]
+    assert update.startswith('UPDATE "sale_order"')
+    assert update.endswith('WHERE id IN (42)')
+    assert statements[3][0].startswith('INSERT INTO "mail_message_res_partner_rel"')
+
+
+def test_parse_stat_statements():
+    rows = list(parse_stat_statements(read_fixture('pg_stat_statements.csv')))
+
+    # The row without query is skipped, an empty max is None
+    assert rows == [
+        ('SELECT "res_partner"."id" FROM "res_partner" WHERE "res_partner"."id" IN ($1, $2)',
+         120, 960.5, 40.25),
+        ('UPDATE "sale_order" SET "state" = $1 WHERE id IN ($2)', 3, 30.0, None),
+    ]
+
+
+def test_parse_stat_statements_old_columns():
+    lines = ['query,calls,total_time\n', 'SELECT 1,4,2.0\n']
+    assert list(parse_stat_statements(lines)) == [('SELECT 1', 4, 2.0, None)]
+
+
+def test_feed_log_and_report():
+    stats = QueryStats()
+    assert stats.feed_log(read_fixture('postgres.log')) == 4
+
+    rows = stats.top()
+    assert [row['models'] for row in rows] == [
+        ['sale.order'], ['res.partner'], ['mail_message_res_partner_rel']]
+    partner = rows[1]
+    assert partner['calls'] == 2
+    assert partner['total'] == pytest.approx(20.0)
+    assert partner['mean'] == pytest.approx(10.0)
+    assert partner['max'] == pytest.approx(12.5)
+    assert [row['calls'] for row in stats.top(sort_by='calls', limit=1)] == [2]
+
+    report = stats.format_report(limit=1, width=20)
+    assert len(report) == 3
+    assert report[1].split() == ['1', '250.0', '250.00', '250.00', 'sale.order']
+    assert report[2].strip() == 'UPDATE "sale_orde...'
+
+
+def test_feed_stat_statements():
+    stats = QueryStats({'res_partner': 'res.partner'})
+    assert stats.feed_stat_statements(read_fixture('pg_stat_statements.csv')) == 2
+
+    partner, order = stats.top()
+    assert partner['models'] == ['res.partner']
+    assert partner['mean'] == pytest.approx(960.5 / 120)
+    assert partner['max'] == pytest.approx(40.25)
+    # Without max time, the mean time is used
+    assert order['max'] == pytest.approx(10.0)